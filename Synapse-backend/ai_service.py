@@ -2,63 +2,89 @@ import os
 import json
 import asyncio
 import re
-from openai import AsyncOpenAI, RateLimitError, APIError
 from dotenv import load_dotenv
+from llm_gateway import llm_gateway, estimate_tokens
+from llm_cache import llm_cache, make_cache_key
+from json_stream import JSONFieldStreamer, IncrementalJSONParser, recover_json
+from pydantic import ValidationError
+from models import ActionItem, Board
 
 load_dotenv()
 
-async def call_openai_api(full_prompt, system_instruction, retries=3, delay=1):
+# 분석 파이프라인 기본 모드: "split" (항목별 호출) / "fused" (통합 호출)
+ANALYSIS_MODES = ("split", "fused")
+DEFAULT_ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "split")
+if DEFAULT_ANALYSIS_MODE not in ANALYSIS_MODES:
+    raise ValueError(f"ANALYSIS_MODE must be one of {', '.join(ANALYSIS_MODES)} (got {DEFAULT_ANALYSIS_MODE!r})")
+# 이 토큰 수(추정치)를 넘는 회의록은 구간별 Map-Reduce로 분석
+LONG_TRANSCRIPT_TOKENS = int(os.getenv("LONG_TRANSCRIPT_TOKENS", "12000"))
+
+async def call_openai_api(full_prompt, system_instruction, retries=3, delay=1, timeout=None, deadline=None,
+                          cache=False, cache_validator=None):
     """
     OpenAI API를 호출하고 텍스트 응답을 반환합니다. (Async)
+    연결 재사용, 동시성/RPM/TPM 제한, Retry-After 백오프는 공용 게이트웨이(llm_gateway)가 처리합니다.
+    cache=True면 같은 (모델, 지시문, 프롬프트) 조합의 이전 응답을 디스크 캐시에서 재사용하며,
+    cache_validator(text)가 False인 응답(예: JSON 파싱 실패)은 캐시에 저장하지 않습니다.
     """
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("Error: OPENAI_API_KEY not found in environment variables.")
-        return None
-
-    try:
-        client = AsyncOpenAI(api_key=api_key)
-    except Exception as e:
-        print(f"OpenAI Client Initialization Error: {e}")
-        return None
-    
     # OpenAI API에 맞는 메시지 형식
     messages = [
         {"role": "system", "content": system_instruction},
         {"role": "user", "content": full_prompt}
     ]
 
-    for i in range(retries):
-        try:
-            # OpenAI API 호출
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini", # Default to a known model
-                messages=messages,
-                timeout=60
-            )
-            
-            # 응답 파싱
-            text = response.choices[0].message.content
-
-            if text:
-                return text.strip()
-            else:
-                raise ValueError("Invalid API response structure.")
-
-        except (RateLimitError, APIError) as e: # OpenAI 관련 오류 처리
-            print(f"API Call Failed (Attempt {i+1}/{retries}): {e}")
-            if i == retries - 1:
-                return None
-            await asyncio.sleep(delay * (2 ** i))  # Exponential backoff
-        except Exception as e:
-            print(f"Unexpected Error: {e}")
-            return None
-
-    return None
+    cache_key = None
+    if cache:
+        cache_key = make_cache_key(llm_gateway.model, system_instruction, full_prompt)
+        cached = await llm_cache.aget(cache_key)
+        if cached is not None:
+            print("DEBUG: LLM cache hit")
+            return cached
+
+    text, _ = await llm_gateway.complete(
+        messages,
+        retries=retries,
+        base_delay=delay,
+        timeout=timeout,
+        deadline=deadline
+    )
+
+    if cache_key and text and (cache_validator is None or cache_validator(text)):
+        await llm_cache.aput(cache_key, text, llm_gateway.model)
+    return text
+
+async def stream_openai_api(full_prompt, system_instruction, cache=False, cache_validator=None):
+    """
+    call_openai_api의 스트리밍 버전 (async generator). 응답 텍스트 조각을 도착하는 대로 yield합니다.
+    캐시 키는 call_openai_api와 같으므로, 캐시에 있으면 저장된 응답 전체를 한 번에 yield합니다.
+    """
+    messages = [
+        {"role": "system", "content": system_instruction},
+        {"role": "user", "content": full_prompt}
+    ]
 
-def clean_json_response(text):
+    cache_key = None
+    if cache:
+        cache_key = make_cache_key(llm_gateway.model, system_instruction, full_prompt)
+        cached = await llm_cache.aget(cache_key)
+        if cached is not None:
+            print("DEBUG: LLM cache hit")
+            yield cached
+            return
+
+    chunks = []
+    async for chunk in llm_gateway.stream(messages):
+        chunks.append(chunk)
+        yield chunk
+
+    text = "".join(chunks).strip()
+    if cache_key and text and (cache_validator is None or cache_validator(text)):
+        await llm_cache.aput(cache_key, text, llm_gateway.model)
+
+def clean_json_response(text, recover=False):
     """
     AI 응답 텍스트에서 마크다운 코드 블록을 제거하고 JSON을 파싱합니다.
+    recover=True면 파싱에 실패해도(응답이 잘렸거나 뒤에 잡음이 붙은 경우) 완성된 부분만으로 복원합니다.
     """
     if not text:
         return None
@@ -78,6 +104,11 @@ def clean_json_response(text):
     try:
         return json.loads(json_str)
     except json.JSONDecodeError:
+        if recover:
+            recovered = recover_json(text)
+            if recovered:
+                print("DEBUG: JSON Parsing Failed, recovered partial result")
+                return recovered
         print("JSON Parsing Failed")
         return None
 
@@ -132,15 +163,61 @@ SYSTEM_INSTRUCTION_BOARD = """
 }
 """
 
-async def analyze_action_items(text: str):
-    full_prompt = f"다음 회의 스크립트를 분석해주세요:\n\n---\n{text}\n---"
-    response_text = await call_openai_api(full_prompt, SYSTEM_INSTRUCTION_ACTION_ITEMS)
-    return clean_json_response(response_text)
+def _is_json_response(text):
+    # 캐시에는 온전한 JSON 응답만 저장 (복원된 부분 결과는 저장하지 않음)
+    return clean_json_response(text) is not None
 
-async def analyze_digital_board(text: str):
-    full_prompt = f"다음 회의 스크립트를 분석하여 JSON으로 요약해주세요:\n\n---\n{text}\n---"
-    response_text = await call_openai_api(full_prompt, SYSTEM_INSTRUCTION_BOARD)
-    return clean_json_response(response_text)
+def validate_action_item(item):
+    """ActionItem 스키마에 맞으면 dict로, 아니면 None을 반환합니다."""
+    try:
+        return ActionItem.model_validate(item).model_dump()
+    except ValidationError:
+        return None
+
+def validate_action_items(data):
+    """
+    action_items / suggestions 구조를 검증합니다.
+    형식이 잘못된 항목만 버리고 나머지는 살립니다. data가 객체가 아니면 None.
+    """
+    if not isinstance(data, dict):
+        return None
+    raw_items = data.get("action_items")
+    items = [validate_action_item(item) for item in raw_items] if isinstance(raw_items, list) else []
+    raw_suggestions = data.get("suggestions")
+    suggestions = [s for s in raw_suggestions if isinstance(s, str)] if isinstance(raw_suggestions, list) else []
+    return {"action_items": [item for item in items if item], "suggestions": suggestions}
+
+def validate_board(data):
+    """보드 구조를 검증합니다. 카테고리별로 문자열 항목만 남기며, data가 객체가 아니면 None."""
+    if not isinstance(data, dict):
+        return None
+    cleaned = {
+        category: [v for v in values if isinstance(v, str)]
+        for category, values in data.items() if isinstance(values, list)
+    }
+    return Board.model_validate(cleaned).model_dump(by_alias=True)
+
+# 분석 호출들이 공유하는 사용자 프롬프트 (규칙/출력 형식은 각 system instruction에 있음)
+_ANALYZE_REQUEST = "다음 회의 스크립트를 분석해주세요"
+
+def _script_prompt(request, text):
+    return f"{request}:\n\n---\n{text}\n---"
+
+def _action_items_prompt(text):
+    return _script_prompt(_ANALYZE_REQUEST, text)
+
+def _board_prompt(text):
+    return _script_prompt("다음 회의 스크립트를 분석하여 JSON으로 요약해주세요", text)
+
+async def analyze_action_items(text: str, use_cache: bool = True):
+    response_text = await call_openai_api(_action_items_prompt(text), SYSTEM_INSTRUCTION_ACTION_ITEMS,
+                                          cache=use_cache, cache_validator=_is_json_response)
+    return validate_action_items(clean_json_response(response_text, recover=True))
+
+async def analyze_digital_board(text: str, use_cache: bool = True):
+    response_text = await call_openai_api(_board_prompt(text), SYSTEM_INSTRUCTION_BOARD,
+                                          cache=use_cache, cache_validator=_is_json_response)
+    return validate_board(clean_json_response(response_text, recover=True))
 
 SYSTEM_INSTRUCTION_SUMMARY = """
 당신은 전문 회의록 요약 작가입니다.
@@ -156,9 +233,276 @@ SYSTEM_INSTRUCTION_SUMMARY = """
 4. 분량: 5문장 이상, 10초 내외로 읽을 수 있는 분량.
 """
 
-async def generate_summary(text: str):
-    full_prompt = f"다음 회의 내용을 바탕으로 고품질의 서술형 요약을 작성해주세요:\n\n---\n{text}\n---"
-    return await call_openai_api(full_prompt, SYSTEM_INSTRUCTION_SUMMARY)
+async def generate_summary(text: str, use_cache: bool = True):
+    full_prompt = _script_prompt("다음 회의 내용을 바탕으로 고품질의 서술형 요약을 작성해주세요", text)
+    return await call_openai_api(full_prompt, SYSTEM_INSTRUCTION_SUMMARY, cache=use_cache)
+
+SYSTEM_INSTRUCTION_FUSED = f"""
+당신은 전문 회의록 분석가입니다.
+제공된 회의 스크립트를 한 번만 읽고, 아래 세 가지 작업의 결과를 **하나의 JSON 객체**로 출력하세요.
+각 작업의 지시문에 포함된 출력 형식 대신, 맨 아래 [최종 JSON Structure]만 사용해야 합니다.
+
+=== [작업 1] Action Item 추출 → "action_items", "suggestions" ===
+{SYSTEM_INSTRUCTION_ACTION_ITEMS}
+
+=== [작업 2] 서술형 요약 → "summary" (JSON 문자열, 줄바꿈은 \\n) ===
+{SYSTEM_INSTRUCTION_SUMMARY}
+
+=== [작업 3] 디지털 보드 분류 → "board" ===
+{SYSTEM_INSTRUCTION_BOARD}
+
+**[최종 JSON Structure]** - 다른 설명 없이 이 JSON만 출력하세요.
+{{
+    "action_items": [
+        {{"task": "...", "assignee": "...", "due_date": "YYYY-MM-DD", "priority": "Critical | High | Medium | Low", "reasoning": "..."}}
+    ],
+    "suggestions": ["..."],
+    "summary": "서술형 요약",
+    "board": {{
+        "주요 주제": ["..."],
+        "결정 사항": ["..."],
+        "질문 사항": ["..."]
+    }}
+}}
+"""
+
+def _parse_fused_response(text, recover=False):
+    """
+    통합 분석 응답을 파싱합니다. 필수 키(action_items, summary)가 없으면 None.
+    recover=True면 잘린 응답에서 끝까지 완성된 최상위 항목만 살리고, 빠진 항목은 None으로 둡니다.
+    (호출 측에서 빠진 항목만 분리 호출로 다시 받음)
+    """
+    data = clean_json_response(text)
+    if not isinstance(data, dict):
+        if not recover or not text:
+            return None
+        streamer = JSONFieldStreamer()
+        streamer.feed(text)
+        data = streamer.fields
+
+    complete = isinstance(data.get("action_items"), list) and isinstance(data.get("summary"), str)
+    if not complete and not recover:
+        return None
+
+    structure = validate_action_items(data)
+    return {
+        "action_items": structure["action_items"] if isinstance(data.get("action_items"), list) else None,
+        "suggestions": structure["suggestions"],
+        "summary": data.get("summary") if isinstance(data.get("summary"), str) else None,
+        "board": validate_board(data.get("board")),
+    }
+
+def _fused_prompt(text):
+    return _script_prompt(_ANALYZE_REQUEST, text)
+
+async def analyze_meeting_fused(text: str, use_cache: bool = True):
+    """
+    Action Item / 제안 / 서술형 요약 / 보드를 한 번의 호출로 받아옵니다.
+    응답이 잘렸으면 완성된 항목만 담아 반환하고(빠진 항목은 None), 파싱할 수 없으면 None을 반환합니다.
+    """
+    response_text = await call_openai_api(_fused_prompt(text), SYSTEM_INSTRUCTION_FUSED, cache=use_cache,
+                                          cache_validator=lambda t: _parse_fused_response(t) is not None)
+    return _parse_fused_response(response_text, recover=True)
+
+def _resolve_mode(mode):
+    """알 수 없는 모드를 split으로 조용히 처리하지 않도록 검증합니다."""
+    mode = mode or DEFAULT_ANALYSIS_MODE
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode: {mode!r} (expected one of {', '.join(ANALYSIS_MODES)})")
+    return mode
+
+async def analyze_meeting(text: str, mode: str = None, use_cache: bool = True, include_board: bool = False,
+                          segments=None, allow_map_reduce: bool = True):
+    """
+    회의 분석 파이프라인.
+    - split: analyze_action_items + generate_summary (+ analyze_digital_board)를 각각 호출 (기존 방식)
+    - fused: 한 번의 호출로 모두 받아오고, 실패하면 split으로 대체
+    회의록이 LONG_TRANSCRIPT_TOKENS를 넘으면 구간별 Map-Reduce 분석(map_reduce.py)으로 처리합니다.
+    반환값: (structure_data, narrative_summary, board) - 실패한 항목은 None
+    """
+    mode = _resolve_mode(mode)
+    if allow_map_reduce and estimate_tokens(text) > LONG_TRANSCRIPT_TOKENS:
+        from map_reduce import analyze_long_transcript
+        return await analyze_long_transcript(text, segments=segments, mode=mode, use_cache=use_cache,
+                                             include_board=include_board)
+
+    if mode == "fused":
+        fused = await analyze_meeting_fused(text, use_cache=use_cache)
+        if fused:
+            return await _complete_fused(text, fused, use_cache, include_board)
+        print("DEBUG: Fused analysis failed, falling back to split calls")
+
+    tasks = [analyze_action_items(text, use_cache=use_cache), generate_summary(text, use_cache=use_cache)]
+    if include_board:
+        tasks.append(analyze_digital_board(text, use_cache=use_cache))
+    results = await asyncio.gather(*tasks)
+    return results[0], results[1], results[2] if include_board else None
+
+async def _complete_fused(text: str, fused: dict, use_cache: bool, include_board: bool):
+    """통합 응답에서 빠진 항목(잘린 뒷부분)만 분리 호출로 채웁니다. 전체를 다시 분석하지 않음."""
+    missing = {}
+    if fused["action_items"] is None:
+        missing["structure"] = analyze_action_items(text, use_cache=use_cache)
+    if fused["summary"] is None:
+        missing["summary"] = generate_summary(text, use_cache=use_cache)
+    if include_board and fused["board"] is None:
+        missing["board"] = analyze_digital_board(text, use_cache=use_cache)
+    if missing:
+        print(f"DEBUG: Fused response incomplete, re-requesting {list(missing)} only")
+    filled = dict(zip(missing, await asyncio.gather(*missing.values())))
+
+    structure_data = filled.get("structure") or {
+        "action_items": fused["action_items"] or [],
+        "suggestions": fused["suggestions"],
+    }
+    return structure_data, filled.get("summary", fused["summary"]), filled.get("board", fused["board"])
+
+async def _stream_json(full_prompt, system_instruction, use_cache, cache_validator, on_event):
+    """스트리밍 호출의 JSON 이벤트(IncrementalJSONParser)를 on_event(kind, path, value)로 넘기고 전체 응답을 반환합니다."""
+    parser = IncrementalJSONParser()
+    chunks = []
+    async for chunk in stream_openai_api(full_prompt, system_instruction, cache=use_cache, cache_validator=cache_validator):
+        chunks.append(chunk)
+        for kind, path, value in parser.feed(chunk):
+            on_event(kind, path, value)
+    return "".join(chunks)
+
+def _analysis_event(kind, path, value, board_path=None):
+    """
+    JSON 경로 이벤트를 분석 스트림 이벤트로 바꿉니다. 관심 없는 경로면 None.
+    board_path: 보드 카테고리가 있는 위치 (단독 보드 응답은 (), 통합 응답은 ("board",), 보드가 없으면 None)
+    """
+    if kind == "value" and len(path) == 2 and path[0] == "action_items":
+        item = validate_action_item(value)
+        return {"type": "action_item", "data": item} if item else None
+    if kind == "value" and len(path) == 2 and path[0] == "suggestions" and isinstance(value, str):
+        return {"type": "suggestion", "data": value}
+    if board_path is not None and kind == "value" and isinstance(value, str):
+        depth = len(board_path)
+        if len(path) == depth + 2 and path[:depth] == board_path:
+            return {"type": "board_item", "category": path[depth], "data": value}
+    if kind == "delta" and path == ("summary",):
+        return {"type": "summary_delta", "data": value}
+    return None
+
+def _result_events(structure_data, narrative_summary, board):
+    """스트리밍 없이 얻은 결과를 스트림 이벤트로 풀어냅니다."""
+    events = []
+    if structure_data:
+        events += [{"type": "action_item", "data": item} for item in structure_data.get("action_items", [])]
+        events += [{"type": "suggestion", "data": s} for s in structure_data.get("suggestions", [])]
+    if narrative_summary:
+        events.append({"type": "summary", "data": narrative_summary})
+    for category, values in (board or {}).items():
+        events += [{"type": "board_item", "category": category, "data": v} for v in values]
+    return events
+
+async def _stream_split(text, use_cache, include_board, emit):
+    def on_structure(kind, path, value):
+        event = _analysis_event(kind, path, value)
+        if event:
+            emit(event)
+
+    def on_board(kind, path, value):
+        event = _analysis_event(kind, path, value, board_path=())
+        if event and event["type"] == "board_item":
+            emit(event)
+
+    async def structure():
+        response_text = await _stream_json(_action_items_prompt(text), SYSTEM_INSTRUCTION_ACTION_ITEMS,
+                                           use_cache, _is_json_response, on_structure)
+        return validate_action_items(clean_json_response(response_text, recover=True))
+
+    async def summary():
+        result = await generate_summary(text, use_cache=use_cache)
+        if result:
+            emit({"type": "summary", "data": result})
+        return result
+
+    async def board():
+        response_text = await _stream_json(_board_prompt(text), SYSTEM_INSTRUCTION_BOARD,
+                                           use_cache, _is_json_response, on_board)
+        return validate_board(clean_json_response(response_text, recover=True))
+
+    tasks = [structure(), summary()] + ([board()] if include_board else [])
+    results = await asyncio.gather(*tasks)
+    return results[0], results[1], results[2] if include_board else None
+
+async def _stream_fused(text, use_cache, include_board, emit):
+    def on_event(kind, path, value):
+        event = _analysis_event(kind, path, value, board_path=("board",))
+        if event:
+            emit(event)
+
+    response_text = await _stream_json(_fused_prompt(text), SYSTEM_INSTRUCTION_FUSED, use_cache,
+                                       lambda t: _parse_fused_response(t) is not None, on_event)
+    fused = _parse_fused_response(response_text, recover=True)
+    if not fused:
+        print("DEBUG: Fused analysis failed, falling back to split calls")
+        emit({"type": "reset"})
+        return await _stream_split(text, use_cache, include_board, emit)
+
+    # 잘린 항목은 이미 일부가 전송되었을 수 있으므로, 다시 받아오기 전에 해당 구역을 비우게 함
+    if fused["action_items"] is None:
+        emit({"type": "reset", "section": "action_items"})
+    if fused["summary"] is None:
+        emit({"type": "reset", "section": "summary"})
+    if include_board and fused["board"] is None:
+        emit({"type": "reset", "section": "board"})
+    structure_data, narrative_summary, board = await _complete_fused(text, fused, use_cache, include_board)
+
+    refilled = _result_events(
+        structure_data if fused["action_items"] is None else None,
+        narrative_summary if fused["summary"] is None else None,
+        board if include_board and fused["board"] is None else None,
+    )
+    for event in refilled:
+        emit(event)
+    return structure_data, narrative_summary, board
+
+async def analyze_meeting_stream(text: str, mode: str = None, use_cache: bool = True, include_board: bool = False,
+                                 segments=None):
+    """
+    analyze_meeting의 스트리밍 버전 (async generator).
+    Action Item / 제안 / 보드 항목은 JSON 원소가 닫히는 즉시, 요약은 완성되면(통합 모드는 글자 단위로) 내보냅니다.
+    - {"type": "action_item", "data": {...}} / {"type": "suggestion", "data": "..."}
+    - {"type": "board_item", "category": "...", "data": "..."}
+    - {"type": "summary_delta", "data": "..."} / {"type": "summary", "data": "..."}
+    - {"type": "reset", "section": ...} : 해당 구역(없으면 전체)을 지우고 다시 받음
+    - {"type": "complete", "structure": ..., "summary": ..., "board": ...} : 마지막 이벤트
+    """
+    mode = _resolve_mode(mode)
+    if estimate_tokens(text) > LONG_TRANSCRIPT_TOKENS:
+        # 긴 회의록은 구간별 결과를 합친 뒤에야 최종 항목이 정해지므로 끝난 뒤 한꺼번에 전송
+        structure_data, narrative_summary, board = await analyze_meeting(
+            text, mode=mode, use_cache=use_cache, include_board=include_board, segments=segments
+        )
+        for event in _result_events(structure_data, narrative_summary, board):
+            yield event
+        yield {"type": "complete", "structure": structure_data, "summary": narrative_summary, "board": board}
+        return
+
+    queue = asyncio.Queue()
+    runner = _stream_fused if mode == "fused" else _stream_split
+
+    async def run():
+        try:
+            return await runner(text, use_cache, include_board, queue.put_nowait)
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+        structure_data, narrative_summary, board = await task
+    finally:
+        if not task.done():
+            task.cancel()
+    yield {"type": "complete", "structure": structure_data, "summary": narrative_summary, "board": board}
 
 SYSTEM_INSTRUCTION_CHAT = """
 당신은 회의록 데이터를 기반으로 답변하는 AI 비서 'Synapse Bot'입니다.
@@ -185,18 +529,18 @@ SYSTEM_INSTRUCTION_CHAT = """
 """
 
 from vector_store import vector_db
+from chunking import format_timestamp
 
-async def chat_with_ai(user_message: str, context: str = ""):
+async def build_chat_prompt(user_message: str, context: str = ""):
     """
-    회의록 컨텍스트를 포함하여 사용자와 대화합니다.
+    RAG 검색 결과를 컨텍스트에 붙여 채팅용 시스템 프롬프트를 만듭니다.
+    검색은 vector_db.asearch (기본: 벡터 + BM25 키워드 결과를 RRF로 합친 hybrid)를 사용하며 이벤트 루프를 막지 않습니다.
+    반환값: (system_prompt, known_sources)
     """
-    # 1. RAG Retrieval
+    known_sources = set()
     try:
         # vector_db.query returns list of dicts: {'content': '...', 'metadata': {...}}
-        retrieved_items = vector_db.query(user_message, n_results=3)
-        
-        rag_context = ""
-        known_sources = set()
+        retrieved_items = await vector_db.asearch(user_message, n_results=3)
 
         if retrieved_items:
             print(f"DEBUG: RAG Retrieved {len(retrieved_items)} items.")
@@ -213,7 +557,11 @@ async def chat_with_ai(user_message: str, context: str = ""):
                 
                 known_sources.add(source_file)
                 
-                snippet = f"--- Source: {source_file} ---\n{content}\n----------------"
+                # STT 세그먼트로 인덱싱된 청크는 본문이 이미 "[mm:ss] 화자: 발언" 줄이며, 머리글에 구간을 표시
+                time_range = ""
+                if "start" in metadata and "end" in metadata:
+                    time_range = f" [{format_timestamp(metadata['start'])}~{format_timestamp(metadata['end'])}]"
+                snippet = f"--- Source: {source_file}{time_range} ---\n{content}\n----------------"
                 rag_context_parts.append(snippet)
                 
                 print(f"--- Chunk {i+1} ({source_file}) ---")
@@ -227,11 +575,9 @@ async def chat_with_ai(user_message: str, context: str = ""):
         # Proceed even if RAG fails
 
     system_prompt = SYSTEM_INSTRUCTION_CHAT.format(context=context if context else "컨텍스트 없음")
-    response_text = await call_openai_api(user_message, system_prompt)
-    
-    # Parse JSON response
-    parsed_response = clean_json_response(response_text)
-    
+    return system_prompt, known_sources
+
+def _finalize_chat_response(response_text, parsed_response, known_sources):
     if parsed_response:
         # Validate/clean sources to ensure they are from the retrieval list
         # AI might hallucinate sources, so we can filter or just trust if prompt is good.
@@ -247,6 +593,42 @@ async def chat_with_ai(user_message: str, context: str = ""):
             "sources": []
         }
 
+async def chat_with_ai(user_message: str, context: str = ""):
+    """
+    회의록 컨텍스트를 포함하여 사용자와 대화합니다.
+    """
+    system_prompt, known_sources = await build_chat_prompt(user_message, context)
+    response_text = await call_openai_api(user_message, system_prompt)
+    
+    # Parse JSON response
+    parsed_response = clean_json_response(response_text)
+    return _finalize_chat_response(response_text, parsed_response, known_sources)
+
+async def chat_with_ai_stream(user_message: str, context: str = ""):
+    """
+    chat_with_ai의 스트리밍 버전 (async generator).
+    - ("delta", "thought" | "answer", text) : 생성 중인 글자
+    - ("field", key, value)                 : 필드 하나가 완성됨
+    - ("done", None, response)              : chat_with_ai와 같은 형식의 최종 응답
+    """
+    system_prompt, known_sources = await build_chat_prompt(user_message, context)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+    streamer = JSONFieldStreamer()
+    async for chunk in llm_gateway.stream(messages):
+        for event in streamer.feed(chunk):
+            yield event
+
+    response_text = streamer.text.strip()
+    parsed_response = clean_json_response(response_text) if response_text else None
+    if parsed_response is None and streamer.fields.get("answer") is not None:
+        # 닫는 괄호 없이 끊긴 응답이라도 완성된 필드는 살림
+        parsed_response = dict(streamer.fields)
+    yield "done", None, _finalize_chat_response(response_text, parsed_response, known_sources)
+
 SYSTEM_INSTRUCTION_SELECTOR = """
 당신은 사용자의 질문에 답변하기 위해 가장 관련성 높은 회의록 파일을 선택하는 도우미입니다.
 아래 제공된 [파일 목록]을 분석하여, 사용자의 질문에 답변하는 데 도움이 될만한 파일의 '파일명'을 JSON 배열로 반환하세요.
@@ -261,11 +643,19 @@ SYSTEM_INSTRUCTION_SELECTOR = """
 4. 오직 JSON 배열만 반환하세요. (예: ["meeting_A.json", "meeting_B.json"])
 """
 
+def _format_summary_line(item: dict):
+    """매니페스트 항목 한 줄 표현: - 파일명 (날짜 / 키워드): 요약"""
+    extras = [item.get("date")] if item.get("date") and item.get("date") != "Unknown" else []
+    if item.get("keywords"):
+        extras.append(", ".join(item["keywords"]))
+    label = f"{item['filename']} ({' / '.join(extras)})" if extras else item["filename"]
+    return f"- {label}: {item['summary']}"
+
 async def select_relevant_files(user_query: str, file_summaries: list):
     """
-    사용자 질문과 파일 요약 목록을 받아 관련 파일명을 리스트로 반환
+    사용자 질문과 파일 요약 목록(요약 매니페스트 항목)을 받아 관련 파일명을 리스트로 반환
     """
-    file_list_str = "\\n".join([f"- {item['filename']}: {item['summary']}" for item in file_summaries])
+    file_list_str = "\n".join([_format_summary_line(item) for item in file_summaries])
     prompt = f"사용자 질문: {user_query}"
     
     system_prompt = SYSTEM_INSTRUCTION_SELECTOR.format(file_list=file_list_str)
@@ -0,0 +1,82 @@
+"""
+업로드된 오디오를 작업 디렉토리에 복사하지 않고 조각 단위로 읽어 STT 제공자에게 넘기는 ingest 경로.
+읽는 동안 SHA-256 해시와 크기 제한을 함께 처리하며, 메모리에는 한 조각(chunk_size)만 올라갑니다.
+"""
+import os
+import asyncio
+import hashlib
+
+MAX_UPLOAD_BYTES = int(os.getenv("SYNAPSE_MAX_UPLOAD_MB", "1024")) * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class AudioUpload:
+    """
+    FastAPI UploadFile 래퍼.
+    UploadFile은 이미 SpooledTemporaryFile(큰 파일은 OS 임시 디렉토리)에 담겨 있으므로,
+    이를 그대로 조각 단위로 읽어 전달하면 추가 복사가 필요 없습니다.
+    """
+
+    def __init__(self, upload, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = CHUNK_SIZE):
+        self.filename = os.path.basename(upload.filename or "") or "audio"
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.size = None
+        self._upload = upload
+        self._sha256 = None
+
+    async def open(self):
+        """크기를 확인합니다. 제한을 넘으면 아무것도 전송하기 전에 UploadTooLarge."""
+        size = getattr(self._upload, "size", None)
+        if size is None:
+            size = await asyncio.to_thread(self._measure)
+        if size > self.max_bytes:
+            raise UploadTooLarge(f"Upload is {size} bytes (limit {self.max_bytes})")
+        self.size = size
+        return self
+
+    def _measure(self):
+        f = self._upload.file
+        f.seek(0, os.SEEK_END)
+        return f.tell()
+
+    async def chunks(self):
+        """처음부터 끝까지 조각 단위로 읽으며 해시를 계산합니다. 끝까지 읽으면 sha256 값이 정해짐"""
+        if self.size is None:
+            await self.open()
+        await self._upload.seek(0)
+        hasher = hashlib.sha256()
+        read = 0
+        while True:
+            chunk = await self._upload.read(self.chunk_size)
+            if not chunk:
+                break
+            read += len(chunk)
+            if read > self.max_bytes:
+                raise UploadTooLarge(f"Upload exceeded {self.max_bytes} bytes")
+            hasher.update(chunk)
+            yield chunk
+        self._sha256 = hasher.hexdigest()
+
+    @property
+    def sha256(self):
+        """chunks() 또는 digest()로 끝까지 읽은 뒤에만 값이 있음"""
+        return self._sha256
+
+    async def digest(self) -> str:
+        """전송 전에 해시가 필요할 때(STT 결과 캐시 조회) 로컬 업로드 파일을 한 번 읽어 계산합니다."""
+        if self._sha256 is None:
+            async for _ in self.chunks():
+                pass
+        return self._sha256
+
+    async def save_to(self, path: str):
+        """재시작 후에도 읽어야 하는 경우(작업 큐)에만 파일로 저장합니다."""
+        with open(path, "wb") as f:
+            async for chunk in self.chunks():
+                await asyncio.to_thread(f.write, chunk)
+        return path
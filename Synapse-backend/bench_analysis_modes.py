@@ -0,0 +1,85 @@
+"""
+split(항목별 3회 호출) vs fused(통합 1회 호출) 분석 파이프라인 비교 벤치마크.
+tests/데모시나리오 의 회의록으로 토큰 사용량, 지연 시간, 예상 비용을 측정합니다.
+
+실행: python bench_analysis_modes.py [반복 횟수]
+(OPENAI_API_KEY 필요, LLM 응답 캐시는 사용하지 않음)
+"""
+import os
+import sys
+import time
+import asyncio
+from ai_service import analyze_meeting
+from llm_gateway import llm_gateway
+
+SCENARIO_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "데모시나리오")
+
+# gpt-4o-mini 기준 USD / 1M tokens
+PRICE_INPUT = float(os.getenv("BENCH_PRICE_INPUT", "0.15"))
+PRICE_OUTPUT = float(os.getenv("BENCH_PRICE_OUTPUT", "0.60"))
+
+
+def load_transcripts():
+    """정답지(_action_item.txt)를 제외한 회의록만 읽습니다."""
+    transcripts = {}
+    for fname in sorted(os.listdir(SCENARIO_DIR)):
+        if fname.endswith(".txt") and not fname.endswith("_action_item.txt"):
+            with open(os.path.join(SCENARIO_DIR, fname), "r", encoding="utf-8") as f:
+                transcripts[fname] = f.read()
+    return transcripts
+
+
+async def run_once(text: str, mode: str):
+    before = llm_gateway.stats()
+    start = time.perf_counter()
+    structure, summary, board = await analyze_meeting(text, mode=mode, use_cache=False, include_board=True)
+    elapsed = time.perf_counter() - start
+    after = llm_gateway.stats()
+
+    prompt_tokens = after["prompt_tokens"] - before["prompt_tokens"]
+    completion_tokens = after["completion_tokens"] - before["completion_tokens"]
+    return {
+        "ok": bool(structure and summary and board),
+        "calls": after["requests"] - before["requests"],
+        "latency": elapsed,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost": prompt_tokens / 1e6 * PRICE_INPUT + completion_tokens / 1e6 * PRICE_OUTPUT,
+    }
+
+
+async def main(repeat: int):
+    transcripts = load_transcripts()
+    if not transcripts:
+        print(f"No transcripts found in {SCENARIO_DIR}")
+        return
+
+    totals = {}
+    print(f"{'scenario':<28} {'mode':<6} {'ok':<3} {'calls':>5} {'latency(s)':>10} {'in_tok':>7} {'out_tok':>7} {'cost($)':>9}")
+    for name, text in transcripts.items():
+        for mode in ("split", "fused"):
+            for _ in range(repeat):
+                r = await run_once(text, mode)
+                print(f"{name[:28]:<28} {mode:<6} {'Y' if r['ok'] else 'N':<3} {r['calls']:>5} {r['latency']:>10.2f} "
+                      f"{r['prompt_tokens']:>7} {r['completion_tokens']:>7} {r['cost']:>9.5f}")
+                agg = totals.setdefault(mode, {"latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "runs": 0})
+                for k in ("latency", "prompt_tokens", "completion_tokens", "cost"):
+                    agg[k] += r[k]
+                agg["runs"] += 1
+
+    print("\n==== 평균 (회의 1건당) ====")
+    for mode, agg in totals.items():
+        n = agg["runs"]
+        print(f"{mode:<6} latency={agg['latency']/n:.2f}s  in={agg['prompt_tokens']/n:.0f}  "
+              f"out={agg['completion_tokens']/n:.0f}  cost=${agg['cost']/n:.5f}")
+
+    if "split" in totals and "fused" in totals and totals["split"]["prompt_tokens"]:
+        s, f = totals["split"], totals["fused"]
+        print(f"\nfused / split: input tokens {f['prompt_tokens']/s['prompt_tokens']:.2f}x, "
+              f"latency {f['latency']/s['latency']:.2f}x, cost {f['cost']/s['cost']:.2f}x")
+
+    await llm_gateway.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
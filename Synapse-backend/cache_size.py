@@ -0,0 +1,63 @@
+"""
+디스크 캐시(SQLite)의 전체 크기 추적과 LRU 삭제.
+저장할 때마다 SUM(size)로 테이블 전체를 훑지 않도록, 트리거가 같은 트랜잭션 안에서 누적 바이트 수(cache_size)를 갱신합니다.
+트리거로 갱신하므로 여러 프로세스가 같은 DB를 써도 값이 맞습니다.
+주의: INSERT OR REPLACE는 교체되는 행의 삭제 트리거를 실행하지 않으므로 저장은 ON CONFLICT ... DO UPDATE(upsert)로 해야 함
+"""
+
+_EVICT_BATCH = 256
+
+
+def track_size(conn, table: str):
+    """table(size 컬럼 필요)의 누적 크기 행과 트리거를 만듭니다. 기존 DB면 처음 한 번만 SUM으로 초기화"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_size (name TEXT PRIMARY KEY, bytes INTEGER NOT NULL)")
+        conn.execute(
+            f"INSERT OR IGNORE INTO cache_size(name, bytes) SELECT ?, COALESCE(SUM(size), 0) FROM {table}", (table,)
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_insert AFTER INSERT ON {table} BEGIN "
+            f"UPDATE cache_size SET bytes = bytes + NEW.size WHERE name = '{table}'; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_delete AFTER DELETE ON {table} BEGIN "
+            f"UPDATE cache_size SET bytes = bytes - OLD.size WHERE name = '{table}'; END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_size_update AFTER UPDATE OF size ON {table} BEGIN "
+            f"UPDATE cache_size SET bytes = bytes + NEW.size - OLD.size WHERE name = '{table}'; END"
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def tracked_bytes(conn, table: str) -> int:
+    row = conn.execute("SELECT bytes FROM cache_size WHERE name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def evict_lru(conn, table: str, max_bytes: int) -> int:
+    """
+    누적 크기가 max_bytes 이하가 될 때까지 last_access가 오래된 항목부터 삭제하고 삭제 수를 반환합니다.
+    한도 안이면 누적 크기 한 행만 읽고 끝나며, 넘었을 때도 필요한 만큼만 나눠서 읽음
+    """
+    total = tracked_bytes(conn, table)
+    removed = 0
+    while total > max_bytes:
+        rows = conn.execute(
+            f"SELECT rowid, size FROM {table} ORDER BY last_access ASC LIMIT ?", (_EVICT_BATCH,)
+        ).fetchall()
+        if not rows:
+            break
+        doomed = []
+        for rowid, size in rows:
+            if total <= max_bytes:
+                break
+            doomed.append((rowid,))
+            total -= size
+        conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", doomed)
+        removed += len(doomed)
+    return removed
@@ -0,0 +1,146 @@
+import bisect
+import base64
+import threading
+
+from storage_engine import storage as default_storage
+
+def encode_cursor(sort_key) -> str:
+    ts, filename = sort_key
+    raw = f"{ts!r}|{filename}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str):
+    """잘못된 커서는 ValueError를 발생시킵니다."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        ts, filename = raw.split("|", 1)
+        return float(ts), filename
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class StorageCatalog:
+    """
+    분석 기록 목록을 메모리에 유지하는 인덱스.
+    - 서버 시작 시 한 번 전체 로드(build)
+    - 이후에는 저장소 세대 번호(version)가 바뀐 경우에만 새로 쓰여진 기록을 증분 반영
+      (다른 워커가 저장한 기록도 같은 방식으로 따라잡음)
+
+    채팅 auto 모드용 요약 매니페스트(요약/날짜/소스 타입/키워드)도 함께 보관합니다.
+    매니페스트 원본은 저장 시점에 기록되는 analyses 테이블의 요약 컬럼입니다.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+        self._lock = threading.RLock()
+        self._entries = {}   # filename -> entry dict
+        self._order = []     # (timestamp, filename) 오름차순 정렬 리스트
+        self._version = None
+
+    def build(self):
+        """저장소 전체를 읽어 카탈로그를 새로 구성합니다."""
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            self._version = None
+            self._sync()
+
+    def sync(self):
+        """저장 직후 호출하는 write hook. 바뀐 기록만 반영합니다."""
+        with self._lock:
+            self._sync()
+
+    def get(self, filename: str):
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(filename)
+            return self._public(entry) if entry else None
+
+    def list(self, cursor: str = None, limit: int = None):
+        """
+        최신순으로 정렬된 목록을 반환합니다.
+        반환값: (items, next_cursor) - 다음 페이지가 없으면 next_cursor는 None
+        """
+        start_key = decode_cursor(cursor) if cursor else None
+
+        with self._lock:
+            self._sync()
+
+            # _order는 오름차순이므로 뒤에서부터 읽는다
+            end = bisect.bisect_left(self._order, start_key) if start_key else len(self._order)
+            begin = 0 if limit is None else max(0, end - limit)
+
+            page_keys = self._order[begin:end][::-1]
+            items = [self._public(self._entries[key[1]]) for key in page_keys]
+            next_cursor = encode_cursor(page_keys[-1]) if page_keys and begin > 0 else None
+
+        return items, next_cursor
+
+    def summaries(self):
+        """채팅 auto 모드용 요약 목록 (최신순). 분석 결과 본문을 읽지 않습니다."""
+        with self._lock:
+            self._sync()
+            result = []
+            for _, filename in reversed(self._order):
+                entry = self._entries[filename]
+                result.append({
+                    "filename": filename,
+                    "summary": entry["_summary"] or "요약 없음",
+                    "date": entry["date"],
+                    "source_type": entry["_source_type"],
+                    "keywords": entry["_keywords"],
+                })
+            return result
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # --- 내부 로직 ---
+
+    def _sync(self):
+        """저장소 세대 번호가 바뀌었을 때만 그 이후에 쓰여진 기록을 반영합니다."""
+        try:
+            version = self.storage.version()
+        except Exception as e:
+            print(f"Storage catalog sync error: {e}")
+            return
+
+        if version == self._version:
+            return
+
+        for row in self.storage.list_analyses(after_seq=self._version or 0):
+            self._remove_entry(row["name"])
+            self._add_entry(row)
+
+        self._version = version
+
+    def _add_entry(self, row: dict):
+        entry = {
+            "id": 1000 + row["id"],
+            "title": row["name"],
+            "date": row["date"],
+            "type": "history",
+            "_sort_key": (row["created_at"], row["name"]),
+            "_summary": row["summary"],
+            "_source_type": row["source_type"],
+            "_keywords": row["keywords"],
+        }
+        self._entries[row["name"]] = entry
+        bisect.insort(self._order, entry["_sort_key"])
+
+    def _remove_entry(self, filename: str):
+        entry = self._entries.pop(filename, None)
+        if entry is None:
+            return
+        idx = bisect.bisect_left(self._order, entry["_sort_key"])
+        if idx < len(self._order) and self._order[idx] == entry["_sort_key"]:
+            del self._order[idx]
+
+    @staticmethod
+    def _public(entry: dict):
+        return {k: v for k, v in entry.items() if not k.startswith("_")}
+
+
+# Singleton instance
+storage_catalog = StorageCatalog()
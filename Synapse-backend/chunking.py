@@ -0,0 +1,121 @@
+"""
+벡터 인덱싱용 내용 기반 청크 분할 (content-defined chunking).
+고정 길이 창으로 자르면 앞부분을 한 글자만 고쳐도 뒤의 모든 청크 경계가 밀려 전부 다시 임베딩해야 합니다.
+여기서는 문장(발언) 단위로 나눈 뒤, 문장 내용의 해시로 경계를 정하므로 수정된 곳 주변의 청크만 바뀌고
+나머지 청크는 같은 내용(같은 해시, 같은 ID)으로 다시 만들어집니다.
+STT 세그먼트가 있으면 세그먼트를 자르지 않고 묶어, 청크마다 시작/끝 시각과 화자를 함께 남깁니다.
+"""
+import os
+import re
+import hashlib
+from llm_gateway import estimate_tokens
+from map_reduce import speaker_label
+
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "200"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "600"))
+# 최소 크기를 넘긴 뒤 문장 해시가 이 값으로 나누어떨어지면 경계 (평균적으로 min + 문장 4개 분량)
+CHUNK_BOUNDARY_DIVISOR = int(os.getenv("CHUNK_BOUNDARY_DIVISOR", "4"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _unit_hash(text: str) -> int:
+    # 공백 차이는 경계 결정에 영향을 주지 않도록 정규화
+    return int.from_bytes(hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def split_units(text: str, max_tokens: int = CHUNK_MAX_TOKENS):
+    """줄(발언) -> 문장 단위로 나눕니다. 한 문장이 max_tokens를 넘으면 글자 수로 자름"""
+    units = []
+    for line in (text or "").splitlines():
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            step = max_tokens * 2
+            units.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return units
+
+
+def content_defined_groups(units, unit_text=lambda u: u, min_tokens: int = CHUNK_MIN_TOKENS,
+                           max_tokens: int = CHUNK_MAX_TOKENS, divisor: int = CHUNK_BOUNDARY_DIVISOR):
+    """
+    단위 목록을 연속된 묶음으로 나눕니다. (단위를 자르거나 겹치게 넣지 않음)
+    - 묶음이 min_tokens 이상이고 마지막 단위의 내용 해시가 divisor로 나누어떨어지면 경계
+    - 다음 단위를 더하면 max_tokens를 넘으면 그 앞에서 경계
+    경계가 내용으로 정해지므로 수정 이후 첫 내용 경계부터는 이전과 같은 묶음이 다시 나옵니다.
+    """
+    groups, current, current_tokens = [], [], 0
+    for unit in units:
+        tokens = estimate_tokens(unit_text(unit))
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+        if current_tokens >= min_tokens and _unit_hash(unit_text(unit)) % divisor == 0:
+            groups.append(current)
+            current, current_tokens = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def chunk_text(text: str):
+    """텍스트 -> 청크 문자열 목록"""
+    return ["\n".join(group) for group in content_defined_groups(split_units(text))]
+
+
+def format_timestamp(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+def _segment_fields(seg):
+    """STTSegment 또는 result_to_dict 형식의 dict -> (start, end, text, speaker)"""
+    if isinstance(seg, dict):
+        return seg.get("start", 0.0), seg.get("end", 0.0), (seg.get("text") or "").strip(), speaker_label(seg.get("speaker"))
+    return seg.start, seg.end, (seg.text or "").strip(), speaker_label(seg.speaker)
+
+
+def _segment_units(segments, max_tokens: int):
+    units = []
+    for seg in segments or []:
+        start, end, text, speaker = _segment_fields(seg)
+        # 한 세그먼트가 예산을 넘는 경우에만 글자 수로 나눔 (시각/화자는 그대로)
+        step = max_tokens * 2
+        for i in range(0, len(text), step):
+            units.append({"start": start, "end": end, "speaker": speaker, "text": text[i:i + step]})
+    return units
+
+
+def _render_segments(group) -> str:
+    """'[mm:ss] 화자: 발언' 줄. 같은 화자의 연속 세그먼트는 한 줄로 이어 붙여 접두어 반복을 줄임"""
+    lines, last_speaker = [], None
+    for unit in group:
+        if lines and unit["speaker"] == last_speaker:
+            lines[-1] = f"{lines[-1]} {unit['text']}"
+        else:
+            lines.append(f"[{format_timestamp(unit['start'])}] {unit['speaker']}: {unit['text']}")
+        last_speaker = unit["speaker"]
+    return "\n".join(lines)
+
+
+def chunk_segments(segments, max_tokens: int = CHUNK_MAX_TOKENS):
+    """
+    STT 세그먼트 -> [{"text", "start", "end", "speakers"}]
+    세그먼트 단위로 내용 기반 경계를 정하며(겹침 없음), speakers는 등장 순서대로 쉼표로 이은 문자열 (Chroma 메타데이터용)
+    """
+    chunks = []
+    for group in content_defined_groups(_segment_units(segments, max_tokens), unit_text=lambda u: u["text"],
+                                        max_tokens=max_tokens):
+        chunks.append({
+            "text": _render_segments(group),
+            "start": group[0]["start"],
+            "end": group[-1]["end"],
+            "speakers": ",".join(dict.fromkeys(unit["speaker"] for unit in group)),
+        })
+    return chunks
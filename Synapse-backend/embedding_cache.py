@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import array
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from cache_size import track_size, tracked_bytes, evict_lru
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(__file__), "embedding_cache.db"))
+DEFAULT_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# SQLite 변수 개수 제한(기본 999)보다 작게 나눠 조회
+_BATCH = 500
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _to_blob(vector) -> bytes:
+    """float32 배열로 저장 (float64 JSON 대비 약 1/5 크기). 항상 little-endian"""
+    values = array.array("f", vector)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_blob(blob: bytes) -> list:
+    values = array.array("f")
+    values.frombytes(blob)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    임베딩 벡터를 (모델, 텍스트 SHA-256)으로 저장하는 디스크 캐시 (SQLite).
+    같은 청크를 다시 인덱싱하거나 같은 질문을 다시 검색하면 임베딩 API를 호출하지 않습니다.
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    """
+
+    def __init__(self, db_path: str = EMBEDDING_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+        track_size(self._conn(), "embeddings")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, texts: list) -> list:
+        """texts와 같은 순서의 벡터 목록. 캐시에 없는 항목은 None"""
+        hashes = [text_sha256(t) for t in texts]
+        found = {}
+        conn = self._conn()
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), _BATCH):
+            batch = unique[i:i + _BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for text_hash, blob in conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                (model, *batch)
+            ):
+                found[text_hash] = blob
+            if found:
+                conn.execute(
+                    f"UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                    (time.time(), model, *batch)
+                )
+
+        vectors = [_from_blob(found[h]) if h in found else None for h in hashes]
+        hits = sum(1 for v in vectors if v is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model: str, texts: list, vectors: list):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = _to_blob(vector)
+            rows.append((model, text_sha256(text), blob, len(blob), now, now))
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO embeddings(model, text_hash, vector, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(model, text_hash) DO UPDATE SET vector = excluded.vector, size = excluded.size, "
+                "created_at = excluded.created_at, last_access = excluded.last_access",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._evict()
+
+    async def aget_many(self, model: str, texts: list) -> list:
+        return await asyncio.to_thread(self.get_many, model, texts)
+
+    async def aput_many(self, model: str, texts: list, vectors: list):
+        await asyncio.to_thread(self.put_many, model, texts, vectors)
+
+    def _evict(self):
+        removed = evict_lru(self._conn(), "embeddings", self.max_bytes)
+        if removed:
+            with self._lock:
+                self.evictions += removed
+
+    def stats(self):
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = tracked_bytes(conn, "embeddings")
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            }
+
+
+# Singleton instance
+embedding_cache = EmbeddingCache()
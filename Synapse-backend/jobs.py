@@ -0,0 +1,321 @@
+"""
+오디오 처리 작업 큐.
+업로드 요청은 작업(job)을 등록하고 바로 job_id를 돌려받으며, 실제 처리는 단계별 워커가 수행합니다.
+    stt(음성 인식) -> analysis(분석 + 저장) -> index(벡터 인덱싱)
+- 단계마다 워커 수가 정해져 있어 업로드가 몰려도 동시에 실행되는 작업 수가 제한됨
+- 작업 상태와 중간 결과(STT 결과)는 SQLite에 저장되어, 서버가 재시작되면 마지막 단계부터 이어서 처리
+- 상태가 바뀔 때마다 구독자(SSE)에게 알림
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+from storage_engine import DB_PATH
+
+JOB_DB_PATH = os.getenv("SYNAPSE_JOB_DB_PATH", DB_PATH)
+JOB_SPOOL_DIR = os.getenv("SYNAPSE_JOB_DIR", os.path.join(os.path.dirname(__file__), "job_spool"))
+
+# 단계별 동시 실행 워커 수
+STAGE_WORKERS = {
+    "stt": int(os.getenv("JOB_STT_WORKERS", "2")),
+    "analysis": int(os.getenv("JOB_ANALYSIS_WORKERS", "4")),
+    "index": int(os.getenv("JOB_INDEX_WORKERS", "1")),
+}
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# 처리 중인 작업의 소유권 유지 시간. 이 시간 동안 갱신되지 않으면 다른 프로세스가 이어받을 수 있음
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "90"))
+
+STAGES = ("stt", "analysis", "index")
+STAGE_STATUS = {"stt": "transcribing", "analysis": "analyzing", "index": "indexing"}
+STAGE_PROGRESS = {"stt": 0.05, "analysis": 0.6, "index": 0.9}
+TERMINAL_STATUSES = ("completed", "failed")
+
+_JSON_COLUMNS = ("params", "transcript", "result")
+
+
+class JobStore:
+    """작업 테이블 (SQLite). 분석 기록과 같은 DB 파일을 기본으로 사용합니다."""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        stage TEXT,
+        progress REAL NOT NULL DEFAULT 0,
+        params TEXT,
+        audio_path TEXT,
+        transcript TEXT,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        owner TEXT,
+        lease_until REAL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, kind: str, params: dict, audio_path: str, owner: str) -> dict:
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs(id, kind, status, stage, progress, params, audio_path, owner, lease_until, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', 'stt', 0, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params, ensure_ascii=False), audio_path, owner, now + LEASE_SECONDS, now, now)
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_transcript: bool = False):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, include_transcript) if row else None
+
+    def list(self, status: str = None, limit: int = 50) -> list:
+        if status:
+            rows = self._conn().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def update(self, job_id: str, **fields):
+        for column in _JSON_COLUMNS:
+            if column in fields and fields[column] is not None:
+                fields[column] = json.dumps(fields[column], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        self._conn().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def audio_path(self, job_id: str):
+        row = self._conn().execute("SELECT audio_path FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["audio_path"] if row else None
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """주인이 없거나 소유권이 만료된 작업을 가져옵니다."""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE jobs SET owner = ?, lease_until = ? WHERE id = ? AND status NOT IN ('completed', 'failed') "
+            "AND (owner IS NULL OR owner = ? OR lease_until < ?)",
+            (owner, now + LEASE_SECONDS, job_id, owner, now)
+        )
+        return cursor.rowcount == 1
+
+    def renew(self, owner: str):
+        self._conn().execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status NOT IN ('completed', 'failed')",
+            (time.time() + LEASE_SECONDS, owner)
+        )
+
+    def resumable(self, owner: str = None) -> list:
+        """끝나지 않았고 처리 중인 프로세스도 없는 작업 (오래된 순). owner가 이미 가진 작업은 제외"""
+        rows = self._conn().execute(
+            "SELECT id, stage FROM jobs WHERE status NOT IN ('completed', 'failed') "
+            "AND (owner IS NULL OR lease_until < ?) AND (owner IS NULL OR owner != ?) ORDER BY created_at",
+            (time.time(), owner)
+        ).fetchall()
+        return [(row["id"], row["stage"]) for row in rows]
+
+    def counts(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _to_dict(row, include_transcript: bool = False) -> dict:
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job.get(column):
+                job[column] = json.loads(job[column])
+        if not include_transcript:
+            job.pop("transcript", None)
+        for private in ("owner", "lease_until", "audio_path"):
+            job.pop(private, None)
+        return job
+
+
+class JobPipeline:
+    """
+    단계별 큐와 워커 풀. 각 단계의 실제 처리는 configure()로 등록한 핸들러가 수행합니다.
+    핸들러는 async fn(job) -> dict 이며, 반환한 dict(transcript / result 등)는 작업 테이블에 저장된 뒤
+    다음 단계 핸들러의 job에 담겨 전달됩니다.
+    """
+
+    def __init__(self, store: JobStore = None, workers: dict = None):
+        self.store = store or JobStore()
+        self.workers = dict(workers or STAGE_WORKERS)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._queues = {}
+        self._tasks = []
+        self._running = {stage: 0 for stage in STAGES}
+        self._subscribers = {}  # job_id -> set(asyncio.Queue)
+
+    def configure(self, **handlers):
+        self._handlers.update(handlers)
+
+    async def start(self):
+        os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+        self._queues = {stage: asyncio.Queue() for stage in STAGES}
+        for stage in STAGES:
+            for _ in range(self.workers[stage]):
+                self._tasks.append(asyncio.create_task(self._worker(stage)))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        await self.resume()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def resume(self):
+        """
+        처리하는 프로세스가 없는 작업(재시작 전에 끝나지 않았거나, 다른 프로세스가 죽어 소유권이 만료된 작업)을
+        마지막 단계부터 다시 큐에 넣습니다. 시작 시와 heartbeat마다 호출
+        """
+        resumed = 0
+        for job_id, stage in await asyncio.to_thread(self.store.resumable, self.owner):
+            if await asyncio.to_thread(self.store.claim, job_id, self.owner):
+                self._queues[stage or "stt"].put_nowait(job_id)
+                resumed += 1
+        if resumed:
+            print(f"DEBUG: Resumed {resumed} unfinished jobs")
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def spool_path(self, job_id: str, filename: str) -> str:
+        """업로드 파일을 재시작 후에도 읽을 수 있도록 작업 디렉토리에 저장할 경로"""
+        ext = os.path.splitext(filename or "")[1][:10]
+        return os.path.join(JOB_SPOOL_DIR, f"{job_id}{ext}")
+
+    async def submit(self, job_id: str, kind: str, params: dict, audio_path: str) -> dict:
+        job = await asyncio.to_thread(self.store.create, job_id, kind, params, audio_path, self.owner)
+        self._queues["stt"].put_nowait(job_id)
+        self._publish(job)
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    async def checkpoint(self, job_id: str, **fields):
+        """
+        단계 처리 도중의 결과를 작업 테이블에 바로 저장합니다. (핸들러에서 호출)
+        재시작으로 단계가 다시 실행될 때 핸들러가 이미 끝난 부분(외부 호출, 저장 등)을 건너뛸 수 있도록
+        """
+        return await self._update(job_id, **fields)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "running": dict(self._running),
+            "queued": {stage: queue.qsize() for stage, queue in self._queues.items()},
+            "jobs": self.store.counts(),
+        }
+
+    # --- 내부 로직 ---
+
+    def _publish(self, job: dict):
+        for queue in self._subscribers.get(job["id"], ()):
+            queue.put_nowait(job)
+
+    async def _update(self, job_id: str, **fields):
+        await asyncio.to_thread(self.store.update, job_id, **fields)
+        job = await asyncio.to_thread(self.store.get, job_id)
+        self._publish(job)
+        return job
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, self.owner)
+                # 다른 프로세스가 죽어 소유권이 만료된 작업을 이어받음
+                await self.resume()
+            except sqlite3.Error as e:
+                print(f"Job lease renew error: {e}")
+
+    async def _worker(self, stage: str):
+        queue = self._queues[stage]
+        while True:
+            job_id = await queue.get()
+            self._running[stage] += 1
+            try:
+                await self._run_stage(stage, job_id)
+            except Exception as e:
+                print(f"Job worker error ({stage}, {job_id}): {e}")
+            finally:
+                self._running[stage] -= 1
+                queue.task_done()
+
+    async def _run_stage(self, stage: str, job_id: str):
+        await self._update(job_id, status=STAGE_STATUS[stage], stage=stage, progress=STAGE_PROGRESS[stage])
+        job = await asyncio.to_thread(self.store.get, job_id, True)
+        audio_path = await asyncio.to_thread(self.store.audio_path, job_id)
+        job["audio_path"] = audio_path
+
+        try:
+            fields = await self._handlers[stage](job) or {}
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            print(f"Job {job_id} failed at {stage} (attempt {attempts}/{MAX_ATTEMPTS}): {e}")
+            if attempts >= MAX_ATTEMPTS:
+                await self._update(job_id, status="failed", error=str(e), attempts=attempts, owner=None)
+                self._discard_audio(audio_path)
+                return
+            await self._update(job_id, status="queued", error=str(e), attempts=attempts)
+            # 대기하는 동안 워커를 점유하지 않도록 타이머로 다시 넣음
+            asyncio.get_running_loop().call_later(min(30, 2 ** attempts), self._queues[stage].put_nowait, job_id)
+            return
+
+        next_index = STAGES.index(stage) + 1
+        if next_index < len(STAGES):
+            next_stage = STAGES[next_index]
+            await self._update(job_id, status="queued", stage=next_stage, attempts=0, error=None, **fields)
+            self._queues[next_stage].put_nowait(job_id)
+        else:
+            await self._update(job_id, status="completed", stage=None, progress=1.0, error=None, owner=None, **fields)
+
+        if stage == "stt":
+            # STT 결과가 저장되었으므로 원본 오디오는 더 이상 필요 없음
+            self._discard_audio(audio_path)
+
+    @staticmethod
+    def _discard_audio(audio_path: str):
+        if audio_path and os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError as e:
+                print(f"Job spool cleanup error: {e}")
+
+
+# Singleton instance
+job_pipeline = JobPipeline()
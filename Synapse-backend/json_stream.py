@@ -0,0 +1,264 @@
+"""
+LLM이 토큰 단위로 내보내는 JSON 객체를 완성 전에 조금씩 해석하는 증분 파서.
+응답 전체를 받은 뒤 정규식으로 찾는 clean_json_response와 달리,
+문자열은 글자가 도착하는 대로, 그 외 값(배열 원소, 객체 등)은 닫히는 즉시 이벤트로 내보냅니다.
+응답이 중간에 끊겨도 그때까지 완성된 값은 snapshot()/recover_json()으로 살릴 수 있습니다.
+"""
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+class IncrementalJSONParser:
+    """
+    feed(chunk)를 호출할 때마다 새로 확정된 이벤트 목록을 반환합니다.
+    path는 루트 객체로부터의 경로 튜플입니다. 예: ("action_items", 0), ("board", "주요 주제", 2)
+    - ("delta", path, text) : 작성 중인 문자열 값에 새로 추가된 부분
+    - ("value", path, value): 값 하나가 완성됨 (문자열, 숫자, 배열/객체 원소 등 모든 깊이)
+    첫 '{' 이전의 설명 문장이나 ```json 코드 블록 표시는 무시하고, 루트 객체가 닫히면 멈춥니다.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.done = False
+        self._stack = []          # [(container, path)] - 열려 있는 객체/배열
+        self._key = None          # 객체에서 값을 기다리는 키
+        self._expect = "root"     # root | key | colon | value | comma
+        self._string = None       # 작성 중인 문자열 버퍼 (None이면 문자열 밖)
+        self._string_is_key = False
+        self._escape = False
+        self._unicode = None      # \uXXXX 처리 중인 16진수 버퍼
+        self._high_surrogate = None
+        self._scalar = None       # 작성 중인 숫자/true/false/null
+
+    def feed(self, chunk: str):
+        events = []
+        for ch in chunk:
+            if self.done:
+                break
+            self._step(ch, events)
+        return events
+
+    def snapshot(self, drop_open_items: bool = False):
+        """
+        지금까지 완성된 값들로 이루어진 루트 객체 (닫히지 않은 객체/배열도 완성된 원소만큼 포함)
+        drop_open_items=True면 배열 안에서 닫히지 않은 객체/배열 원소를 뺀 사본을 반환합니다.
+        (일부 필드만 받은 Action Item이 완성된 항목처럼 검증을 통과하지 않도록)
+        """
+        if not drop_open_items or self.root is None:
+            return self.root
+        open_ids = {id(container) for container, _ in self._stack}
+
+        def copy(value):
+            if isinstance(value, dict):
+                return {key: copy(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [copy(item) for item in value if id(item) not in open_ids]
+            return value
+
+        return copy(self.root)
+
+    # --- 내부 상태 기계 ---
+
+    def _path(self):
+        container, path = self._stack[-1]
+        if isinstance(container, list):
+            return path + (len(container),)
+        return path + (self._key,)
+
+    def _step(self, ch, events):
+        if self._string is not None:
+            self._string_char(ch, events)
+            return
+        if self._scalar is not None:
+            if ch in ",]}" or ch.isspace():
+                self._finish_scalar(events)
+            else:
+                self._scalar.append(ch)
+                return
+
+        expect = self._expect
+        if expect == "root":
+            if ch == "{":
+                self.root = {}
+                self._stack.append((self.root, ()))
+                self._expect = "key"
+            return
+        if ch.isspace():
+            return
+
+        if expect == "key":
+            if ch == '"':
+                self._start_string(is_key=True)
+            elif ch == "}":
+                self._close(events)
+        elif expect == "colon":
+            if ch == ":":
+                self._expect = "value"
+        elif expect == "value":
+            if ch == '"':
+                self._start_string(is_key=False)
+            elif ch in "{[":
+                container = {} if ch == "{" else []
+                path = self._path()
+                self._attach(container)
+                self._stack.append((container, path))
+                self._expect = "key" if ch == "{" else "value"
+            elif ch == "]" and isinstance(self._stack[-1][0], list):
+                self._close(events)  # 빈 배열 또는 마지막 원소 뒤의 쉼표
+            else:
+                self._scalar = [ch]
+        elif expect == "comma":
+            if ch == ",":
+                self._expect = "key" if isinstance(self._stack[-1][0], dict) else "value"
+            elif ch in "]}":
+                self._close(events)
+
+    def _attach(self, value):
+        container, _ = self._stack[-1]
+        if isinstance(container, list):
+            container.append(value)
+        else:
+            container[self._key] = value
+
+    def _complete(self, value, events):
+        """스칼라/문자열 값 하나가 완성됨"""
+        path = self._path()
+        self._attach(value)
+        events.append(("value", path, value))
+        self._expect = "comma"
+
+    def _close(self, events):
+        container, path = self._stack.pop()
+        if not self._stack:
+            self.done = True
+        events.append(("value", path, container))
+        self._expect = "comma"
+
+    def _start_string(self, is_key: bool):
+        self._string = []
+        self._string_is_key = is_key
+
+    def _string_char(self, ch, events):
+        if self._unicode is not None:
+            self._unicode.append(ch)
+            if len(self._unicode) == 4:
+                try:
+                    code = int("".join(self._unicode), 16)
+                except ValueError:
+                    code = None
+                self._unicode = None
+                self._emit_code_point(code, events)
+            return
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = []
+            else:
+                self._emit_text(_ESCAPES.get(ch, ch), events)
+            return
+        if ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            value = "".join(self._string)
+            self._string = None
+            self._high_surrogate = None
+            if self._string_is_key:
+                self._key = value
+                self._expect = "colon"
+            else:
+                self._complete(value, events)
+        else:
+            self._emit_text(ch, events)
+
+    def _emit_code_point(self, code, events):
+        if code is None:
+            return
+        if 0xD800 <= code <= 0xDBFF:
+            # 서로게이트 쌍의 앞부분은 뒷부분이 올 때까지 보류
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit_text(chr(code), events)
+
+    def _emit_text(self, text, events):
+        self._string.append(text)
+        if not self._string_is_key:
+            events.append(("delta", self._path(), text))
+
+    def _finish_scalar(self, events):
+        raw = "".join(self._scalar)
+        self._scalar = None
+        if raw in _LITERALS:
+            value = _LITERALS[raw]
+        else:
+            try:
+                value = float(raw) if any(c in raw for c in ".eE") else int(raw)
+            except ValueError:
+                value = None
+        self._complete(value, events)
+
+
+class JSONFieldStreamer:
+    """
+    채팅 응답처럼 최상위 필드만 필요한 경우를 위한 IncrementalJSONParser 래퍼.
+    - ("delta", key, text)  : 최상위 문자열 값에 새로 추가된 부분
+    - ("field", key, value) : 최상위 값 하나가 완성됨 (문자열이면 전체 문자열)
+    """
+
+    def __init__(self):
+        self.fields = {}          # 완성된 최상위 필드
+        self.partial = {}         # 작성 중인 최상위 문자열 필드
+        self.raw = []             # 지금까지 받은 전체 텍스트
+        self._parser = IncrementalJSONParser()
+
+    @property
+    def done(self):
+        return self._parser.done
+
+    @property
+    def text(self) -> str:
+        return "".join(self.raw)
+
+    def feed(self, chunk: str):
+        self.raw.append(chunk)
+        events = []
+        for kind, path, value in self._parser.feed(chunk):
+            if len(path) != 1:
+                continue
+            key = path[0]
+            if kind == "delta":
+                self.partial[key] = self.partial.get(key, "") + value
+                events.append(("delta", key, value))
+            else:
+                self.partial.pop(key, None)
+                self.fields[key] = value
+                events.append(("field", key, value))
+        return self._coalesce(events)
+
+    @staticmethod
+    def _coalesce(events):
+        """같은 필드의 연속된 delta 이벤트를 하나로 합칩니다."""
+        merged = []
+        for event in events:
+            if merged and event[0] == "delta" and merged[-1][0] == "delta" and merged[-1][1] == event[1]:
+                merged[-1] = ("delta", event[1], merged[-1][2] + event[2])
+            else:
+                merged.append(event)
+        return merged
+
+
+def recover_json(text: str):
+    """
+    잘리거나 뒤에 잡음이 붙은 응답에서 완성된 부분만으로 루트 객체를 복원합니다.
+    작성 중이던 문자열/숫자는 버리고, 닫히지 않은 배열/객체는 완성된 원소만 남깁니다.
+    배열 원소인데 닫히지 않은 객체/배열(예: 작성 중이던 Action Item)은 통째로 버립니다.
+    '{'가 전혀 없으면 None.
+    """
+    if not text:
+        return None
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.snapshot(drop_open_items=True)
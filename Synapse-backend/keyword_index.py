@@ -0,0 +1,225 @@
+"""
+RAG용 로컬 키워드 검색 (BM25 역색인).
+벡터 검색은 질문마다 임베딩 API를 거쳐야 하지만, 금액/이름/"프로젝트 알파" 같은 정확한 표현은 단어 일치로 더 잘 찾힙니다.
+한국어는 조사가 붙어 어절 단위로는 일치하지 않으므로 음절 bigram으로 색인합니다. ("알파는" -> 알파 파는)
+색인은 메모리에 두어 네트워크 없이 검색하고, 청크 원문은 SQLite에 저장해 재시작 시 다시 만듭니다.
+청크 ID는 벡터 DB와 같으므로(내용 해시) 벡터 인덱싱의 diff와 함께 바뀐 청크만 갱신됩니다.
+"""
+import os
+import re
+import json
+import math
+import time
+import heapq
+import sqlite3
+import threading
+from collections import Counter
+
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", os.path.join(os.path.dirname(__file__), "keyword_index.db"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# 한글 음절 연속 구간 / 영문·숫자 단어 (숫자 안의 쉼표·소수점 포함: 1,000 / 3.5)
+_TOKEN_RUN = re.compile(r"[가-힣]+|[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    """
+    한글은 음절 bigram(한 글자 단어는 그대로), 영문/숫자는 소문자 단어 단위.
+    숫자의 천 단위 쉼표는 제거하여 "1,000"과 "1000"이 같은 토큰이 됨
+    """
+    tokens = []
+    for run in _TOKEN_RUN.findall((text or "").lower()):
+        if "가" <= run[0] <= "힣":
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.replace(",", ""))
+    return tokens
+
+
+class KeywordIndex:
+    """
+    청크 단위 BM25 역색인.
+    sync_document()로 문서 하나의 청크 목록을 맞추면 사라진 청크는 빼고 새 청크만 토큰화해 넣습니다.
+    모든 읽기/쓰기는 하나의 락으로 보호 (검색은 마이크로초 단위라 경합이 짧음)
+    """
+
+    def __init__(self, db_path: str = KEYWORD_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._postings = {}     # term -> {chunk_id: tf}
+        self._chunks = {}       # chunk_id -> (doc_id, length, content, metadata)
+        self._doc_chunks = {}   # doc_id -> {chunk_id}
+        self._total_length = 0
+        self.searches = 0
+        self._search_seconds = 0.0
+        self.last_search_us = 0.0
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_chunks (
+                chunk_id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_keyword_chunks_doc ON keyword_chunks(doc_id)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self):
+        """저장된 청크로 메모리 색인을 만듭니다. (처음 사용할 때 한 번, 이후 호출은 무시)"""
+        with self._lock:
+            self._ensure_loaded()
+        return len(self._chunks)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        started = time.perf_counter()
+        for chunk_id, doc_id, content, metadata in self._conn().execute(
+            "SELECT chunk_id, doc_id, content, metadata FROM keyword_chunks"
+        ):
+            self._add(chunk_id, doc_id, content, json.loads(metadata))
+        self._loaded = True
+        print(f"DEBUG: Keyword index loaded {len(self._chunks)} chunks, {len(self._postings)} terms "
+              f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def _add(self, chunk_id, doc_id, content, metadata):
+        counts = Counter(tokenize(content))
+        length = sum(counts.values())
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+        self._chunks[chunk_id] = (doc_id, length, content, metadata)
+        self._doc_chunks.setdefault(doc_id, set()).add(chunk_id)
+        self._total_length += length
+
+    def _remove(self, chunk_id):
+        doc_id, length, content, _ = self._chunks.pop(chunk_id)
+        for term in set(tokenize(content)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        ids = self._doc_chunks.get(doc_id)
+        if ids is not None:
+            ids.discard(chunk_id)
+            if not ids:
+                del self._doc_chunks[doc_id]
+        self._total_length -= length
+
+    def sync_document(self, doc_id: str, chunks: dict):
+        """
+        doc_id의 색인을 chunks({chunk_id: (content, metadata)})와 같게 맞춥니다.
+        내용이 같은 청크(같은 ID)는 메타데이터만 갱신하고 다시 토큰화하지 않음. 반환값: (추가, 삭제) 개수
+        """
+        with self._lock:
+            self._ensure_loaded()
+            existing = self._doc_chunks.get(doc_id, set())
+            stale = [chunk_id for chunk_id in existing if chunk_id not in chunks]
+            added = [chunk_id for chunk_id in chunks if chunk_id not in existing]
+            moved = [chunk_id for chunk_id in chunks
+                     if chunk_id in existing and self._chunks[chunk_id][3] != chunks[chunk_id][1]]
+            if not (stale or added or moved):
+                return 0, 0
+
+            conn = self._conn()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("DELETE FROM keyword_chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in stale])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO keyword_chunks(chunk_id, doc_id, content, metadata) VALUES (?, ?, ?, ?)",
+                    [(chunk_id, doc_id, chunks[chunk_id][0], json.dumps(chunks[chunk_id][1], ensure_ascii=False))
+                     for chunk_id in added + moved]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            for chunk_id in stale:
+                self._remove(chunk_id)
+            for chunk_id in added:
+                content, metadata = chunks[chunk_id]
+                self._add(chunk_id, doc_id, content, metadata)
+            for chunk_id in moved:
+                doc, length, content, _ = self._chunks[chunk_id]
+                self._chunks[chunk_id] = (doc, length, content, chunks[chunk_id][1])
+            return len(added), len(stale)
+
+    def remove_document(self, doc_id: str):
+        self.sync_document(doc_id, {})
+
+    def doc_ids(self):
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._doc_chunks)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._chunks)
+
+    def search(self, query_text: str, n_results: int = 5):
+        """BM25 상위 n_results개 청크: [{"id", "content", "metadata", "score"}] (네트워크 호출 없음)"""
+        started = time.perf_counter()
+        terms = set(tokenize(query_text))
+        with self._lock:
+            self._ensure_loaded()
+            total = len(self._chunks)
+            scores = {}
+            if terms and total:
+                k1, b = self.k1, self.b
+                avg_length = self._total_length / total or 1.0
+                for term in terms:
+                    postings = self._postings.get(term)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for chunk_id, tf in postings.items():
+                        length = self._chunks[chunk_id][1]
+                        norm = tf + k1 * (1 - b + b * length / avg_length)
+                        scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (k1 + 1) / norm
+            top = heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+            results = [
+                {"id": chunk_id, "content": self._chunks[chunk_id][2], "metadata": dict(self._chunks[chunk_id][3]),
+                 "score": round(score, 4)}
+                for chunk_id, score in top
+            ]
+            elapsed = time.perf_counter() - started
+            self.searches += 1
+            self._search_seconds += elapsed
+            self.last_search_us = round(elapsed * 1e6, 1)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "documents": len(self._doc_chunks),
+                "chunks": len(self._chunks),
+                "terms": len(self._postings),
+                "searches": self.searches,
+                "search_avg_us": round(self._search_seconds / self.searches * 1e6, 1) if self.searches else 0.0,
+                "last_search_us": self.last_search_us,
+            }
+
+
+# Singleton instance
+keyword_index = KeywordIndex()
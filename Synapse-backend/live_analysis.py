@@ -0,0 +1,222 @@
+"""
+진행 중인 회의를 위한 증분 분석기.
+확정된 STT 세그먼트를 모아 두었다가, 잠시 새 발언이 없거나(debounce) 새 세그먼트가 충분히 쌓이면
+'지금까지의 상태(압축된 요약 + Action Item 목록)'와 '새 발언(delta)'만 보내 상태를 갱신합니다.
+전체 녹취록을 다시 보내지 않고, 응답도 바뀐 항목만 받으므로 갱신 비용은 회의 길이가 아니라 새 발언 양에 비례합니다.
+"""
+import os
+import asyncio
+from llm_gateway import estimate_tokens
+from map_reduce import speaker_label
+from chunking import format_timestamp
+
+DEBOUNCE_SECONDS = float(os.getenv("LIVE_ANALYSIS_DEBOUNCE_SECONDS", "8"))
+MAX_PENDING_SEGMENTS = int(os.getenv("LIVE_ANALYSIS_SEGMENTS", "12"))
+MAX_PENDING_TOKENS = int(os.getenv("LIVE_ANALYSIS_DELTA_TOKENS", "2000"))
+# 상태 요약의 최대 길이(글자). 매 갱신마다 이 안으로 다시 압축되므로 프롬프트 크기가 일정하게 유지됨
+SUMMARY_CHARS = int(os.getenv("LIVE_ANALYSIS_SUMMARY_CHARS", "800"))
+
+SYSTEM_INSTRUCTION_LIVE = f"""
+당신은 진행 중인 회의를 실시간으로 정리하는 회의록 분석가입니다.
+[현재 상태]에는 지금까지의 회의 요약과 Action Item 목록(#번호)이, [새 발언]에는 그 이후에 확정된 발언만 들어 있습니다.
+[새 발언]을 반영하여 상태를 갱신하세요. 이전 발언 원문은 제공되지 않으므로 [현재 상태]를 회의의 앞부분으로 간주합니다.
+
+**[갱신 규칙]**
+1. summary: 기존 요약에 새 내용을 통합한 서술형 요약. 전체 {SUMMARY_CHARS}자 이내로 다시 압축하되,
+   오래된 세부 사항은 줄이고 결정 사항과 남은 쟁점은 유지합니다.
+2. added: [새 발언]에서 새로 합의된 업무만 추가합니다. 단순 의견이나 아이디어는 제외합니다.
+3. updated: 기존 항목의 담당자/기한/우선순위/내용이 바뀌었으면 해당 번호(id)와 함께 항목 전체를 다시 씁니다.
+4. removed: [새 발언]에서 취소되었거나 "나중에 하자"로 보류된 항목의 번호 목록.
+5. 바뀌지 않은 항목은 절대 다시 출력하지 마세요.
+6. task는 행위 명사로 끝나는 개조식으로 쓰고('수정', '송부', '배포' 등), 날짜는 YYYY-MM-DD로 씁니다.
+
+**[JSON Structure]** - 다른 설명 없이 이 JSON만 출력하세요.
+{{
+    "summary": "갱신된 서술형 요약",
+    "added": [
+        {{"task": "...", "assignee": "...", "due_date": "YYYY-MM-DD", "priority": "Critical | High | Medium | Low", "reasoning": "..."}}
+    ],
+    "updated": [
+        {{"id": 1, "task": "...", "assignee": "...", "due_date": "YYYY-MM-DD", "priority": "...", "reasoning": "..."}}
+    ],
+    "removed": [2]
+}}
+"""
+
+
+def format_segments(segments) -> str:
+    """확정 세그먼트 -> '[mm:ss] 화자: 발언' 줄"""
+    return "\n".join(
+        f"[{format_timestamp(seg.start)}] {speaker_label(seg.speaker)}: {seg.text.strip()}"
+        for seg in segments if seg.text.strip()
+    )
+
+
+def _trim_summary(summary: str, limit: int) -> str:
+    """
+    요약이 limit를 넘으면 limit 안의 마지막 문장 끝에서 자릅니다.
+    (문장 끝을 찾을 수 없으면 문장 중간에서 자르지 않고 그대로 둠)
+    """
+    if len(summary) <= limit:
+        return summary
+    cut = max(summary.rfind(mark, 0, limit) for mark in (".", "!", "?", "。", "\n"))
+    return summary[:cut + 1].rstrip() if cut > 0 else summary
+
+
+def _parse_live_response(text):
+    """갱신 응답을 검증합니다. summary가 없으면 None (형식이 잘못된 Action Item만 버림)"""
+    from ai_service import clean_json_response, validate_action_item  # 순환 import 방지
+
+    data = clean_json_response(text)
+    if not isinstance(data, dict) or not isinstance(data.get("summary"), str):
+        return None
+
+    def items(key):
+        values = data.get(key)
+        return [v for v in values if isinstance(v, dict)] if isinstance(values, list) else []
+
+    updated = {}
+    for item in items("updated"):
+        validated = validate_action_item(item)
+        if validated and isinstance(item.get("id"), int):
+            updated[item["id"]] = validated
+    removed = data.get("removed")
+    return {
+        "summary": data["summary"],
+        "added": [v for v in (validate_action_item(item) for item in items("added")) if v],
+        "updated": updated,
+        "removed": {i for i in removed if isinstance(i, int)} if isinstance(removed, list) else set(),
+    }
+
+
+async def analyze_delta(state_text: str, delta_text: str):
+    """[현재 상태] + [새 발언]으로 한 번 갱신. 응답을 해석할 수 없으면 None"""
+    from ai_service import call_openai_api
+
+    full_prompt = f"[현재 상태]\n{state_text}\n\n[새 발언]\n{delta_text}"
+    response_text = await call_openai_api(full_prompt, SYSTEM_INSTRUCTION_LIVE)
+    return _parse_live_response(response_text)
+
+
+class LiveMeetingAnalyzer:
+    """
+    회의 하나의 실시간 분석 상태.
+    add_segment()로 확정 세그먼트를 넣으면 조건에 따라 백그라운드에서 갱신하고, 갱신될 때마다 on_update(snapshot)를 호출합니다.
+    - debounce: 마지막 세그먼트 후 debounce_seconds 동안 새 발언이 없으면 갱신
+    - 개수/분량: 대기 중인 세그먼트가 max_segments개 또는 max_tokens를 넘으면 바로 갱신
+    갱신은 한 번에 하나씩만 실행되며, 실행 중에 들어온 세그먼트는 다음 갱신에 포함됩니다.
+    """
+
+    def __init__(self, on_update=None, debounce_seconds: float = DEBOUNCE_SECONDS,
+                 max_segments: int = MAX_PENDING_SEGMENTS, max_tokens: int = MAX_PENDING_TOKENS):
+        self.on_update = on_update
+        self.debounce_seconds = debounce_seconds
+        self.max_segments = max_segments
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.action_items = {}     # id -> ActionItem dict (id는 회의 내내 유지)
+        self.analyzed_until = 0.0  # 상태에 반영된 마지막 발언 시각(초)
+        self.updates = 0
+        self._next_id = 1
+        self._pending = []
+        self._pending_tokens = 0
+        self._timer = None
+        self._running = set()  # 대기를 마치고 갱신(LLM 호출)을 실행 중인 작업
+        self._lock = asyncio.Lock()
+
+    def add_segment(self, segment):
+        if not segment.text.strip():
+            return
+        self._pending.append(segment)
+        self._pending_tokens += estimate_tokens(segment.text)
+        if len(self._pending) >= self.max_segments or self._pending_tokens >= self.max_tokens:
+            self._schedule(0)
+        else:
+            self._schedule(self.debounce_seconds)
+
+    def _schedule(self, delay: float):
+        # 아직 대기 중인 타이머만 다시 맞춤 (실행 중인 갱신은 취소하지 않음)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._delayed_update(delay))
+
+    async def _delayed_update(self, delay: float):
+        await asyncio.sleep(delay)
+        # 대기가 끝나면 새 세그먼트로는 취소되지 않는 실행 중 작업으로 옮김 (close()에서만 취소)
+        task = asyncio.current_task()
+        if self._timer is task:
+            self._timer = None
+        self._running.add(task)
+        try:
+            await self.update()
+        except Exception as e:
+            print(f"DEBUG: Live analysis update failed: {e}")
+        finally:
+            self._running.discard(task)
+
+    def state_text(self) -> str:
+        """LLM에 보내는 압축 상태. reasoning은 빼고 한 줄씩"""
+        lines = [f"[요약]\n{self.summary or '(아직 없음)'}", "[Action Items]"]
+        for item_id, item in self.action_items.items():
+            lines.append(f"#{item_id} {item['task']} | 담당: {item.get('assignee') or '-'} | "
+                         f"기한: {item.get('due_date') or '-'} | 우선순위: {item.get('priority') or '-'}")
+        if not self.action_items:
+            lines.append("(없음)")
+        return "\n".join(lines)
+
+    async def update(self):
+        """대기 중인 세그먼트를 상태에 반영합니다. 실패하면 세그먼트를 다음 갱신으로 넘김"""
+        async with self._lock:
+            delta, self._pending, self._pending_tokens = self._pending, [], 0
+            if not delta:
+                return None
+
+            result = await analyze_delta(self.state_text(), format_segments(delta))
+            if result is None:
+                print(f"DEBUG: Live analysis response unusable, keeping {len(delta)} segments for next update")
+                self._pending = delta + self._pending
+                self._pending_tokens = sum(estimate_tokens(seg.text) for seg in self._pending)
+                return None
+
+            self._apply(result)
+            self.analyzed_until = max(self.analyzed_until, delta[-1].end)
+            self.updates += 1
+            snapshot = self.snapshot()
+        if self.on_update:
+            await self.on_update(snapshot)
+        return snapshot
+
+    def _apply(self, result):
+        self.summary = _trim_summary(result["summary"], SUMMARY_CHARS * 2)
+        for item_id in result["removed"]:
+            self.action_items.pop(item_id, None)
+        for item_id, item in result["updated"].items():
+            if item_id in self.action_items:
+                self.action_items[item_id] = item
+        for item in result["added"]:
+            self.action_items[self._next_id] = item
+            self._next_id += 1
+
+    async def flush(self):
+        """회의 종료 시 남은 발언까지 반영한 최종 상태를 반환합니다."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.update()
+        return self.snapshot()
+
+    def close(self):
+        """연결이 끊긴 경우: 대기 중인 타이머와 실행 중인 갱신(LLM 호출)을 모두 취소합니다."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in list(self._running):
+            task.cancel()
+
+    def snapshot(self):
+        return {
+            "summary": self.summary,
+            "action_items": [{"id": item_id, **item} for item_id, item in self.action_items.items()],
+            "analyzed_until": self.analyzed_until,
+            "updates": self.updates,
+        }
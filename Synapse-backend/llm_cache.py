@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from cache_size import track_size, tracked_bytes, evict_lru
+
+CACHE_DB_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "llm_cache.db"))
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600          # 기본 7일
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+def make_cache_key(model: str, system_instruction: str, prompt: str, params: dict = None) -> str:
+    """(모델, 시스템 지시문, 프롬프트, 파라미터)의 SHA-256 해시"""
+    payload = json.dumps([model, system_instruction, prompt, params or {}], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLM 응답을 내용 해시로 저장하는 디스크 캐시 (SQLite).
+    - TTL이 지난 항목은 조회되지 않고 정리 시 삭제
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at)")
+        track_size(self._conn(), "responses")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._conn().execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str, model: str = None):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        self._conn().execute(
+            "INSERT INTO responses(key, model, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET model = excluded.model, response = excluded.response, size = excluded.size, "
+            "created_at = excluded.created_at, last_access = excluded.last_access",
+            (key, model, response, size, now, now)
+        )
+        self._evict(now)
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    async def aget(self, key: str):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, response: str, model: str = None):
+        await asyncio.to_thread(self.put, key, response, model)
+
+    def _evict(self, now: float):
+        conn = self._conn()
+        expired = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+        # 오래 사용되지 않은 순서로 초과분만큼 삭제 (전체 크기는 트리거가 유지하는 누적값으로 확인)
+        removed = evict_lru(conn, "responses", self.max_bytes)
+
+        with self._lock:
+            self.evictions += expired + removed
+
+    def stats(self):
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = tracked_bytes(conn, "responses")
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            }
+
+
+# Singleton instance
+llm_cache = LLMResponseCache()
@@ -0,0 +1,394 @@
+import os
+import time
+import random
+import asyncio
+import httpx
+from openai import AsyncOpenAI, APIStatusError, APIConnectionError, APITimeoutError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# HTTP 상태 코드 중 재시도할 가치가 있는 것들
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    TPM 제한용 토큰 수 추정. (정확한 값은 응답의 usage로 보정)
+    한국어는 대략 1~2자당 1토큰이므로 보수적으로 2자당 1토큰으로 계산합니다.
+    """
+    return max(1, len(text) // 2) if text else 1
+
+
+class TokenBucket:
+    """
+    분당 허용량(capacity_per_minute)을 가진 토큰 버킷.
+    acquire는 대기 순서대로(FIFO) 토큰을 할당하며, 실제 사용량과의 차이는 adjust로 보정합니다.
+    """
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        # 한 번에 버킷 용량보다 큰 요청이 와도 영원히 기다리지 않도록 제한
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """추정치와 실제 사용량의 차이를 반영합니다. (음수면 환급, 양수면 추가 차감)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LLMGateway:
+    """
+    프로세스 전체에서 공유하는 OpenAI 호출 게이트웨이.
+    - keep-alive 연결 풀을 가진 단일 AsyncOpenAI 클라이언트
+    - 동시 요청 수 제한(Semaphore)
+    - 분당 요청 수(RPM) / 분당 토큰 수(TPM) 토큰 버킷
+    - Retry-After 헤더를 따르는 지터 포함 백오프 (429 시 전체 호출을 잠시 멈춤)
+    - 시도별 timeout과 전체 deadline
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL,
+                 max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                 rpm: int = int(os.getenv("LLM_RPM", "500")),
+                 tpm: int = int(os.getenv("LLM_TPM", "200000")),
+                 timeout: float = float(os.getenv("LLM_TIMEOUT", "60")),
+                 max_backoff: float = 30.0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rpm = TokenBucket(rpm) if rpm > 0 else None
+        self._tpm = TokenBucket(tpm) if tpm > 0 else None
+        self._client = None
+        self._cooldown_until = 0.0
+
+        self.stats_counters = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "in_flight": 0,
+        }
+
+    @property
+    def client(self):
+        """최초 호출 시 한 번만 생성하여 연결을 재사용합니다. API 키가 없으면 None."""
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                print("Error: OPENAI_API_KEY not found in environment variables.")
+                return None
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=120,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            # 재시도는 게이트웨이가 직접 관리하므로 SDK 재시도는 끔
+            self._client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+        return self._client
+
+    async def complete(self, messages: list, model: str = None, retries: int = 3, base_delay: float = 1.0,
+                       timeout: float = None, deadline: float = None, **params):
+        """
+        Chat Completion을 호출하고 (text, usage)를 반환합니다. 실패하면 (None, None).
+        timeout: 시도 1회의 제한 시간(초) / deadline: time.monotonic() 기준 전체 마감 시각
+        """
+        client = self.client
+        if client is None:
+            return None, None
+
+        model = model or self.model
+        timeout = timeout or self.timeout
+        estimated = self._estimate(messages, params)
+        self.stats_counters["requests"] += 1
+
+        for attempt in range(retries):
+            remaining = await self._acquire(estimated, deadline)
+            if remaining is not None and remaining <= 0:
+                print("LLM Gateway: deadline exceeded before request")
+                break
+
+            attempt_timeout = timeout if remaining is None else min(timeout, max(remaining, 0.1))
+            try:
+                async with self._semaphore:
+                    self.stats_counters["in_flight"] += 1
+                    try:
+                        response = await asyncio.wait_for(
+                            client.chat.completions.create(
+                                model=model,
+                                messages=messages,
+                                timeout=attempt_timeout,
+                                **params
+                            ),
+                            timeout=attempt_timeout + 1
+                        )
+                    finally:
+                        self.stats_counters["in_flight"] -= 1
+
+                usage = getattr(response, "usage", None)
+                self._record_usage(usage, estimated)
+
+                text = response.choices[0].message.content
+                if not text:
+                    raise ValueError("Invalid API response structure.")
+                self.stats_counters["successes"] += 1
+                return text.strip(), usage
+
+            except (APIStatusError, APIConnectionError, APITimeoutError, asyncio.TimeoutError) as e:
+                wait = self._retry_wait(e, attempt, retries, base_delay, deadline)
+                if wait is None:
+                    break
+                await asyncio.sleep(wait)
+
+            except Exception as e:
+                print(f"Unexpected Error: {e}")
+                break
+
+        self.stats_counters["failures"] += 1
+        return None, None
+
+    async def stream(self, messages: list, model: str = None, retries: int = 3, base_delay: float = 1.0,
+                     timeout: float = None, **params):
+        """
+        Chat Completion을 stream=True로 호출하여 텍스트 조각을 도착하는 대로 yield하는 async generator.
+        첫 토큰을 받기 전의 실패만 재시도합니다. (이미 내보낸 내용은 되돌릴 수 없으므로)
+        timeout은 첫 토큰까지, 그리고 조각 사이의 최대 대기 시간입니다.
+        """
+        client = self.client
+        if client is None:
+            return
+
+        model = model or self.model
+        timeout = timeout or self.timeout
+        estimated = self._estimate(messages, params)
+        self.stats_counters["requests"] += 1
+
+        for attempt in range(retries):
+            await self._acquire(estimated)
+            started = False
+            try:
+                async with self._semaphore:
+                    self.stats_counters["in_flight"] += 1
+                    try:
+                        response = await asyncio.wait_for(
+                            client.chat.completions.create(
+                                model=model,
+                                messages=messages,
+                                stream=True,
+                                stream_options={"include_usage": True},
+                                timeout=timeout,
+                                **params
+                            ),
+                            timeout=timeout + 1
+                        )
+                        try:
+                            iterator = response.__aiter__()
+                            while True:
+                                try:
+                                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+                                except StopAsyncIteration:
+                                    break
+                                # include_usage 사용 시 마지막 청크는 choices 없이 usage만 포함
+                                self._record_usage(getattr(chunk, "usage", None), estimated)
+                                if not chunk.choices:
+                                    continue
+                                delta = chunk.choices[0].delta.content
+                                if delta:
+                                    started = True
+                                    yield delta
+                        finally:
+                            await response.close()
+                    finally:
+                        self.stats_counters["in_flight"] -= 1
+
+                if not started:
+                    raise ValueError("Empty streaming response.")
+                self.stats_counters["successes"] += 1
+                return
+
+            except (APIStatusError, APIConnectionError, APITimeoutError, asyncio.TimeoutError) as e:
+                if started:
+                    print(f"LLM Gateway: stream interrupted after first token: {e}")
+                    break
+                wait = self._retry_wait(e, attempt, retries, base_delay)
+                if wait is None:
+                    break
+                await asyncio.sleep(wait)
+
+            except Exception as e:
+                print(f"Unexpected Error: {e}")
+                break
+
+        self.stats_counters["failures"] += 1
+
+    async def embed(self, texts: list, model: str = EMBEDDING_MODEL, retries: int = 3, base_delay: float = 1.0,
+                    timeout: float = None):
+        """
+        Embeddings API를 호출하여 texts와 같은 순서의 벡터 목록을 반환합니다. 실패하면 None.
+        채팅 호출과 같은 연결 풀, 동시성 제한, RPM/TPM 버킷, 백오프를 사용합니다.
+        """
+        client = self.client
+        if client is None:
+            return None
+        if not texts:
+            return []
+
+        timeout = timeout or self.timeout
+        estimated = sum(estimate_tokens(t) for t in texts)
+        self.stats_counters["requests"] += 1
+
+        for attempt in range(retries):
+            await self._acquire(estimated)
+            try:
+                async with self._semaphore:
+                    self.stats_counters["in_flight"] += 1
+                    try:
+                        response = await asyncio.wait_for(
+                            client.embeddings.create(model=model, input=texts, timeout=timeout),
+                            timeout=timeout + 1
+                        )
+                    finally:
+                        self.stats_counters["in_flight"] -= 1
+
+                self._record_usage(getattr(response, "usage", None), estimated)
+                self.stats_counters["successes"] += 1
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+            except (APIStatusError, APIConnectionError, APITimeoutError, asyncio.TimeoutError) as e:
+                wait = self._retry_wait(e, attempt, retries, base_delay)
+                if wait is None:
+                    break
+                await asyncio.sleep(wait)
+
+            except Exception as e:
+                print(f"Unexpected Error: {e}")
+                break
+
+        self.stats_counters["failures"] += 1
+        return None
+
+    def stats(self):
+        return dict(self.stats_counters, max_concurrency=self.max_concurrency)
+
+    async def aclose(self):
+        """서버 종료 시 연결 풀을 닫습니다."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    # --- 내부 로직 ---
+
+    @staticmethod
+    def _estimate(messages: list, params: dict) -> int:
+        return sum(estimate_tokens(m.get("content", "")) for m in messages) + params.get("max_tokens", 1000)
+
+    async def _acquire(self, estimated: int, deadline: float = None):
+        """cool-down과 RPM/TPM 버킷을 통과한 뒤 deadline까지 남은 시간을 반환합니다."""
+        await self._wait_cooldown(deadline)
+        remaining = self._remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            return remaining
+        if self._rpm:
+            await self._rpm.acquire(1)
+        if self._tpm:
+            await self._tpm.acquire(estimated)
+        return self._remaining(deadline)
+
+    def _record_usage(self, usage, estimated: int):
+        if usage is None:
+            return
+        self.stats_counters["prompt_tokens"] += usage.prompt_tokens
+        # Embeddings 응답의 usage에는 completion_tokens가 없음
+        self.stats_counters["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        if self._tpm:
+            self._tpm.adjust(usage.total_tokens - estimated)
+
+    def _retry_wait(self, error, attempt: int, retries: int, base_delay: float, deadline: float = None):
+        """재시도할 경우 대기 시간(초)을, 포기해야 하면 None을 반환합니다."""
+        retry_after = self._retry_after(error)
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            self.stats_counters["rate_limited"] += 1
+            if retry_after:
+                # 서버가 알려준 시간 동안 다른 호출도 보내지 않음
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+
+        retryable = status is None or status in _RETRYABLE_STATUS or status >= 500
+        print(f"API Call Failed (Attempt {attempt+1}/{retries}): {error}")
+        if not retryable or attempt == retries - 1:
+            return None
+
+        wait = self._backoff(attempt, base_delay, retry_after)
+        remaining = self._remaining(deadline)
+        if remaining is not None and wait >= remaining:
+            print("LLM Gateway: deadline would be exceeded by backoff, giving up")
+            return None
+        self.stats_counters["retries"] += 1
+        return wait
+
+    def _backoff(self, attempt: int, base_delay: float, retry_after: float = None) -> float:
+        if retry_after:
+            return retry_after + random.uniform(0, 0.25 * retry_after + 0.1)
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.max_backoff, base_delay * (2 ** attempt))) + base_delay * 0.1
+
+    async def _wait_cooldown(self, deadline: float = None):
+        wait = self._cooldown_until - time.monotonic()
+        if wait <= 0:
+            return
+        remaining = self._remaining(deadline)
+        if remaining is not None:
+            wait = min(wait, max(remaining, 0))
+        await asyncio.sleep(wait)
+
+    @staticmethod
+    def _remaining(deadline: float = None):
+        return None if deadline is None else deadline - time.monotonic()
+
+    @staticmethod
+    def _retry_after(error):
+        """응답 헤더의 retry-after-ms / retry-after 값을 초 단위로 반환합니다."""
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            return None  # HTTP-date 형식은 무시하고 기본 백오프 사용
+        return None
+
+
+# Singleton instance
+llm_gateway = LLMGateway()
@@ -1,14 +1,29 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import (FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Response, Query, Request, WebSocket,
+                     WebSocketDisconnect)
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
-import shutil
 import os
 import asyncio
 import json
-from models import Message, ChatResponse, AnalyzeRequest
+import hashlib
+from typing import Optional
+from models import Message, ChatResponse, AnalyzeRequest, AnalysisMode
 from data import FOLDER_DATA
-from transcribe import transcribe_audio_file
-from ai_service import analyze_action_items, analyze_digital_board, chat_with_ai, select_relevant_files, generate_summary
+from catalog import storage_catalog
+from storage_engine import storage
+from record_cache import record_cache
+from llm_gateway import llm_gateway
+from llm_cache import llm_cache
+from singleflight import analysis_flight, content_key
+from jobs import job_pipeline, TERMINAL_STATUSES
+from transcribe import atranscribe_audio_file, atranscribe_upload, result_to_dict, stt_client
+from stt_cache import stt_cache
+from embedding_cache import embedding_cache
+from audio_ingest import AudioUpload, UploadTooLarge
+from live_analysis import LiveMeetingAnalyzer
+from ai_service import (analyze_digital_board, chat_with_ai, chat_with_ai_stream, select_relevant_files, analyze_meeting,
+                        analyze_meeting_stream, DEFAULT_ANALYSIS_MODE)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,106 +43,199 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+HISTORY_FOLDER = "분석 기록"
+
+@app.on_event("startup")
+async def build_storage_catalog():
+    """서버 시작 시 레거시 JSON 기록을 DB로 가져오고 카탈로그를 한 번 구성합니다."""
+    storage.migrate_legacy_json()
+    storage_catalog.build()
+    print(f"DEBUG: Storage catalog built ({len(storage_catalog)} files)")
+
+@app.on_event("startup")
+async def start_job_pipeline():
+    """작업 큐 워커를 띄우고 재시작 전에 끝나지 않은 작업을 이어서 처리합니다."""
+    await job_pipeline.start()
+
+@app.on_event("startup")
+async def load_keyword_index():
+    """RAG 키워드 색인(BM25)을 메모리에 올리고, 벡터 DB에만 있는 청크가 있으면 채웁니다."""
+    try:
+        from vector_store import vector_db
+        await asyncio.to_thread(vector_db.sync_keyword_index)
+    except Exception as e:
+        print(f"DEBUG: Keyword index sync failed: {e}")
+
+@app.on_event("shutdown")
+async def stop_job_pipeline():
+    await job_pipeline.stop()
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    await llm_gateway.aclose()
+    if hasattr(stt_client, "aclose"):
+        await stt_client.aclose()
+
 @app.get("/api/folders")
-async def get_folders():
+async def get_folders(response: Response, cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=500)):
     """폴더 및 파일 목록 데이터를 반환합니다."""
     # 기본 데이터 복사
     current_data = FOLDER_DATA.copy()
-    
-    # storage 폴더 스캔하여 '분석 기록' 폴더 동적 생성
-    storage_dir = os.path.join(os.path.dirname(__file__), "storage")
-    if not os.path.exists(storage_dir):
-        os.makedirs(storage_dir)
-        
-    history_files = []
-    try:
-        # 파일 목록 읽기 (내림차순 정렬)
-        files = sorted(os.listdir(storage_dir), reverse=True)
-        for idx, filename in enumerate(files):
-            if filename.endswith(".json"):
-                # 파일명에서 날짜 추출 시도 (텍스트분석_2025_12_07_...,json)
-                date_str = "Unknown"
-                date_str = "Unknown"
-                if filename.startswith("텍스트분석_"):
-                    # "텍스트분석_" 제거하고 확장자 제거
-                    parts = filename.replace("텍스트분석_", "").replace(".json", "") 
-                    # 가독성 좋게 변환 (2025_12_07_19시10분 -> 2025.12.07 19:10)
-                    date_str = parts.replace("_", ".", 2).replace("_", " ") 
-                elif filename.startswith("음성파일_"):
-                    # "음성파일_" 제거
-                    parts = filename.replace("음성파일_", "").replace(".json", "")
-                    date_str = parts.replace("_", ".", 2).replace("_", " ")
-
-                history_files.append({
-                    "id": 1000 + idx, # 임시 ID
-                    "title": filename, # 파일명 자체를 타이틀로 (또는 내부 json 읽어서 요약 표시 가능)
-                    "date": date_str,
-                    "type": "history" # 구분값
-                })
-    except Exception as e:
-        print(f"Storage scan error: {e}")
-        
-    current_data["분석 기록"] = history_files
-    
+
+    # '분석 기록' 폴더는 메모리 카탈로그에서 조회 (cursor/limit으로 페이지네이션)
+    current_data[HISTORY_FOLDER] = _list_history(response, cursor, limit)
+
     return current_data
 
 @app.get("/api/folders/{folder_name}/files")
-async def get_folder_files(folder_name: str):
+async def get_folder_files(folder_name: str, response: Response, cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=500)):
     """특정 폴더의 파일 목록을 반환합니다."""
-    # get_folders 로직 재사용하거나 별도 로직 구현
-    # 여기서는 get_folders 호출해서 필터링 (간단 구현)
-    all_folders = await get_folders()
-    files = all_folders.get(folder_name)
-    
+    if folder_name == HISTORY_FOLDER:
+        return _list_history(response, cursor, limit)
+
+    files = FOLDER_DATA.get(folder_name)
     if files is None:
         raise HTTPException(status_code=404, detail="Folder not found")
     return files
 
+def _list_history(response: Response, cursor: Optional[str], limit: Optional[int]):
+    """카탈로그에서 한 페이지를 읽고, 다음 페이지 커서는 X-Next-Cursor 헤더로 전달합니다."""
+    try:
+        items, next_cursor = storage_catalog.list(cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
 @app.get("/api/history/{filename}")
-async def get_history_file(filename: str):
-    """저장된 분석 결과 파일을 읽어서 반환합니다."""
-    storage_dir = os.path.join(os.path.dirname(__file__), "storage")
-    file_path = os.path.join(storage_dir, filename)
-    
-    if not os.path.exists(file_path):
+async def get_history_file(filename: str, request: Request, fields: Optional[str] = None):
+    """
+    저장된 분석 결과를 읽어서 반환합니다.
+    fields=summary,action_items 처럼 필요한 키만 요청할 수 있으며, 원본 스크립트(raw_script)는
+    fields에 명시했을 때만 읽습니다. (fields 생략 시 기존처럼 전체 반환)
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    revision = storage.get_revision(filename)
+    if revision is None:
         raise HTTPException(status_code=404, detail="File not found")
-        
+
+    etag = _make_etag(filename, revision, field_list)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
+        data = load_analysis(filename, revision=revision, fields=field_list)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat_api(message: Message):
-    """AI 채팅 응답 API (RAG 적용)"""
+    if data is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return JSONResponse(content=data, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/api/history/{filename}/transcript")
+async def get_history_transcript(filename: str, request: Request):
+    """원본 스크립트만 반환합니다. (상세 화면에서 펼칠 때 지연 로딩)"""
+    revision = storage.get_revision(filename)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = _make_etag(filename, revision, ["raw_script"])
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    transcript = storage.get_transcript(filename)
+    return JSONResponse(content={"raw_script": transcript}, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def load_analysis(filename: str, revision: Optional[int] = None, fields: Optional[list] = None):
+    """
+    분석 기록을 읽습니다. 스크립트를 제외한 파싱 결과는 LRU 캐시(record_cache)에서 재사용하고,
+    캐시 항목은 기록의 revision이 바뀌면 버립니다. raw_script는 요청된 경우에만 따로 읽습니다.
+    """
+    if revision is None:
+        revision = storage.get_revision(filename)
+        if revision is None:
+            return None
+
+    record = record_cache.get(filename, revision)
+    if record is None:
+        record = storage.get_analysis(filename, include_transcript=False)
+        if record is None:
+            return None
+        record_cache.put(filename, revision, record)
+
+    want_script = "raw_script" in fields if fields is not None else True
+    data = {k: record[k] for k in fields if k in record} if fields is not None else dict(record)
+    if want_script:
+        transcript = storage.get_transcript(filename)
+        if transcript is not None:
+            data["raw_script"] = transcript
+    return data
+
+@app.get("/api/stats/cache")
+async def get_cache_stats():
+    """캐시 적중률 등 통계를 반환합니다."""
+    return {
+        "record_cache": record_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "stt_cache": stt_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "analysis_flight": analysis_flight.stats(),
+    }
+
+@app.get("/api/stats/retrieval")
+async def get_retrieval_stats():
+    """RAG 검색 단계별(임베딩/검색) 소요 시간과 키워드 색인 통계를 반환합니다."""
+    from vector_store import vector_db
+    return vector_db.stats()
+
+@app.get("/api/search")
+async def search_meetings(q: str, mode: str = "keyword", limit: int = Query(5, ge=1, le=50)):
+    """
+    회의 내용 검색. 기본(keyword)은 로컬 BM25 색인만 사용하므로 임베딩/네트워크 호출 없이 바로 응답합니다.
+    hybrid는 벡터 검색 결과와 RRF로 합치고, vector는 벡터 검색만 사용합니다.
+    """
+    from vector_store import vector_db, RETRIEVAL_MODES
+    if mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(RETRIEVAL_MODES)}")
+    results = await vector_db.asearch(q, n_results=limit, mode=mode)
+    return {"query": q, "mode": mode, "results": results}
+
+@app.get("/api/stats/llm")
+async def get_llm_stats():
+    """LLM 게이트웨이 호출/재시도/토큰 사용량 통계를 반환합니다."""
+    return llm_gateway.stats()
+
+def _make_etag(filename: str, revision: int, field_list: Optional[list]):
+    """기록의 쓰기 시퀀스 + 요청한 필드 조합으로 ETag를 만듭니다."""
+    projection = ",".join(field_list) if field_list is not None else "*"
+    digest = hashlib.sha1(f"{filename}|{revision}|{projection}".encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+def _etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def build_chat_context(message: Message) -> str:
+    """채팅 요청의 context_files 설정(auto / none / 파일 목록 / 최신)에 따라 회의록 컨텍스트를 만듭니다."""
     user_msg = message.message
     
-    # 1. 컨텍스트 로드
     context = ""
-    storage_dir = os.path.join(os.path.dirname(__file__), "storage")
     
     target_files = []
     if message.context_files:
         if "auto" in message.context_files:
              # [Auto Mode] AI가 직접 파일 선택
-             # 1. 모든 파일의 요약본 읽기
-             file_summaries = []
-             if os.path.exists(storage_dir):
-                 for fname in os.listdir(storage_dir):
-                     if fname.endswith(".json"):
-                         try:
-                            with open(os.path.join(storage_dir, fname), "r", encoding="utf-8") as f:
-                                d = json.load(f)
-                                file_summaries.append({
-                                    "filename": fname,
-                                    "summary": d.get("summary", "요약 없음"),
-                                    "date": d.get("date", "날짜 없음") # date 필드는 없을 수도 있음
-                                })
-                         except: pass
+             # 1. 요약 매니페스트에서 모든 파일의 요약본 읽기 (분석 JSON 전체를 열지 않음)
+             file_summaries = storage_catalog.summaries()
              
              # 2. AI에게 관련 파일 추천받기
              if file_summaries:
@@ -145,41 +253,50 @@ async def chat_api(message: Message):
              # 사용자가 선택한 파일들 (리스트)
              for fname in message.context_files:
                  if fname == "latest": continue
-                 if os.path.exists(os.path.join(storage_dir, fname)):
+                 if storage_catalog.get(fname):
                      target_files.append(fname)
     
     is_auto_mode = "auto" in message.context_files
     is_none_mode = "none" in message.context_files
 
-    if not target_files and not is_none_mode and not is_auto_mode and os.path.exists(storage_dir):
-        files = sorted(os.listdir(storage_dir), reverse=True)
-        if files:
-            target_files = [files[0]]
+    if not target_files and not is_none_mode and not is_auto_mode:
+        latest, _ = storage_catalog.list(limit=1)
+        if latest:
+            target_files = [latest[0]["title"]]
 
     if target_files:
         context_list = []
         for fname in target_files:
             try:
-                with open(os.path.join(storage_dir, fname), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    summary = data.get("summary", "없음")
-                    action_items = data.get("action_items", [])
-                    suggestions = data.get("suggestions", [])
-                    
-                    file_context = f"""
-                    [파일: {fname}]
-                    - 요약: {summary}
-                    - Action Items: {json.dumps(action_items, ensure_ascii=False)}
-                    - AI 제안: {json.dumps(suggestions, ensure_ascii=False)}
-                    """
-                    context_list.append(file_context)
+                data = load_analysis(fname, fields=["summary", "action_items", "suggestions"])
+                if data is None:
+                    continue
+                summary = data.get("summary", "없음")
+                action_items = data.get("action_items", [])
+                suggestions = data.get("suggestions", [])
+                
+                file_context = f"""
+                [파일: {fname}]
+                - 요약: {summary}
+                - Action Items: {json.dumps(action_items, ensure_ascii=False)}
+                - AI 제안: {json.dumps(suggestions, ensure_ascii=False)}
+                """
+                context_list.append(file_context)
             except Exception as e:
                 print(f"Context loading error for {fname}: {e}")
         
         context = "\n".join(context_list)
 
+    return context
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat_api(message: Message):
+    """AI 채팅 응답 API (RAG 적용)"""
+    # 1. 컨텍스트 로드
+    context = await build_chat_context(message)
+
     # 2. AI 답변 생성
-    ai_response = await chat_with_ai(user_msg, context)
+    ai_response = await chat_with_ai(message.message, context)
     
     if not ai_response:
         return {
@@ -190,20 +307,93 @@ async def chat_api(message: Message):
     
     return ai_response
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_api(message: Message):
+    """
+    AI 채팅 응답 스트리밍 API (Server-Sent Events).
+    event: thought / answer  -> {"delta": "..."} 생성되는 대로 전송
+    event: sources           -> {"sources": [...]}
+    event: done              -> /api/chat과 같은 형식의 최종 응답
+    """
+    context = await build_chat_context(message)
+
+    async def event_stream():
+        final = None
+        try:
+            async for kind, key, value in chat_with_ai_stream(message.message, context):
+                if kind == "delta" and key in ("thought", "answer"):
+                    yield _sse(key, {"delta": value})
+                elif kind == "field" and key == "sources":
+                    yield _sse("sources", {"sources": value if isinstance(value, list) else []})
+                elif kind == "done":
+                    final = value
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+
+        if final is None:
+            final = {
+                "thought": None,
+                "answer": "죄송합니다. AI 서비스에 연결할 수 없습니다.",
+                "sources": []
+            }
+        yield _sse("done", final)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 응답을 모아서 보내지 않도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/analyze")
 async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTasks):
     """텍스트를 받아 Action Item 분석 결과를 반환하고 저장합니다."""
     text = request.text
-    print(f"DEBUG: Starting Analysis for text (len={len(text)})")
-    
-    # [Pipeline Stage 1 & 2]: Run concurrently
-    # Action Items(JSON)과 Summary(Text)를 동시에 요청
-    structure_task = asyncio.create_task(analyze_action_items(text))
-    summary_task = asyncio.create_task(generate_summary(text))
-    
-    structure_data, narrative_summary = await asyncio.gather(structure_task, summary_task)
+
+    # 같은 텍스트에 대한 동시 요청(중복 클릭, 재시도 폭주)은 하나의 분석/저장 작업으로 합침
+    mode = request.mode or DEFAULT_ANALYSIS_MODE
+    key = content_key("analyze", text, request.source_type, mode, request.use_cache)
+    result, shared = await analysis_flight.do(
+        key, lambda: _run_text_analysis(text, request.source_type, request.use_cache, mode)
+    )
+
+    if shared:
+        print(f"DEBUG: Coalesced duplicate analysis request ({result['saved_filename']})")
+    else:
+        # 인덱싱은 작업을 시작한 요청만 한 번 예약
+        background_tasks.add_task(index_analysis, result["saved_filename"], text)
+    return dict(result)
+
+async def _run_text_analysis(text: str, source_type: str, use_cache: bool, mode: str):
+    """Action Item + 요약 분석 후 결과를 저장합니다. (중복 요청 간에 공유되는 작업)"""
+    print(f"DEBUG: Starting Analysis for text (len={len(text)}, mode={mode})")
     
+    # [Pipeline Stage 1 & 2]
+    # split: Action Items(JSON)과 Summary(Text)를 동시에 요청
+    # fused: 한 번의 호출로 보드까지 함께 받아옴 (실패 시 split으로 대체)
+    structure_data, narrative_summary, board = await analyze_meeting(
+        text, mode=mode, use_cache=use_cache, include_board=(mode == "fused")
+    )
+    final_result = build_analysis_result(text, structure_data, narrative_summary, board)
+
+    # [저장 로직]
+    # 저장은 DB 트랜잭션으로 바로 수행하여 충돌 없는 기록 이름을 발급받고,
+    # 느린 벡터 인덱싱은 호출 측에서 BackgroundTasks로 넘겨 응답 속도 유지
+    filename = await asyncio.to_thread(save_analysis, final_result, text, source_type)
+
+    final_result["saved_filename"] = filename
+    return final_result
+
+def build_analysis_result(text, structure_data, narrative_summary, board=None, source_type="text"):
+    """
+    분석 결과를 저장/응답용 레코드로 합칩니다.
+    source_type="audio"면 음성 기록용 키워드를 쓰고, 분석 실패 시 더미 데이터 대신 '분석 실패' 레코드를 만듭니다.
+    """
     final_result = {}
+    is_audio = source_type == "audio"
     
     if structure_data:
         # 1. Action Items Parsing
@@ -219,14 +409,24 @@ async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTask
 
         # 3. Merge Results
         final_result = {
-            "summary": narrative_summary if narrative_summary else "요약 생성에 실패했습니다.",
-            "keywords": ["AI분석", "Pipeline", "Async"], 
+            "summary": narrative_summary if narrative_summary else ("요약 생성 실패" if is_audio else "요약 생성에 실패했습니다."),
+            "keywords": ["음성인식", "자동분석"] if is_audio else ["AI분석", "Pipeline", "Async"],
             "action_items": action_strings,
             "suggestions": suggestions,
             "sentiment": "Neutral",
             "raw_json": raw_actions,
             "raw_script": text # [NEW] 원본 스크립트 저장
         }
+        if board:
+            final_result["board"] = board
+    elif is_audio:
+        final_result = {
+            "summary": "분석 실패",
+            "keywords": [],
+            "action_items": [],
+            "sentiment": "Neutral",
+            "raw_script": text
+        }
     else:
         # Fallback
         summary = f"입력하신 텍스트({len(text)}자)에 대한 분석 결과입니다. (AI 호출 실패 -> 더미 데이터)"
@@ -239,170 +439,366 @@ async def analyze_text(request: AnalyzeRequest, background_tasks: BackgroundTask
             "action_items": action_items,
             "sentiment": "Positive"
         }
-    
-    # [파일 저장 및 인덱싱 로직]
-    # BackgroundTasks를 사용하여 응답 속도 향상
-    # [MODIFIED] 파일명을 미리 생성하여 반환 (source_type 반영)
-    from datetime import datetime
-    now = datetime.now()
-    
-    prefix = "텍스트분석_"
-    if request.source_type == "audio":
-        prefix = "음성파일_"
-        
-    filename = f"{prefix}{now.strftime('%Y_%m_%d_%H시%M분')}.json"
-    
-    background_tasks.add_task(save_and_index_analysis, final_result, text, filename)
-
-    final_result["saved_filename"] = filename
     return final_result
 
-def save_and_index_analysis(final_result, original_text, filename):
-    """분석 결과를 저장하고 RAG를 위해 벡터 DB에 인덱싱합니다. (Background Task)"""
-    try:
-        # from datetime import datetime -> 상위로 이동됨
-        # filename 생성 로직 상위로 이동됨 (인자로 받음)
-        
-        storage_dir = os.path.join(os.path.dirname(__file__), "storage")
-        if not os.path.exists(storage_dir):
-            os.makedirs(storage_dir)
-            
-        save_path = os.path.join(storage_dir, filename)
-        
-        # 1. JSON 파일 저장
-        with open(save_path, "w", encoding="utf-8") as f:
-            json.dump(final_result, f, ensure_ascii=False, indent=4)
-        print(f"DEBUG: Saved analysis to {filename}")
+@app.post("/api/analyze/stream")
+async def analyze_text_stream(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+    """
+    /api/analyze의 점진적 응답 버전 (NDJSON, 한 줄에 이벤트 하나).
+    Action Item / 제안 / 보드 항목은 생성되는 즉시 전송하고,
+    마지막 줄 {"type": "done", "result": ...}은 저장까지 마친 /api/analyze와 같은 형식의 결과입니다.
+    분석/저장 중 오류가 나면 마지막 줄은 {"type": "error", "detail": ...}이며 기록은 저장하지 않습니다.
+    """
+    text = request.text
+    mode = request.mode or DEFAULT_ANALYSIS_MODE
+    saved = {}
 
-        # 2. RAG Indexing
+    async def event_stream():
+        complete = None
         try:
-            from vector_store import vector_db
-            print(f"DEBUG: Indexing document {filename} to VectorDB...")
-            vector_db.add_document(
-                doc_id=filename,
-                text=original_text,
-                metadata={"date": datetime.now().strftime('%Y-%m-%d'), "title": filename}
-            )
-            print("DEBUG: Indexing successful.")
-        except Exception as ve:
-            print(f"VectorDB Indexing Error: {ve}")
+            async for event in analyze_meeting_stream(text, mode=mode, use_cache=request.use_cache,
+                                                      include_board=(mode == "fused")):
+                if event["type"] == "complete":
+                    complete = event
+                    continue
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+            if complete is None:
+                raise RuntimeError("Analysis stream ended without a result")
 
-    except Exception as e:
-        print(f"Error in background save/index task: {e}")
+            final_result = build_analysis_result(text, complete["structure"], complete["summary"], complete["board"])
+            filename = await asyncio.to_thread(save_analysis, final_result, text, request.source_type)
+        except Exception as e:
+            # 연결을 그냥 끊지 않고 종료 이벤트로 알림 (클라이언트는 받은 항목을 버리거나 다시 요청)
+            print(f"Analysis stream error: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+            return
+
+        final_result["saved_filename"] = saved["filename"] = filename
+        yield json.dumps({"type": "done", "result": final_result}, ensure_ascii=False) + "\n"
+
+    def index_saved():
+        # 기록 이름은 스트림이 끝나야 정해지므로 전송 완료 후에 조회 (클라이언트가 중간에 끊으면 저장/인덱싱 없음)
+        if "filename" in saved:
+            index_analysis(saved["filename"], text)
+
+    background_tasks.add_task(index_saved)
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        background=background_tasks,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def save_analysis(final_result, original_text, source_type="text", idempotency_key=None):
+    """
+    분석 결과와 원본 스크립트를 저장소에 원자적으로 저장하고 기록 이름을 반환합니다.
+    idempotency_key가 같으면 새 기록을 만들지 않고 이전에 저장한 기록을 덮어씀
+    """
+    filename = storage.save_analysis(final_result, source_type=source_type, transcript=original_text,
+                                     idempotency_key=idempotency_key)
+    record_cache.invalidate(filename)
+    storage_catalog.sync()
+    print(f"DEBUG: Saved analysis to {filename}")
+    return filename
+
+def index_analysis(filename, original_text, segments=None):
+    """
+    저장된 분석 결과를 RAG를 위해 벡터 DB에 인덱싱합니다. (Background Task)
+    STT 세그먼트가 있으면 발언 단위로 묶고 시각/화자를 함께 저장하여 검색 결과에 [mm:ss] 화자: 형식으로 표시됨
+    """
+    try:
+        from vector_store import vector_db
+        print(f"DEBUG: Indexing document {filename} to VectorDB...")
+        vector_db.add_document(
+            doc_id=filename,
+            text=original_text,
+            metadata={"date": datetime.now().strftime('%Y-%m-%d'), "title": filename},
+            segments=segments
+        )
+        print("DEBUG: Indexing successful.")
+    except Exception as ve:
+        print(f"VectorDB Indexing Error: {ve}")
 
 @app.post("/api/analyze/board")
 async def analyze_board(request: AnalyzeRequest):
     """텍스트를 받아 디지털 보드(주제/결정/질문) 데이터를 반환합니다."""
     # 이제 analyze_digital_board는 async 함수이므로 await 필요
-    result = await analyze_digital_board(request.text)
+    # 같은 텍스트의 동시 요청은 하나의 LLM 호출로 합침
+    mode = request.mode or DEFAULT_ANALYSIS_MODE
+    key = content_key("board", request.text, mode, request.use_cache)
+    result, _ = await analysis_flight.do(key, lambda: _run_board_analysis(request.text, request.use_cache, mode))
     if not result:
         return {"error": "AI analysis failed"}
     return result
 
+async def _run_board_analysis(text: str, use_cache: bool, mode: str):
+    """fused 모드에서는 /api/analyze와 같은 통합 호출(캐시 공유)에서 보드만 꺼내 씁니다."""
+    if mode == "fused":
+        _, _, board = await analyze_meeting(text, mode="fused", use_cache=use_cache, include_board=True)
+        return board
+    return await analyze_digital_board(text, use_cache=use_cache)
+
 @app.post("/api/transcribe")
 async def transcribe_api(file: UploadFile = File(...)):
     """오디오 파일을 업로드 받아 STT 변환 결과를 반환합니다."""
-    temp_file = f"temp_{file.filename}"
-    
     try:
-        # 업로드된 파일을 임시 파일로 저장
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # STT 변환 수행
-        result = transcribe_audio_file(temp_file)
+        # 업로드 본문을 임시 파일로 복사하지 않고 조각 단위로 STT에 전달
+        result = await atranscribe_upload(AudioUpload(file))
         
-        # 결과 반환 (JSON 직렬화 가능한 형태로 변환 필요할 수 있음)
-        return {
-            "full_text": result.full_text,
-            "segments": [
-                {
-                    "start": seg.start,
-                    "end": seg.end,
-                    "text": seg.text,
-                    "speaker": seg.speaker
-                } for seg in result.segments
-            ],
-            "duration": result.duration
-        }
+        # 결과 반환 (JSON 직렬화 가능한 형태로 변환)
+        return result_to_dict(result)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # 임시 파일 삭제
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
 
 @app.post("/api/process_audio")
-async def process_audio_api(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def process_audio_api(background_tasks: BackgroundTasks, file: UploadFile = File(...), use_cache: bool = True,
+                            mode: Optional[AnalysisMode] = None):
     """
     오디오 파일을 업로드 받아 STT -> 텍스트 분석 -> 결과 저장 과정을 일괄 처리합니다.
     """
-    temp_file = f"temp_process_{file.filename}"
-    
     try:
-        # 1. 파일 임시 저장
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # 2. STT 변환
+        # 1~2. 업로드 본문을 조각 단위로 STT에 전달 (작업 디렉토리에 임시 파일을 만들지 않음)
         print(f"DEBUG: Starting STT for {file.filename}")
-        stt_result = transcribe_audio_file(temp_file)
+        stt_result = await atranscribe_upload(AudioUpload(file), use_cache=use_cache)
         full_text = stt_result.full_text
         print(f"DEBUG: STT Complete. Length: {len(full_text)}")
         
         if not full_text:
              raise HTTPException(status_code=400, detail="STT returned empty text")
 
-        # 3. 텍스트 분석 (Action Items & Summary)
-        # analyze_text 로직과 유사하지만 여기서 직접 호출하여 통합
-        structure_task = asyncio.create_task(analyze_action_items(full_text))
-        summary_task = asyncio.create_task(generate_summary(full_text))
-        
-        structure_data, narrative_summary = await asyncio.gather(structure_task, summary_task)
-        
-        final_result = {}
-        if structure_data:
-            raw_actions = structure_data.get("action_items", [])
-            action_strings = [
-                f"{item['task']} (담당: {item['assignee']}, 기한: {item['due_date']})"
-                for item in raw_actions
-            ]
-            suggestions = structure_data.get("suggestions", [])
-            
-            final_result = {
-                "summary": narrative_summary if narrative_summary else "요약 생성 실패",
-                "keywords": ["음성인식", "자동분석"], 
-                "action_items": action_strings,
-                "suggestions": suggestions,
-                "sentiment": "Neutral",
-                "raw_json": raw_actions,
-                "raw_script": full_text
-            }
-        else:
-            final_result = {
-                "summary": "분석 실패",
-                "keywords": [],
-                "action_items": [],
-                "sentiment": "Neutral",
-                "raw_script": full_text
-            }
-            
-        # 4. 결과 저장 및 인덱싱 (백그라운드)
-        from datetime import datetime
-        now = datetime.now()
-        filename = f"음성파일_{now.strftime('%Y_%m_%d_%H시%M분')}.json"
-        
-        background_tasks.add_task(save_and_index_analysis, final_result, full_text, filename)
-        
-        final_result["saved_filename"] = filename
+        # 3. 텍스트 분석 (Action Items & Summary) 및 결과 저장 (즉시)
+        final_result = await _run_audio_analysis(full_text, stt_result.segments, use_cache, mode)
+        final_result["saved_filename"] = await asyncio.to_thread(save_analysis, final_result, full_text, "audio")
+
+        # 4. 인덱싱 (백그라운드)
+        background_tasks.add_task(index_analysis, final_result["saved_filename"], full_text, stt_result.segments)
         return final_result
 
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"Process Audio Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+async def _run_audio_analysis(full_text: str, segments, use_cache: bool, mode: Optional[str],
+                              require_structure: bool = False):
+    """
+    STT 결과를 분석해 저장용 레코드를 만듭니다. (/api/process_audio와 작업 큐의 analysis 단계가 공유)
+    require_structure=True면 Action Item 분석이 실패했을 때 '분석 실패' 레코드 대신 예외를 던짐 (작업 큐 재시도용)
+    """
+    mode = mode or DEFAULT_ANALYSIS_MODE
+    structure_data, narrative_summary, board = await analyze_meeting(
+        full_text, mode=mode, use_cache=use_cache, include_board=(mode == "fused"),
+        segments=segments
+    )
+    if structure_data is None and require_structure:
+        raise RuntimeError("Action item analysis failed")
+    return build_analysis_result(full_text, structure_data, narrative_summary, board, source_type="audio")
+
+# --- 실시간 회의 전사 (WebSocket) ---
+
+def _live_message(result) -> dict:
+    """스트리밍 STTResult(문장 하나) -> 클라이언트로 보낼 메시지"""
+    seg = result.segments[0]
+    return {
+        "type": "final" if result.is_final else "partial",
+        "start": seg.start,
+        "end": seg.end,
+        "timestamp": f"{int(seg.start // 60):02d}:{int(seg.start % 60):02d}",
+        "speaker": seg.speaker.get("label") if isinstance(seg.speaker, dict) else seg.speaker,
+        "text": seg.text,
+    }
+
+@app.websocket("/ws/live")
+async def live_transcribe_ws(websocket: WebSocket, analyze: bool = False):
+    """
+    회의 중 실시간 전사.
+    - 클라이언트 -> 서버: 16kHz/mono/16bit PCM (binary 메시지), 끝낼 때 {"type": "stop"} (text 메시지)
+    - 서버 -> 클라이언트: {"type": "partial"|"final", start, end, timestamp, speaker, text}
+                          종료 시 {"type": "done", full_text, segments, duration}
+    PCM은 gRPC로 보낼 수 있을 때만 다음 메시지를 읽으므로(백프레셔) 서버에 오디오가 쌓이지 않음
+    analyze=true면 확정 문장으로 요약/Action Item을 증분 갱신하여 {"type": "analysis", ...}로 보냄 (live_analysis.py)
+    """
+    await websocket.accept()
+    disconnected = False
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        # 전사 루프와 분석 갱신(백그라운드)이 같은 소켓에 보내므로 한 번에 하나씩
+        if disconnected:
+            return
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def pcm_frames():
+        nonlocal disconnected
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                return
+            if message.get("bytes"):
+                yield message["bytes"]
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    continue
+                if control.get("type") == "stop":
+                    return
+
+    analyzer = LiveMeetingAnalyzer(on_update=lambda snapshot: send({"type": "analysis", **snapshot})) if analyze else None
+    segments = []
+    try:
+        async for result in stt_client.atranscribe_stream(pcm_frames(), partial_results=True):
+            if result.is_final:
+                segments.extend(result.segments)
+                if analyzer:
+                    for seg in result.segments:
+                        analyzer.add_segment(seg)
+            await send(_live_message(result))
+
+        if not disconnected:
+            if analyzer:
+                await analyzer.flush()
+            await send({
+                "type": "done",
+                "full_text": " ".join(seg.text for seg in segments),
+                "segments": [{"start": seg.start, "end": seg.end, "text": seg.text, "speaker": seg.speaker}
+                             for seg in segments],
+                "duration": segments[-1].end if segments else 0.0,
+            })
+            await websocket.close()
+    except WebSocketDisconnect:
+        print("DEBUG: Live session disconnected")
+    except (RuntimeError, NotImplementedError) as e:
+        print(f"DEBUG: Live transcription error: {e}")
+        await send({"type": "error", "message": str(e)})
+        if not disconnected:
+            await websocket.close(code=1011)
     finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        if analyzer:
+            analyzer.close()
+
+# --- 오디오 처리 작업 큐 ---
+# 업로드 즉시 job_id를 반환하고, STT -> 분석 -> 인덱싱은 단계별 워커가 처리 (jobs.py)
+
+async def _job_transcribe(job):
+    params = job["params"]
+    # 업로드 시 계산한 해시로 STT 결과 캐시를 먼저 확인
+    stt_result = await atranscribe_audio_file(job["audio_path"], audio_sha256=params.get("sha256"),
+                                              use_cache=params.get("use_cache", True))
+    if not stt_result.full_text:
+        raise ValueError("STT returned empty text")
+    return {"transcript": result_to_dict(stt_result)}
+
+async def _job_analyze(job):
+    """
+    분석 -> 저장. 재시작 후 이 단계가 다시 실행되어도 LLM 호출과 저장을 반복하지 않도록
+    분석 결과는 끝나는 즉시 작업에 먼저 기록하고(이미 있으면 건너뜀), 저장은 작업 ID를 키로 하여
+    저장 직후 죽었다가 다시 실행되어도 같은 기록을 덮어씁니다.
+    """
+    transcript = job["transcript"]
+    params = job["params"]
+    final_result = job.get("result") or {}
+    if final_result.get("saved_filename"):
+        return {"result": final_result}
+
+    if not final_result:
+        # LLM 분석이 실패하면 예외 -> 작업 큐가 재시도 (실패 레코드를 저장하고 완료 처리하지 않음)
+        final_result = await _run_audio_analysis(transcript["full_text"], transcript["segments"],
+                                                 params.get("use_cache", True), params.get("mode"),
+                                                 require_structure=True)
+        # 스크립트는 저장소에 따로 저장되므로 작업 결과에는 넣지 않음
+        final_result.pop("raw_script", None)
+        await job_pipeline.checkpoint(job["id"], result=final_result)
+
+    filename = await asyncio.to_thread(save_analysis, final_result, transcript["full_text"], "audio",
+                                       f"job:{job['id']}")
+    final_result["saved_filename"] = filename
+    await job_pipeline.checkpoint(job["id"], result=final_result)
+    return {"result": final_result}
+
+async def _job_index(job):
+    await asyncio.to_thread(index_analysis, job["result"]["saved_filename"], job["transcript"]["full_text"],
+                            job["transcript"]["segments"])
+
+job_pipeline.configure(stt=_job_transcribe, analysis=_job_analyze, index=_job_index)
+
+@app.post("/api/jobs/process_audio", status_code=202)
+async def submit_process_audio_job(file: UploadFile = File(...), use_cache: bool = True,
+                                   mode: Optional[AnalysisMode] = None):
+    """오디오 처리 작업을 등록하고 job_id를 바로 반환합니다. 진행 상황은 /api/jobs/{job_id}(/events)로 확인"""
+    job_id = job_pipeline.new_job_id()
+    audio = AudioUpload(file)
+    spool_path = job_pipeline.spool_path(job_id, audio.filename)
+    # 재시작 후 이어서 처리할 수 있도록 작업 디렉토리에만 저장 (크기 제한/해시는 저장하면서 처리)
+    try:
+        await audio.open()
+        await audio.save_to(spool_path)
+    except UploadTooLarge as e:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise HTTPException(status_code=413, detail=str(e))
+
+    job = await job_pipeline.submit(job_id, "process_audio",
+                                    {"filename": audio.filename, "sha256": audio.sha256,
+                                     "use_cache": use_cache, "mode": mode}, spool_path)
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+    }
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    return await asyncio.to_thread(job_pipeline.store.list, status, limit)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_pipeline.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """작업 상태가 바뀔 때마다 event: status 를 보내고, 완료/실패 시 스트림을 닫습니다. (SSE)"""
+    job = await asyncio.to_thread(job_pipeline.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        queue = job_pipeline.subscribe(job_id)
+        try:
+            # 구독 직전에 바뀐 상태를 놓치지 않도록 현재 상태부터 전송
+            current = await asyncio.to_thread(job_pipeline.store.get, job_id)
+            while True:
+                yield _sse("status", current)
+                if current["status"] in TERMINAL_STATUSES:
+                    break
+                try:
+                    current = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    current = await asyncio.to_thread(job_pipeline.store.get, job_id)
+        finally:
+            job_pipeline.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/stats/jobs")
+async def get_job_stats():
+    return await asyncio.to_thread(job_pipeline.stats)
 
 if __name__ == '__main__':
     import uvicorn
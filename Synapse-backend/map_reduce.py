@@ -0,0 +1,227 @@
+"""
+긴 회의록을 위한 Map-Reduce 분석 엔진.
+1. Split : STT 세그먼트/화자 발언 경계 기준으로 토큰 예산 내의 구간(window)으로 나눔
+2. Map   : 구간별 분석(Action Item/요약/보드)을 제한된 동시성으로 병렬 실행
+3. Merge : Action Item 중복 제거 (같은 업무는 나중 구간의 결정이 우선)
+4. Reduce: 구간 요약들을 최종 서술형 요약으로 합침 (길면 계층적으로 반복)
+전체 소요 시간은 회의 길이가 아니라 가장 긴 구간 + reduce 시간에 비례합니다.
+"""
+import os
+import re
+import asyncio
+from difflib import SequenceMatcher
+from llm_gateway import estimate_tokens
+
+WINDOW_TOKENS = int(os.getenv("MAP_REDUCE_WINDOW_TOKENS", "6000"))
+OVERLAP_TOKENS = int(os.getenv("MAP_REDUCE_OVERLAP_TOKENS", "300"))
+MAX_FAN_OUT = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+REDUCE_TOKENS = int(os.getenv("MAP_REDUCE_REDUCE_TOKENS", "8000"))
+
+# 같은 업무로 볼 Action Item 유사도 기준
+_DUPLICATE_RATIO = 0.85
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+
+
+def speaker_label(speaker) -> str:
+    """STTSegment.speaker는 Clova 응답의 dict({label, name}) 또는 문자열일 수 있음"""
+    if isinstance(speaker, dict):
+        return str(speaker.get("name") or speaker.get("label") or "Unknown")
+    return str(speaker) if speaker else "Unknown"
+
+
+def _segment_units(segments, max_tokens: int):
+    """
+    세그먼트를 '화자: 발언' 단위 문자열로 변환합니다.
+    같은 화자의 연속 발언은 max_tokens 안에서만 합치고, 예산을 넘는 발언은 _text_units처럼 문장 단위로 나눕니다.
+    (화자 분리가 없거나 한 사람이 대부분 말한 녹음도 여러 구간으로 나뉘도록)
+    """
+    units = []
+    last_speaker = None
+    for seg in segments:
+        text = (seg.text if hasattr(seg, "text") else seg.get("text", "")).strip()
+        if not text:
+            continue
+        speaker = speaker_label(seg.speaker if hasattr(seg, "speaker") else seg.get("speaker"))
+        for piece in _text_units(text, max_tokens):
+            merged = f"{units[-1]} {piece}" if units and speaker == last_speaker else None
+            if merged is not None and estimate_tokens(merged) <= max_tokens:
+                units[-1] = merged
+            else:
+                units.append(f"{speaker}: {piece}")
+            last_speaker = speaker
+    return units
+
+
+def _text_units(text: str, max_tokens: int):
+    """세그먼트가 없으면 줄(화자 발언) 단위로, 너무 긴 줄은 문장 단위로 나눕니다."""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if estimate_tokens(line) <= max_tokens:
+            units.append(line)
+            continue
+        sentences = [s.strip() for s in _SENTENCE_END.split(line) if s and s.strip()]
+        for sentence in sentences:
+            # 문장 하나가 예산을 넘는 극단적인 경우 글자 수로 자름
+            step = max_tokens * 2
+            units.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return units
+
+
+def split_transcript(text: str, segments=None, max_tokens: int = WINDOW_TOKENS, overlap_tokens: int = OVERLAP_TOKENS):
+    """
+    토큰 예산(max_tokens) 안에서 발언 단위를 채워 구간 목록을 만듭니다.
+    각 구간 앞에는 직전 구간의 마지막 발언 일부(overlap_tokens 이내)를 문맥으로 붙입니다.
+    반환값: [{"index", "text", "context"}]
+    """
+    units = _segment_units(segments, max_tokens) if segments else _text_units(text, max_tokens)
+    if not units:
+        return []
+
+    windows, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            windows.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        windows.append(current)
+
+    result = []
+    for i, window in enumerate(windows):
+        context = []
+        if i > 0 and overlap_tokens > 0:
+            budget = overlap_tokens
+            for unit in reversed(windows[i - 1]):
+                budget -= estimate_tokens(unit)
+                if budget < 0:
+                    break
+                context.insert(0, unit)
+        result.append({"index": i, "text": "\n".join(window), "context": "\n".join(context)})
+    return result
+
+
+def _window_prompt_text(window: dict, total: int) -> str:
+    header = f"(전체 회의를 {total}개 구간으로 나눈 것 중 {window['index'] + 1}번째 구간입니다.)"
+    if window["context"]:
+        return f"{header}\n[이전 맥락 - 분석 대상 아님]\n{window['context']}\n[이번 구간]\n{window['text']}"
+    return f"{header}\n{window['text']}"
+
+
+def _normalize_task(task: str) -> str:
+    task = re.sub(r"\[.*?\]|\(.*?\)", "", task or "")
+    return re.sub(r"[\s\W_]+", "", task).lower()
+
+
+def merge_action_items(windows_items):
+    """
+    구간 순서대로 Action Item을 합칩니다.
+    같은(또는 매우 유사한) 업무가 다시 나오면 나중 구간의 내용으로 덮어씁니다. (말 번복/이관 반영)
+    """
+    merged = []  # [(normalized_task, item)]
+    for items in windows_items:
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            key = _normalize_task(item.get("task", ""))
+            for idx, (existing_key, _) in enumerate(merged):
+                if key == existing_key or (key and existing_key and
+                                           SequenceMatcher(None, key, existing_key).ratio() >= _DUPLICATE_RATIO):
+                    merged[idx] = (key, item)
+                    break
+            else:
+                merged.append((key, item))
+    return [item for _, item in merged]
+
+
+def _merge_unique(lists, limit: int = None):
+    seen, result = set(), []
+    for values in lists:
+        for value in values or []:
+            key = _normalize_task(str(value))
+            if key in seen:
+                continue
+            seen.add(key)
+            result.append(value)
+    return result[:limit] if limit else result
+
+
+def merge_boards(boards):
+    merged = {}
+    for board in boards:
+        if not isinstance(board, dict):
+            continue
+        for category, values in board.items():
+            merged[category] = _merge_unique([merged.get(category, []), values if isinstance(values, list) else []])
+    return merged or None
+
+
+async def reduce_summaries(summaries, use_cache: bool = True, max_tokens: int = REDUCE_TOKENS):
+    """구간 요약을 하나의 서술형 요약으로 합칩니다. 입력이 예산을 넘으면 묶음 단위로 먼저 줄입니다."""
+    from ai_service import generate_summary  # 순환 import 방지
+
+    summaries = [s for s in summaries if s]
+    if not summaries:
+        return None
+
+    while True:
+        combined = "\n\n".join(f"[구간 {i + 1} 요약]\n{s}" for i, s in enumerate(summaries))
+        if estimate_tokens(combined) <= max_tokens or len(summaries) == 1:
+            break
+        # 예산 안에 들어가도록 묶어서 중간 요약 (계층적 reduce)
+        groups, group, group_tokens = [], [], 0
+        for s in summaries:
+            t = estimate_tokens(s)
+            if group and group_tokens + t > max_tokens:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(s)
+            group_tokens += t
+        groups.append(group)
+        if len(groups) == len(summaries):
+            break  # 더 줄일 수 없음
+        summaries = await asyncio.gather(*[
+            generate_summary("\n\n".join(g), use_cache=use_cache) for g in groups
+        ])
+        summaries = [s for s in summaries if s]
+
+    prompt_text = "아래는 긴 회의를 시간 순서대로 나눈 구간별 요약입니다. 전체 흐름이 드러나도록 하나로 합쳐주세요.\n\n" + combined
+    return await generate_summary(prompt_text, use_cache=use_cache)
+
+
+async def analyze_long_transcript(text: str, segments=None, mode: str = None, use_cache: bool = True,
+                                  include_board: bool = False, max_fan_out: int = MAX_FAN_OUT):
+    """
+    긴 회의록을 구간별로 병렬 분석한 뒤 합칩니다.
+    반환값은 ai_service.analyze_meeting과 같은 (structure_data, narrative_summary, board) 형식입니다.
+    """
+    from ai_service import analyze_meeting  # 순환 import 방지
+
+    windows = split_transcript(text, segments)
+    print(f"DEBUG: Map-reduce analysis over {len(windows)} windows (fan-out={max_fan_out})")
+    semaphore = asyncio.Semaphore(max_fan_out)
+
+    async def map_window(window):
+        async with semaphore:
+            return await analyze_meeting(
+                _window_prompt_text(window, len(windows)),
+                mode=mode, use_cache=use_cache, include_board=include_board, allow_map_reduce=False
+            )
+
+    results = await asyncio.gather(*[map_window(w) for w in windows])
+
+    structures = [r[0] for r in results if r[0]]
+    if not structures:
+        return None, None, None
+
+    structure_data = {
+        "action_items": merge_action_items([s.get("action_items", []) for s in structures]),
+        "suggestions": _merge_unique([s.get("suggestions", []) for s in structures], limit=10),
+    }
+    narrative_summary = await reduce_summaries([r[1] for r in results], use_cache=use_cache)
+    board = merge_boards([r[2] for r in results]) if include_board else None
+    return structure_data, narrative_summary, board
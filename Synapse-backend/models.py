@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional, Literal
+
+# 분석 파이프라인 모드: "split"(항목별 호출) / "fused"(한 번의 호출로 통합 분석)
+AnalysisMode = Literal["split", "fused"]
 
 class Message(BaseModel):
     message: str
@@ -21,3 +24,20 @@ class ChatResponse(BaseModel):
 class AnalyzeRequest(BaseModel):
     text: str
     source_type: str = "text" # "text" or "audio"
+    use_cache: bool = True # False면 LLM 응답 캐시를 건너뛰고 새로 분석
+    mode: Optional[AnalysisMode] = None # 없으면 ANALYSIS_MODE 환경변수 (기본 "split")
+
+class ActionItem(BaseModel):
+    task: str
+    assignee: Optional[str] = None
+    due_date: Optional[str] = None # YYYY-MM-DD
+    priority: Optional[str] = None # Critical | High | Medium | Low
+    reasoning: Optional[str] = None
+
+class Board(BaseModel):
+    # LLM 응답의 한글 키를 그대로 사용 (응답/저장 시 by_alias=True)
+    model_config = ConfigDict(populate_by_name=True)
+
+    key_topics: List[str] = Field(default_factory=list, alias="주요 주제")
+    decisions: List[str] = Field(default_factory=list, alias="결정 사항")
+    open_questions: List[str] = Field(default_factory=list, alias="질문 사항")
@@ -0,0 +1,85 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = int(os.getenv("SYNAPSE_RECORD_CACHE_MB", "64")) * 1024 * 1024
+
+
+class RecordCache:
+    """
+    파싱된 분석 기록을 담아두는 LRU 캐시 (용량은 바이트 기준).
+    각 항목은 저장 당시의 revision(쓰기 시퀀스)과 함께 보관되며,
+    조회 시 revision이 다르면 오래된 항목으로 보고 버립니다.
+    async 핸들러와 BackgroundTasks 스레드에서 함께 쓰이므로 내부는 Lock으로 보호합니다.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (revision, value, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, revision=None):
+        """revision을 주면 일치하는 경우에만 반환합니다. 없거나 오래되었으면 None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (revision is not None and item[0] != revision):
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, revision, value, size: int = None):
+        if size is None:
+            size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (revision, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """저장 로직의 write hook - 해당 기록을 캐시에서 제거합니다."""
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _drop(self, key):
+        _, _, size = self._items.pop(key)
+        self._bytes -= size
+
+
+# Singleton instance
+record_cache = RecordCache()
@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+
+
+def content_key(kind: str, text: str, *extra) -> str:
+    """분석 종류 + 텍스트 내용 해시로 만든 coalescing 키"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return ":".join([kind, *[str(e) for e in extra], digest])
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청을 하나의 작업으로 합칩니다.
+    첫 요청(leader)이 작업을 시작하고, 작업이 끝나기 전에 들어온 중복 요청은 같은 결과를 기다립니다.
+    작업이 끝나면 키가 해제되므로 이후 요청은 새로 실행됩니다. (결과 캐시가 아님)
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn):
+        """
+        fn()이 반환하는 코루틴을 키당 한 번만 실행합니다.
+        반환값: (result, shared) - shared가 True면 다른 요청이 시작한 작업의 결과
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # 대기 중인 요청 하나가 취소되어도 공유 작업은 계속 진행
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self.leaders += 1
+        task.add_done_callback(lambda t: self._release(key, t))
+        return await asyncio.shield(task), False
+
+    def _release(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self):
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+# 분석 요청용 공용 인스턴스
+analysis_flight = SingleFlight()
@@ -0,0 +1,413 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import gzip
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+DB_PATH = os.getenv("SYNAPSE_DB_PATH", os.path.join(os.path.dirname(__file__), "synapse.db"))
+LEGACY_STORAGE_DIR = os.path.join(os.path.dirname(__file__), "storage")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # zstd가 없으면 gzip으로 압축
+
+# source_type -> 분석 기록 이름 접두사
+SOURCE_PREFIXES = {"text": "텍스트분석", "audio": "음성파일"}
+
+# 레거시 파일명 규칙: {접두사}_YYYY_MM_DD_HH시MM분.json
+_LEGACY_NAME_PATTERN = re.compile(
+    r"^(?P<prefix>텍스트분석|음성파일)_(?P<year>\d{4})_(?P<month>\d{2})_(?P<day>\d{2})_(?P<hour>\d{2})시(?P<minute>\d{2})분"
+)
+
+
+def format_display_date(ts: float) -> str:
+    """목록 표시용 날짜 (예: 2025.12.07 19시10분)"""
+    return datetime.fromtimestamp(ts).strftime("%Y.%m.%d %H시%M분")
+
+
+def compress_text(text: str):
+    """스크립트 압축. (encoding, bytes)를 반환합니다."""
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6)
+
+
+def decompress_text(encoding: str, body: bytes) -> str:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard 패키지가 없어 zstd로 압축된 스크립트를 읽을 수 없습니다.")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    if encoding == "gzip":
+        return gzip.decompress(body).decode("utf-8")
+    return body.decode("utf-8") if isinstance(body, bytes) else body
+
+
+# [1] 추상 인터페이스 - 다른 저장소(예: Postgres)로 교체할 때 구현
+class StorageBackend(ABC):
+    @abstractmethod
+    def save_analysis(self, record: dict, source_type: str = "text", transcript: str = None,
+                      name: str = None, created_at: float = None, idempotency_key: str = None) -> str:
+        """
+        분석 결과를 원자적으로 저장하고 기록 이름을 반환합니다.
+        name이 없으면 충돌하지 않는 이름을 새로 발급하고, 있으면 해당 기록을 덮어씁니다.
+        idempotency_key를 주면 같은 키로 이미 저장된 기록을 덮어쓰고 그 이름을 반환합니다. (재시도 시 중복 저장 방지)
+        """
+        pass
+
+    @abstractmethod
+    def get_analysis(self, name: str, include_transcript: bool = True, fields: list = None):
+        """
+        저장된 분석 결과(dict)를 반환합니다. 없으면 None.
+        fields를 주면 해당 키만 담아 반환하며, 스크립트(raw_script)는 요청된 경우에만 읽습니다.
+        """
+        pass
+
+    @abstractmethod
+    def get_revision(self, name: str):
+        """기록이 마지막으로 쓰여진 시퀀스 번호 (ETag 용). 없으면 None."""
+        pass
+
+    @abstractmethod
+    def get_transcript(self, name: str):
+        """원본 스크립트만 반환합니다. 없으면 None."""
+        pass
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        pass
+
+    @abstractmethod
+    def list_analyses(self, source_type: str = None, since: float = None, until: float = None,
+                      after_seq: int = 0, limit: int = None) -> list:
+        """
+        분석 기록의 메타데이터 목록 (본문 제외).
+        after_seq를 주면 해당 시퀀스 이후에 쓰여진 기록만 쓰기 순서대로 반환합니다.
+        """
+        pass
+
+    @abstractmethod
+    def version(self) -> int:
+        """쓰기마다 증가하는 저장소 세대 번호. 캐시/카탈로그 무효화에 사용합니다."""
+        pass
+
+    @abstractmethod
+    def get_meta(self, key: str, default=None):
+        pass
+
+    @abstractmethod
+    def set_meta(self, key: str, value):
+        pass
+
+
+# [2] 기본 구현 - SQLite (WAL 모드)
+class SQLiteStorage(StorageBackend):
+    """
+    분석 결과/스크립트/메타데이터를 하나의 SQLite DB에 저장합니다.
+    WAL 모드를 사용하므로 여러 uvicorn 워커가 동시에 읽고, 쓰기는 트랜잭션 단위로 직렬화됩니다.
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS analyses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        source_type TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        summary TEXT,
+        keywords TEXT,
+        data TEXT NOT NULL,
+        seq INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at);
+    CREATE INDEX IF NOT EXISTS idx_analyses_source ON analyses(source_type, created_at);
+    CREATE INDEX IF NOT EXISTS idx_analyses_seq ON analyses(seq);
+
+    CREATE TABLE IF NOT EXISTS transcripts (
+        analysis_id INTEGER PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE,
+        encoding TEXT NOT NULL,
+        body BLOB NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self):
+        """스레드마다 별도의 연결을 사용합니다. (sqlite3 연결은 스레드 간 공유 불가)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        self._migrate_plain_transcripts(conn)
+        conn.executescript(self._SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO metadata(key, value) VALUES ('generation', '0')")
+
+    def _migrate_plain_transcripts(self, conn):
+        """압축 도입 이전의 transcripts(text) 테이블을 압축 형식으로 변환합니다."""
+        columns = [r["name"] for r in conn.execute("PRAGMA table_info(transcripts)").fetchall()]
+        if "text" not in columns:
+            return
+        with _WriteTransaction(conn):
+            conn.execute("ALTER TABLE transcripts RENAME TO transcripts_plain")
+            conn.execute(
+                "CREATE TABLE transcripts (analysis_id INTEGER PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE, "
+                "encoding TEXT NOT NULL, body BLOB NOT NULL)"
+            )
+            for row in conn.execute("SELECT analysis_id, text FROM transcripts_plain").fetchall():
+                encoding, body = compress_text(row["text"])
+                conn.execute(
+                    "INSERT INTO transcripts(analysis_id, encoding, body) VALUES (?, ?, ?)",
+                    (row["analysis_id"], encoding, body)
+                )
+            conn.execute("DROP TABLE transcripts_plain")
+
+    def _write_tx(self):
+        return _WriteTransaction(self._conn())
+
+    def _next_seq(self, conn) -> int:
+        conn.execute("UPDATE metadata SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        return int(conn.execute("SELECT value FROM metadata WHERE key = 'generation'").fetchone()[0])
+
+    def _unique_name(self, conn, source_type: str, created_at: float) -> str:
+        """같은 분에 저장된 기록이 있으면 _2, _3 ... 접미사를 붙입니다. (쓰기 트랜잭션 안에서 호출)"""
+        prefix = SOURCE_PREFIXES.get(source_type, SOURCE_PREFIXES["text"])
+        base = f"{prefix}_{datetime.fromtimestamp(created_at).strftime('%Y_%m_%d_%H시%M분')}"
+        name = f"{base}.json"
+        n = 1
+        while conn.execute("SELECT 1 FROM analyses WHERE name = ?", (name,)).fetchone():
+            n += 1
+            name = f"{base}_{n}.json"
+        return name
+
+    def save_analysis(self, record: dict, source_type: str = "text", transcript: str = None,
+                      name: str = None, created_at: float = None, idempotency_key: str = None) -> str:
+        record = dict(record)
+        # 스크립트는 별도 테이블에 저장 (목록/요약 조회 시 읽지 않도록)
+        raw_script = record.pop("raw_script", None)
+        if transcript is None:
+            transcript = raw_script
+        created_at = created_at if created_at is not None else time.time()
+
+        with self._write_tx() as conn:
+            # 키 -> 기록 이름 매핑을 기록과 같은 트랜잭션에서 저장하므로, 저장 직후 죽어도 재시도는 같은 기록을 덮어씀
+            key_meta = f"save_key:{idempotency_key}" if idempotency_key else None
+            if name is None and key_meta:
+                row = conn.execute("SELECT value FROM metadata WHERE key = ?", (key_meta,)).fetchone()
+                if row:
+                    name = json.loads(row["value"])
+            if name is None:
+                name = self._unique_name(conn, source_type, created_at)
+            if key_meta:
+                conn.execute("INSERT OR REPLACE INTO metadata(key, value) VALUES (?, ?)",
+                             (key_meta, json.dumps(name, ensure_ascii=False)))
+            seq = self._next_seq(conn)
+
+            row = conn.execute("SELECT id FROM analyses WHERE name = ?", (name,)).fetchone()
+            params = (
+                source_type,
+                created_at,
+                record.get("summary"),
+                json.dumps(record.get("keywords", []), ensure_ascii=False),
+                json.dumps(record, ensure_ascii=False),
+                seq,
+            )
+            if row:
+                analysis_id = row["id"]
+                conn.execute(
+                    "UPDATE analyses SET source_type=?, created_at=?, summary=?, keywords=?, data=?, seq=? WHERE id=?",
+                    params + (analysis_id,)
+                )
+            else:
+                cur = conn.execute(
+                    "INSERT INTO analyses(source_type, created_at, summary, keywords, data, seq, name) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    params + (name,)
+                )
+                analysis_id = cur.lastrowid
+
+            if transcript is not None:
+                encoding, body = compress_text(transcript)
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts(analysis_id, encoding, body) VALUES (?, ?, ?)",
+                    (analysis_id, encoding, body)
+                )
+            else:
+                conn.execute("DELETE FROM transcripts WHERE analysis_id = ?", (analysis_id,))
+
+        return name
+
+    def get_analysis(self, name: str, include_transcript: bool = True, fields: list = None):
+        row = self._conn().execute("SELECT id, data FROM analyses WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row["data"])
+
+        if fields is not None:
+            include_transcript = "raw_script" in fields
+            data = {k: data[k] for k in fields if k in data}
+
+        if include_transcript:
+            transcript = self._read_transcript(row["id"])
+            if transcript is not None:
+                data["raw_script"] = transcript
+        return data
+
+    def get_transcript(self, name: str):
+        row = self._conn().execute("SELECT id FROM analyses WHERE name = ?", (name,)).fetchone()
+        return self._read_transcript(row["id"]) if row else None
+
+    def _read_transcript(self, analysis_id: int):
+        t = self._conn().execute(
+            "SELECT encoding, body FROM transcripts WHERE analysis_id = ?", (analysis_id,)
+        ).fetchone()
+        return decompress_text(t["encoding"], t["body"]) if t else None
+
+    def get_revision(self, name: str):
+        row = self._conn().execute("SELECT seq FROM analyses WHERE name = ?", (name,)).fetchone()
+        return row["seq"] if row else None
+
+    def exists(self, name: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM analyses WHERE name = ?", (name,)).fetchone() is not None
+
+    def list_analyses(self, source_type: str = None, since: float = None, until: float = None,
+                      after_seq: int = 0, limit: int = None) -> list:
+        clauses, params = ["seq > ?"], [after_seq or 0]
+        if source_type:
+            clauses.append("source_type = ?")
+            params.append(source_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+
+        # after_seq 조회는 쓰기 순서, 그 외에는 최신순
+        order = "seq ASC" if after_seq else "created_at DESC, name DESC"
+        sql = (
+            "SELECT id, name, source_type, created_at, summary, keywords, seq FROM analyses "
+            f"WHERE {' AND '.join(clauses)} ORDER BY {order}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        return [
+            {
+                "id": r["id"],
+                "name": r["name"],
+                "source_type": r["source_type"],
+                "created_at": r["created_at"],
+                "date": format_display_date(r["created_at"]),
+                "summary": r["summary"],
+                "keywords": json.loads(r["keywords"]) if r["keywords"] else [],
+                "seq": r["seq"],
+            }
+            for r in rows
+        ]
+
+    def version(self) -> int:
+        return int(self._conn().execute("SELECT value FROM metadata WHERE key = 'generation'").fetchone()[0])
+
+    def get_meta(self, key: str, default=None):
+        row = self._conn().execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_meta(self, key: str, value):
+        if key == "generation":
+            raise ValueError("'generation' is reserved")
+        with self._write_tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata(key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+
+    # --- 마이그레이션 ---
+
+    def migrate_legacy_json(self, storage_dir: str = LEGACY_STORAGE_DIR) -> int:
+        """
+        기존 storage/*.json 파일들을 DB로 가져옵니다.
+        이미 같은 이름의 기록이 있으면 건너뛰므로 여러 번 실행해도 안전합니다. 원본 파일은 삭제하지 않습니다.
+        """
+        if not os.path.isdir(storage_dir):
+            return 0
+
+        imported = 0
+        for filename in sorted(os.listdir(storage_dir)):
+            if not filename.endswith(".json") or self.exists(filename):
+                continue
+            path = os.path.join(storage_dir, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except Exception as e:
+                print(f"Migration skipped {filename}: {e}")
+                continue
+
+            created_at, source_type = os.stat(path).st_mtime, "text"
+            match = _LEGACY_NAME_PATTERN.match(filename)
+            if match:
+                g = match.groupdict()
+                source_type = "audio" if g["prefix"] == SOURCE_PREFIXES["audio"] else "text"
+                created_at = datetime(int(g["year"]), int(g["month"]), int(g["day"]),
+                                      int(g["hour"]), int(g["minute"])).timestamp()
+
+            self.save_analysis(record, source_type=source_type, name=filename, created_at=created_at)
+            imported += 1
+
+        if imported:
+            print(f"DEBUG: Migrated {imported} legacy analysis files into {self.db_path}")
+        return imported
+
+
+class _WriteTransaction:
+    """BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 다른 워커와의 쓰기 경합을 직렬화합니다."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_storage(backend: str = None) -> StorageBackend:
+    """SYNAPSE_STORAGE_BACKEND 환경 변수로 저장소 구현을 선택합니다. (기본: sqlite)"""
+    backend = (backend or os.getenv("SYNAPSE_STORAGE_BACKEND", "sqlite")).lower()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Singleton instance
+storage = create_storage()
+
+if __name__ == '__main__':
+    # 수동 마이그레이션: python storage_engine.py
+    count = storage.migrate_legacy_json()
+    print(f"Imported {count} files. Total records: {len(storage.list_analyses())}")
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from storage_engine import compress_text, decompress_text
+from cache_size import track_size, tracked_bytes, evict_lru
+
+STT_CACHE_PATH = os.getenv("STT_CACHE_PATH", os.path.join(os.path.dirname(__file__), "stt_cache.db"))
+DEFAULT_MAX_BYTES = int(os.getenv("STT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def stt_cache_key(audio_sha256: str, settings: dict) -> str:
+    """(오디오 내용 해시, 제공자 설정)의 SHA-256. 언어/화자 분리/부스팅 등이 바뀌면 다른 키가 됨"""
+    payload = json.dumps([audio_sha256, settings or {}], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _pack(result: dict) -> str:
+    """세그먼트를 키 이름 없는 배열로 저장해 크기를 줄임: [start, end, text, speaker]"""
+    return json.dumps({
+        "t": result.get("full_text", ""),
+        "d": result.get("duration", 0.0),
+        "s": [[seg["start"], seg["end"], seg["text"], seg.get("speaker")] for seg in result.get("segments", [])],
+    }, ensure_ascii=False, separators=(",", ":"))
+
+
+def _unpack(payload: str) -> dict:
+    data = json.loads(payload)
+    return {
+        "full_text": data["t"],
+        "duration": data["d"],
+        "segments": [{"start": s[0], "end": s[1], "text": s[2], "speaker": s[3]} for s in data["s"]],
+    }
+
+
+class STTResultCache:
+    """
+    STT 결과를 오디오 내용 해시로 저장하는 디스크 캐시 (SQLite).
+    같은 녹음을 다시 올리면 STT 호출 없이 결과를 재사용합니다.
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    """
+
+    def __init__(self, db_path: str = STT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS stt_results (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                encoding TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_stt_results_access ON stt_results(last_access)")
+        track_size(self._conn(), "stt_results")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """{"full_text", "segments": [{start, end, text, speaker}], "duration"} 또는 None"""
+        row = self._conn().execute("SELECT encoding, body FROM stt_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._conn().execute("UPDATE stt_results SET last_access = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            self.hits += 1
+        return _unpack(decompress_text(row[0], row[1]))
+
+    def put(self, key: str, result: dict, provider: str = None):
+        now = time.time()
+        encoding, body = compress_text(_pack(result))
+        self._conn().execute(
+            "INSERT INTO stt_results(key, provider, encoding, body, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET provider = excluded.provider, encoding = excluded.encoding, "
+            "body = excluded.body, size = excluded.size, created_at = excluded.created_at, last_access = excluded.last_access",
+            (key, provider, encoding, body, len(body), now, now)
+        )
+        self._evict()
+
+    async def aget(self, key: str):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, result: dict, provider: str = None):
+        await asyncio.to_thread(self.put, key, result, provider)
+
+    def _evict(self):
+        removed = evict_lru(self._conn(), "stt_results", self.max_bytes)
+        if removed:
+            with self._lock:
+                self.evictions += removed
+
+    def stats(self):
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM stt_results").fetchone()[0]
+        total = tracked_bytes(conn, "stt_results")
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            }
+
+
+# Singleton instance
+stt_cache = STTResultCache()
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 
 # synapse-core를 sys.path에 추가하여 모듈을 임포트할 수 있게 함
 # synapse-server와 synapse-core가 같은 상위 디렉토리에 있다고 가정
@@ -10,16 +11,94 @@ if core_dir not in sys.path:
 
 try:
     from stt.Clova import ClovaSpeechClient
+    from stt.chunked import ChunkedSTTProvider
 except ImportError as e:
     print(f"Error importing synapse-core modules: {e}")
     # 가짜 클라이언트 또는 에러 처리를 위한 fallback을 고려할 수 있음
     raise e
 
-def transcribe_audio_file(file_path: str):
+from stt.STT_interface import STTResult, STTSegment
+from stt_cache import stt_cache, stt_cache_key, file_sha256
+
+# 연결 풀을 재사용하도록 프로세스 전체에서 하나의 클라이언트를 공유
+# 긴 녹음은 무음 지점에서 나눠 동시에 인식 (STT_CHUNK_SECONDS=0이면 분할하지 않음)
+stt_client = ChunkedSTTProvider(ClovaSpeechClient())
+
+def result_to_dict(result: STTResult) -> dict:
+    return {
+        "full_text": result.full_text,
+        "segments": [
+            {"start": seg.start, "end": seg.end, "text": seg.text, "speaker": seg.speaker}
+            for seg in result.segments
+        ],
+        "duration": result.duration,
+    }
+
+def result_from_dict(data: dict) -> STTResult:
+    return STTResult(
+        full_text=data["full_text"],
+        segments=[STTSegment(start=s["start"], end=s["end"], text=s["text"], speaker=s["speaker"])
+                  for s in data["segments"]],
+        duration=data["duration"],
+    )
+
+def _cache_key(audio_sha256: str):
+    return stt_cache_key(audio_sha256, stt_client.cache_settings())
+
+def transcribe_audio_file(file_path: str, use_cache: bool = True):
     """
-    오디오 파일을 받아서 STT 결과를 반환하는 함수
+    오디오 파일을 받아서 STT 결과를 반환하는 함수 (동기, 스크립트/배치용)
+    같은 오디오(내용 해시)와 같은 설정의 결과가 캐시에 있으면 STT를 호출하지 않음
     """
-    client = ClovaSpeechClient()
+    key = _cache_key(file_sha256(file_path)) if use_cache else None
+    if key:
+        cached = stt_cache.get(key)
+        if cached is not None:
+            print("DEBUG: STT cache hit")
+            return result_from_dict(cached)
+
     # transcribe_from_file은 STTResult 객체를 반환
-    result = client.transcribe_from_file(file_path)
+    result = stt_client.transcribe_from_file(file_path)
+    if key and result.full_text:
+        stt_cache.put(key, result_to_dict(result), type(stt_client).__name__)
+    return result
+
+async def atranscribe_audio_file(file_path: str, audio_sha256: str = None, use_cache: bool = True):
+    """
+    transcribe_audio_file의 비동기 버전. async 핸들러에서는 이 함수를 사용해야 이벤트 루프가 막히지 않음
+    (비동기 클라이언트가 없는 STT 구현체는 STTProvider 기본 구현에 따라 스레드 풀에서 실행)
+    audio_sha256을 이미 알고 있으면(작업 큐) 파일을 다시 해시하지 않음
+    """
+    key = None
+    if use_cache:
+        audio_sha256 = audio_sha256 or await asyncio.to_thread(file_sha256, file_path)
+        key = _cache_key(audio_sha256)
+        cached = await stt_cache.aget(key)
+        if cached is not None:
+            print("DEBUG: STT cache hit")
+            return result_from_dict(cached)
+
+    result = await stt_client.atranscribe_from_file(file_path)
+    if key and result.full_text:
+        await stt_cache.aput(key, result_to_dict(result), type(stt_client).__name__)
+    return result
+
+async def atranscribe_upload(audio, use_cache: bool = True):
+    """
+    업로드(audio_ingest.AudioUpload)를 조각 단위로 STT 제공자에게 전달합니다.
+    파일 경로가 필요한 제공자만 요청별 임시 디렉토리에 저장합니다. (STTProvider.atranscribe_from_chunks)
+    전송 전에 로컬 업로드 파일의 해시로 캐시를 먼저 확인합니다.
+    """
+    await audio.open()
+    key = None
+    if use_cache:
+        key = _cache_key(await audio.digest())
+        cached = await stt_cache.aget(key)
+        if cached is not None:
+            print("DEBUG: STT cache hit")
+            return result_from_dict(cached)
+
+    result = await stt_client.atranscribe_from_chunks(audio.chunks(), audio.size, audio.filename)
+    if key and result.full_text:
+        await stt_cache.aput(key, result_to_dict(result), type(stt_client).__name__)
     return result
@@ -1,10 +1,44 @@
 import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
 from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
+from llm_gateway import llm_gateway, EMBEDDING_MODEL
+from embedding_cache import embedding_cache
+from chunking import chunk_text, chunk_segments, chunk_hash
+from keyword_index import keyword_index
 
 load_dotenv()
 
+# Chroma searches run in this many threads at most, so a burst of chats cannot starve the default executor
+SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", "4"))
+# "hybrid" (vector + BM25 keyword, fused), "vector" or "keyword" (local only, no embedding call)
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+RETRIEVAL_MODES = ("hybrid", "vector", "keyword")
+# Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank)) over the result lists
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Each side of a hybrid query contributes this many candidates (at least 2 * n_results)
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+
+
+def reciprocal_rank_fusion(result_lists, n_results: int, k: int = RRF_K):
+    """
+    Merges ranked result lists by chunk id. Only ranks are used, so BM25 and vector distances
+    need no normalisation. The first list's copy of a chunk is kept; "score" is the fused score.
+    """
+    scores, items = {}, {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            chunk_id = item.get("id")
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            items.setdefault(chunk_id, item)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+    return [{**items[chunk_id], "score": round(scores[chunk_id], 6)} for chunk_id in ranked]
+
+
 class VectorDBClient:
     def __init__(self):
         # Persistent storage path
@@ -20,7 +54,7 @@ class VectorDBClient:
             
         self.embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
             api_key=api_key,
-            model_name="text-embedding-3-small"
+            model_name=EMBEDDING_MODEL
         )
         
         # Get or Create Collection
@@ -29,72 +63,220 @@ class VectorDBClient:
             embedding_function=self.embedding_fn
         )
 
-    def add_document(self, doc_id: str, text: str, metadata: dict = None):
+        self._executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="vector-search")
+        self._stats_lock = threading.Lock()
+        self._timings = {"embed": [0, 0.0], "search": [0, 0.0]}  # stage -> [calls, total seconds]
+        self.last_timing = {}
+
+    def add_document(self, doc_id: str, text: str, metadata: dict = None, segments=None):
         """
-        Splits text into chunks and strictly indexes them.
-        Removes existing chunks for this doc_id before adding (to avoid duplicates/stale data).
+        Splits text into content-defined chunks and syncs them with the index.
+        Chunk IDs are content hashes, so re-indexing an edited document only embeds and upserts
+        chunks whose text changed, deletes chunks that disappeared, and leaves the rest untouched.
+        With STT segments, chunks are packed from whole segments and carry start/end/speakers metadata.
         """
-        # 1. Clear existing chunks for this doc (if any)
-        # Note: Chroma doesn't have a direct "delete by metadata" in strictly simple API, 
-        # but we can try filtering if needed. 
-        # For simplicity in V1, we rely on upsert overwriting IDs, but IDs are chunk-based.
-        # Ideally we should delete old ones first. 
-        self._delete_doc_chunks(doc_id)
-
-        # 2. Chunking
-        chunks = self._split_text(text)
-        
-        if not chunks:
-            return
+        # 1. Chunking (boundaries depend on content, not on absolute offsets)
+        if segments:
+            chunks = chunk_segments(segments)
+        else:
+            chunks = [{"text": chunk} for chunk in self._split_text(text)]
 
-        ids = []
-        documents = []
-        metadatas = []
-        
-        for i, chunk in enumerate(chunks):
-            # ID format: "doc_filename_chunk_0"
-            chunk_id = f"{doc_id}_chunk_{i}"
-            ids.append(chunk_id)
-            documents.append(chunk)
-            
+        wanted = {}
+        for i, piece in enumerate(chunks):
+            chunk = piece["text"]
+            digest = chunk_hash(chunk)
+            # ID format: "doc_filename_<hash prefix>" (identical chunks within a doc collapse to one)
+            chunk_id = f"{doc_id}_{digest[:16]}"
+            if chunk_id in wanted:
+                continue
             meta = metadata.copy() if metadata else {}
             meta["doc_id"] = doc_id
             meta["chunk_index"] = i
-            metadatas.append(meta)
-            
-        # 3. Upsert
-        if ids:
+            meta["chunk_hash"] = digest
+            meta.update({key: piece[key] for key in ("start", "end", "speakers") if key in piece})
+            wanted[chunk_id] = (chunk, meta)
+
+        # 2. Diff against what is already indexed for this doc
+        existing = self._doc_chunk_metadata(doc_id)
+        stale = [chunk_id for chunk_id in existing if chunk_id not in wanted]
+        added = [chunk_id for chunk_id in wanted if chunk_id not in existing]
+        moved = [chunk_id for chunk_id in wanted if chunk_id in existing and existing[chunk_id] != wanted[chunk_id][1]]
+
+        if stale:
+            self.collection.delete(ids=stale)
+        if added:
+            documents = [wanted[chunk_id][0] for chunk_id in added]
             self.collection.upsert(
-                ids=ids,
+                ids=added,
                 documents=documents,
-                metadatas=metadatas
+                embeddings=self._embed(documents),
+                metadatas=[wanted[chunk_id][1] for chunk_id in added]
             )
-            print(f"VectorDB: Indexed {len(ids)} chunks for {doc_id}")
+        if moved:
+            # Same text, new position/metadata: no re-embedding needed
+            self.collection.update(ids=moved, metadatas=[wanted[chunk_id][1] for chunk_id in moved])
+
+        print(f"VectorDB: {doc_id}: {len(added)} added, {len(stale)} removed, "
+              f"{len(wanted) - len(added)} unchanged chunks")
+
+        # 3. Keyword index follows the same chunk ids (only new chunks are tokenized)
+        keyword_index.sync_document(doc_id, wanted)
+
+    def sync_keyword_index(self):
+        """
+        Loads the keyword index and backfills it from Chroma when the two disagree
+        (e.g. chunks indexed before the keyword index existed). Returns the number of docs synced.
+        """
+        keyword_index.load()
+        if len(keyword_index) == self.collection.count():
+            return 0
+        data = self.collection.get(include=["documents", "metadatas"])
+        by_doc = {}
+        for chunk_id, document, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+            meta = meta or {}
+            by_doc.setdefault(meta.get("doc_id", chunk_id), {})[chunk_id] = (document or "", meta)
+        for doc_id in keyword_index.doc_ids() - set(by_doc):
+            keyword_index.remove_document(doc_id)
+        for doc_id, chunks in by_doc.items():
+            keyword_index.sync_document(doc_id, chunks)
+        print(f"VectorDB: Keyword index synced from Chroma ({len(by_doc)} docs, {len(data['ids'])} chunks)")
+        return len(by_doc)
+
+    def _doc_chunk_metadata(self, doc_id: str):
+        """chunk_id -> metadata for chunks already indexed under doc_id."""
+        try:
+            existing = self.collection.get(where={"doc_id": doc_id}, include=["metadatas"])
+        except Exception as e:
+            print(f"VectorDB: Lookup error (might be empty): {e}")
+            return {}
+        return dict(zip(existing["ids"], existing["metadatas"] or [{}] * len(existing["ids"])))
 
     def query(self, query_text: str, n_results: int = 5):
         """
         Semantic search. Returns list of text chunks.
+        Blocks on the embedding request and the search; coroutines should use aquery instead.
         """
-        results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )
-        
-        # results['documents'] is a list of list of strings
+        results = self._search(self._embed([query_text]), n_results)
+        return self._format_results(results, 0)
+
+    async def aquery(self, query_text: str, n_results: int = 5):
+        """Non-blocking query: same results as query()."""
+        return (await self.aquery_batch([query_text], n_results=n_results))[0]
+
+    async def aquery_batch(self, query_texts: list, n_results: int = 5):
+        """
+        Embeds all queries in one async request, then searches them in one Chroma call
+        on the bounded search executor. Returns one result list per query, in order.
+        """
+        if not query_texts:
+            return []
+
+        started = time.perf_counter()
+        embeddings = await self._aembed(list(query_texts))
+        embedded = time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._executor, self._search, embeddings, n_results)
+        searched = time.perf_counter()
+
+        self._record_timing(len(query_texts), embedded - started, searched - embedded)
+        return [self._format_results(results, i) for i in range(len(query_texts))]
+
+    def keyword_query(self, query_text: str, n_results: int = 5):
+        """Local BM25 search only: no embedding request, no Chroma call."""
+        return keyword_index.search(query_text, n_results)
+
+    async def ahybrid_query(self, query_text: str, n_results: int = 5):
+        """
+        Vector and BM25 keyword results fused with reciprocal rank fusion.
+        If the query embedding fails (e.g. the API is unreachable), the keyword results are returned alone.
+        """
+        pool = max(n_results * 2, HYBRID_CANDIDATES)
+        keyword_hits = keyword_index.search(query_text, pool)
+        try:
+            vector_hits = await self.aquery(query_text, n_results=pool)
+        except Exception as e:
+            print(f"DEBUG: Vector retrieval failed, using keyword results only: {e}")
+            vector_hits = []
+        return reciprocal_rank_fusion([vector_hits, keyword_hits], n_results)
+
+    async def asearch(self, query_text: str, n_results: int = 5, mode: str = None):
+        """Dispatches to the configured retrieval mode (RAG_RETRIEVAL_MODE by default)."""
+        mode = mode or RETRIEVAL_MODE
+        if mode == "keyword":
+            return self.keyword_query(query_text, n_results)
+        if mode == "vector":
+            return await self.aquery(query_text, n_results=n_results)
+        return await self.ahybrid_query(query_text, n_results=n_results)
+
+    def _embed(self, texts: list):
+        """
+        Embeds texts through the persistent embedding cache; only cache misses reach the API.
+        Sync path (indexing runs in a background thread).
+        """
+        vectors = embedding_cache.get_many(EMBEDDING_MODEL, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self.embedding_fn([texts[i] for i in missing])
+            fresh = [[float(x) for x in vector] for vector in fresh]
+            embedding_cache.put_many(EMBEDDING_MODEL, [texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    async def _aembed(self, texts: list):
+        """Async version of _embed (query path); misses go through llm_gateway.embed."""
+        vectors = await embedding_cache.aget_many(EMBEDDING_MODEL, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = await llm_gateway.embed([texts[i] for i in missing])
+            if fresh is None:
+                raise RuntimeError("Query embedding failed")
+            await embedding_cache.aput_many(EMBEDDING_MODEL, [texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    def _search(self, embeddings, n_results: int):
+        return self.collection.query(query_embeddings=embeddings, n_results=n_results)
+
+    @staticmethod
+    def _format_results(results, index: int):
+        # results['documents'] is a list of list of strings (one list per query)
         # results['metadatas'] is a list of list of dicts
-        if results and results['documents']:
-            # Flatten the list of lists (since we only query one text at a time)
-            docs = results['documents'][0]
-            metas = results['metadatas'][0] if 'metadatas' in results else [{}] * len(docs)
-            
-            combined_results = []
-            for doc, meta in zip(docs, metas):
-                combined_results.append({
-                    "content": doc,
-                    "metadata": meta
-                })
-            return combined_results 
-        return []
+        if not results or not results.get('documents') or index >= len(results['documents']):
+            return []
+        docs = results['documents'][index]
+        metas = results['metadatas'][index] if results.get('metadatas') else [{}] * len(docs)
+        ids = results['ids'][index] if results.get('ids') else [None] * len(docs)
+        return [{"id": chunk_id, "content": doc, "metadata": meta or {}} for chunk_id, doc, meta in zip(ids, docs, metas)]
+
+    def _record_timing(self, queries: int, embed_seconds: float, search_seconds: float):
+        with self._stats_lock:
+            for stage, seconds in (("embed", embed_seconds), ("search", search_seconds)):
+                self._timings[stage][0] += 1
+                self._timings[stage][1] += seconds
+            self.last_timing = {
+                "queries": queries,
+                "embed_ms": round(embed_seconds * 1000, 1),
+                "search_ms": round(search_seconds * 1000, 1),
+            }
+        print(f"DEBUG: Retrieval {queries} queries (embed {embed_seconds * 1000:.0f}ms, search {search_seconds * 1000:.0f}ms)")
+
+    def stats(self):
+        """Per-stage retrieval timing (async path)."""
+        with self._stats_lock:
+            return {
+                **{
+                    f"{stage}_avg_ms": round(total / calls * 1000, 1) if calls else 0.0
+                    for stage, (calls, total) in self._timings.items()
+                },
+                "batches": self._timings["search"][0],
+                "search_workers": SEARCH_WORKERS,
+                "mode": RETRIEVAL_MODE,
+                "last": dict(self.last_timing),
+                "keyword_index": keyword_index.stats(),
+            }
 
     def _delete_doc_chunks(self, doc_id: str):
         """
@@ -106,29 +288,15 @@ class VectorDBClient:
             )
         except Exception as e:
             print(f"VectorDB: Delete error (might be empty): {e}")
+        keyword_index.remove_document(doc_id)
 
-    def _split_text(self, text, chunk_size=800, overlap=100):
+    def _split_text(self, text):
         """
-        Simple sliding window splitter.
+        Content-defined chunking on sentence boundaries (see chunking.py).
         """
         if not text:
             return []
-            
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = min(start + chunk_size, text_len)
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            if end == text_len:
-                break
-                
-            start += (chunk_size - overlap)
-            
-        return chunks
+        return chunk_text(text)
 
 # Singleton instance
 vector_db = VectorDBClient()
@@ -216,7 +216,7 @@ function ChatPage() {
     setIsThinking(true);
 
     try {
-      const response = await fetch("http://localhost:8000/api/chat", {
+      const response = await fetch("http://localhost:8000/api/chat/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -224,22 +224,56 @@ function ChatPage() {
           context_files: selectedFiles.length > 0 ? selectedFiles : ["latest"] // 선택된 게 없으면 "latest"
         })
       });
-      const data = await response.json();
-
-      // [NEW] 응답 구조 변경 대응 (JSON: { thought, answer, sources })
-      // 기존 문자열 응답과 호환성 유지
-      const answerText = data.answer || data.response || "응답이 없습니다.";
-      const thoughtText = data.thought || null;
-      const sources = data.sources || [];
-
-      const newAiMsg = {
-        id: Date.now() + 1,
-        text: answerText,
-        thought: thoughtText,
-        sources: sources,
-        sender: 'ai'
+      if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+      // [NEW] SSE 스트리밍: 답변 글자가 도착하는 대로 말풍선에 이어 붙임
+      const aiMsgId = Date.now() + 1;
+      let started = false;
+      const updateAiMsg = (patch) => {
+        if (!started) {
+          started = true;
+          setIsThinking(false);
+          setMessages((prev) => [...prev, { id: aiMsgId, text: "", thought: null, sources: [], sender: 'ai', ...patch({ text: "", thought: null }) }]);
+          return;
+        }
+        setMessages((prev) => prev.map((m) => (m.id === aiMsgId ? { ...m, ...patch(m) } : m)));
       };
-      setMessages((prev) => [...prev, newAiMsg]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // 이벤트는 빈 줄(\n\n)로 구분됨
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const raw = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const eventName = (raw.match(/^event: (.*)$/m) || [])[1];
+          const dataLine = (raw.match(/^data: (.*)$/m) || [])[1];
+          if (!eventName || !dataLine) continue;
+          const data = JSON.parse(dataLine);
+
+          if (eventName === "thought") {
+            updateAiMsg((m) => ({ thought: (m.thought || "") + data.delta }));
+          } else if (eventName === "answer") {
+            updateAiMsg((m) => ({ text: m.text + data.delta }));
+          } else if (eventName === "sources") {
+            updateAiMsg(() => ({ sources: data.sources || [] }));
+          } else if (eventName === "done") {
+            // 최종 응답으로 덮어써서 파싱 실패 시의 대체 응답도 반영
+            updateAiMsg(() => ({
+              text: data.answer || data.response || "응답이 없습니다.",
+              thought: data.thought || null,
+              sources: data.sources || []
+            }));
+          }
+        }
+      }
+      if (!started) throw new Error("Empty stream");
     } catch (error) {
       console.error("Chat Error:", error);
       const errorMsg = {
@@ -678,9 +712,12 @@ function ReportPage() {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [viewMode, setViewMode] = useState('list'); // 'list' | 'map'
+  const [script, setScript] = useState(null); // 원본 스크립트 (펼칠 때 지연 로딩)
 
   useEffect(() => {
-    fetch(`http://localhost:8000/api/history/${filename}`)
+    setScript(null);
+    // 상세/마인드맵에 필요한 필드만 요청 (원본 스크립트 제외)
+    fetch(`http://localhost:8000/api/history/${filename}?fields=summary,keywords,action_items,suggestions,raw_json`)
       .then(res => res.json())
       .then(d => {
         setData(d);
@@ -692,6 +729,17 @@ function ReportPage() {
       });
   }, [filename]);
 
+  const loadScript = (e) => {
+    if (!e.currentTarget.open || script !== null) return;
+    fetch(`http://localhost:8000/api/history/${filename}/transcript`)
+      .then(res => res.json())
+      .then(d => setScript(d.raw_script || "저장된 스크립트가 없습니다."))
+      .catch(err => {
+        console.error(err);
+        setScript("스크립트를 불러오지 못했습니다.");
+      });
+  };
+
   if (loading) return <LoadingSpinner text="기록을 불러오는 중..." />;
   if (!data) return <div style={{ padding: 20 }}>데이터를 찾을 수 없습니다.</div>;
 
@@ -791,26 +839,24 @@ function ReportPage() {
             </details>
           )}
 
-          {/* [NEW] Original Script View */}
-          {data.raw_script && (
-            <details style={{ marginTop: '10px', color: '#888' }}>
-              <summary style={{ cursor: 'pointer' }}>원본 회의록 스크립트 보기</summary>
-              <div style={{
-                background: '#fcfcfc',
-                padding: '15px',
-                borderRadius: '5px',
-                border: '1px solid #eee',
-                marginTop: '10px',
-                whiteSpace: 'pre-wrap',
-                lineHeight: '1.6',
-                color: '#333',
-                maxHeight: '300px',
-                overflowY: 'auto'
-              }}>
-                {data.raw_script}
-              </div>
-            </details>
-          )}
+          {/* [NEW] Original Script View - 펼칠 때 /transcript에서 불러옴 */}
+          <details style={{ marginTop: '10px', color: '#888' }} onToggle={loadScript}>
+            <summary style={{ cursor: 'pointer' }}>원본 회의록 스크립트 보기</summary>
+            <div style={{
+              background: '#fcfcfc',
+              padding: '15px',
+              borderRadius: '5px',
+              border: '1px solid #eee',
+              marginTop: '10px',
+              whiteSpace: 'pre-wrap',
+              lineHeight: '1.6',
+              color: '#333',
+              maxHeight: '300px',
+              overflowY: 'auto'
+            }}>
+              {script === null ? "불러오는 중..." : script}
+            </div>
+          </details>
 
         </>
       ) : (
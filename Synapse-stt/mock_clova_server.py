@@ -0,0 +1,138 @@
+"""
+Clova Speech 장문인식(/recognizer/upload)을 흉내 내는 로컬 테스트 서버 (표준 라이브러리만 사용).
+실제 인식 대신 WAV를 무음 기준으로 발화 단위로 나누고, 음량 크기로 화자를 구분해 Clova 응답 형식으로 돌려줍니다.
+화자 라벨은 요청마다 등장 순서대로 1, 2, ...를 매기므로, 조각마다 라벨이 달라지는 실제 상황(분할 인식 시 화자 매칭)을 재현합니다.
+
+사용 예:
+    python mock_clova_server.py --port 8765
+    CLOVA_INVOKE_URL=http://127.0.0.1:8765 CLOVA_API_KEY=test python ../tests/chunked_stt_test.py
+
+--rtf 옵션으로 오디오 길이에 비례한 처리 지연(실시간 대비 배율)을 줄 수 있어 병렬 처리 효과를 확인할 수 있습니다.
+"""
+import io
+import json
+import time
+import wave
+import array
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FRAME_SECONDS = 0.1
+SILENCE_LEVEL = 500        # 평균 절대 진폭이 이보다 작으면 무음
+MIN_PAUSE_FRAMES = 3       # 0.3초 이상 조용하면 발화 경계
+LOUD_LEVEL = 6000          # 이보다 크면 다른 화자로 취급
+
+
+def parse_multipart(content_type: str, body: bytes):
+    """multipart/form-data 본문을 {필드 이름: 바이트} 로 변환"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def frame_levels(media: bytes):
+    with wave.open(io.BytesIO(media), "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError("mock server only supports 16-bit PCM WAV")
+        rate = w.getframerate()
+        frame_len = int(rate * FRAME_SECONDS) * w.getnchannels()
+        samples = array.array("h", w.readframes(w.getnframes()))
+    return [sum(map(abs, samples[i:i + frame_len])) / max(1, len(samples[i:i + frame_len]))
+            for i in range(0, len(samples), frame_len)], len(samples) / w.getnchannels() / rate
+
+
+def recognize(media: bytes):
+    """발화 구간을 찾아 Clova 응답(JSON dict)을 만듭니다. 시간 단위는 ms"""
+    levels, duration = frame_levels(media)
+    utterances, current, quiet = [], None, 0
+    for i, level in enumerate(levels + [0] * MIN_PAUSE_FRAMES):
+        if level >= SILENCE_LEVEL:
+            if current is None:
+                current = [i, i + 1, []]
+            current[1] = i + 1
+            current[2].append(level)
+            quiet = 0
+        elif current is not None:
+            quiet += 1
+            if quiet >= MIN_PAUSE_FRAMES:
+                utterances.append(current)
+                current, quiet = None, 0
+
+    labels = {}
+    segments = []
+    for start, end, speech in utterances:
+        voice = "loud" if sum(speech) / len(speech) >= LOUD_LEVEL else "soft"
+        label = labels.setdefault(voice, str(len(labels) + 1))
+        start_ms, end_ms = int(start * FRAME_SECONDS * 1000), int(end * FRAME_SECONDS * 1000)
+        segments.append({
+            "start": start_ms,
+            "end": end_ms,
+            "text": f"{voice} {start_ms}",
+            "confidence": 0.9,
+            "speaker": {"label": label, "name": chr(ord("A") + int(label) - 1), "edited": False},
+        })
+    return {
+        "result": "COMPLETED",
+        "message": "Succeeded",
+        "segments": segments,
+        "text": " ".join(seg["text"] for seg in segments),
+        "confidence": 0.9,
+        "speakers": [{"label": label, "name": chr(ord("A") + int(label) - 1), "edited": False}
+                     for label in labels.values()],
+    }, duration
+
+
+class MockClovaHandler(BaseHTTPRequestHandler):
+    rtf = 0.0
+    requests = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        if not self.path.endswith("/recognizer/upload"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        fields = parse_multipart(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        try:
+            result, duration = recognize(fields["media"])
+        except (KeyError, ValueError, wave.Error, EOFError) as e:
+            self._reply(400, {"result": "FAILED", "message": str(e)})
+            return
+        with MockClovaHandler._lock:
+            MockClovaHandler.requests += 1
+        time.sleep(duration * self.rtf)
+        self._reply(200, result)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int = 0, rtf: float = 0.0):
+    """백그라운드 스레드에서 서버를 띄우고 (server, base_url) 반환. 테스트 스크립트에서 사용"""
+    MockClovaHandler.rtf = rtf
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockClovaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rtf", type=float, default=0.0)
+    args = parser.parse_args()
+    MockClovaHandler.rtf = args.rtf
+    print(f"Mock Clova Speech server on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), MockClovaHandler).serve_forever()
@@ -0,0 +1,123 @@
+"""
+Clova Speech 실시간 인식(gRPC NestService.recognize)을 흉내 내는 로컬 테스트 서버.
+16kHz/mono/16bit PCM 조각을 받는 대로 0.1초 단위 음량으로 발화 구간을 찾고,
+말하는 중에는 중간 결과(epFlag=false)를, 0.3초 이상 조용해지거나 입력이 끝나면 확정 결과(epFlag=true)를 보냅니다.
+화자는 mock_clova_server와 같은 기준(음량)으로 구분합니다.
+
+사용 예:
+    python mock_nest_server.py --port 50051
+    CLOVA_GRPC_TARGET=127.0.0.1:50051 CLOVA_GRPC_INSECURE=true python ../tests/clova_stream_test.py
+"""
+import os
+import sys
+import json
+import array
+import argparse
+from concurrent import futures
+
+nest_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "클로바실시간")
+if nest_dir not in sys.path:
+    sys.path.append(nest_dir)
+
+import grpc
+import nest_pb2
+import nest_pb2_grpc
+from mock_clova_server import FRAME_SECONDS, SILENCE_LEVEL, MIN_PAUSE_FRAMES, LOUD_LEVEL
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = int(SAMPLE_RATE * FRAME_SECONDS) * 2
+PARTIAL_EVERY_FRAMES = 5   # 말하는 중에는 0.5초마다 중간 결과
+
+
+class _Recognizer:
+    """한 스트림의 발화 검출 상태. 현재 발화의 음량 목록 외에는 아무것도 쌓지 않음"""
+
+    def __init__(self):
+        self.buffer = b""
+        self.frame_index = 0
+        self.speech = None       # [시작 프레임, 끝 프레임, 음량 목록]
+        self.quiet = 0
+        self.labels = {}
+
+    def feed(self, chunk: bytes, final: bool = False):
+        self.buffer += chunk
+        while len(self.buffer) >= FRAME_BYTES:
+            frame, self.buffer = self.buffer[:FRAME_BYTES], self.buffer[FRAME_BYTES:]
+            yield from self._frame(frame)
+        if final:
+            if self.buffer:
+                yield from self._frame(self.buffer)
+                self.buffer = b""
+            if self.speech is not None:
+                yield self._result(True)
+
+    def _frame(self, frame: bytes):
+        samples = array.array("h", frame[:len(frame) - len(frame) % 2])
+        level = sum(map(abs, samples)) / max(1, len(samples))
+        index = self.frame_index
+        self.frame_index += 1
+        if level >= SILENCE_LEVEL:
+            if self.speech is None:
+                self.speech = [index, index + 1, []]
+            self.speech[1] = index + 1
+            self.speech[2].append(level)
+            self.quiet = 0
+            if len(self.speech[2]) % PARTIAL_EVERY_FRAMES == 0:
+                yield self._result(False)
+        elif self.speech is not None:
+            self.quiet += 1
+            if self.quiet >= MIN_PAUSE_FRAMES:
+                yield self._result(True)
+
+    def _result(self, final: bool):
+        start, end, levels = self.speech
+        voice = "loud" if sum(levels) / len(levels) >= LOUD_LEVEL else "soft"
+        label = self.labels.setdefault(voice, str(len(self.labels) + 1))
+        start_ms, end_ms = int(start * FRAME_SECONDS * 1000), int(end * FRAME_SECONDS * 1000)
+        if final:
+            self.speech, self.quiet = None, 0
+        transcription = {
+            "text": f"{voice} {start_ms}" if final else voice,
+            "startTimestamp": start_ms,
+            "endTimestamp": end_ms,
+            "epFlag": final,
+            "confidence": 0.9,
+            "speaker": {"label": label},
+        }
+        return nest_pb2.NestResponse(contents=json.dumps({"transcription": transcription}, ensure_ascii=False))
+
+
+class MockNestServicer(nest_pb2_grpc.NestServiceServicer):
+    def recognize(self, request_iterator, context):
+        recognizer = _Recognizer()
+        configured = False
+        for request in request_iterator:
+            if request.type == nest_pb2.RequestType.CONFIG:
+                configured = True
+                yield nest_pb2.NestResponse(contents=json.dumps({"responseType": ["config"], "config": {"status": "Success"}}))
+                continue
+            if not configured:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "CONFIG request must come first")
+            ep_flag = json.loads(request.data.extra_contents or "{}").get("epFlag", False)
+            yield from recognizer.feed(request.data.chunk, final=ep_flag)
+            if ep_flag:
+                return
+        yield from recognizer.feed(b"", final=True)
+
+
+def start_server(port: int = 0):
+    """백그라운드에서 서버를 띄우고 (server, target) 반환. 테스트 스크립트에서 사용"""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+    nest_pb2_grpc.add_NestServiceServicer_to_server(MockNestServicer(), server)
+    port = server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=50051)
+    args = parser.parse_args()
+    server, target = start_server(args.port)
+    print(f"Mock Clova NestService on {target}")
+    server.wait_for_termination()
@@ -1,6 +1,10 @@
 import requests
+import httpx
+import asyncio
 import json
 import os
+import sys
+import uuid
 from dotenv import load_dotenv
 from stt.STT_interface import STTProvider, STTSegment, STTResult
 from typing import Iterator, Generator
@@ -19,9 +23,24 @@ class ClovaSpeechClient(STTProvider):
         "speakerCountMax": -1
     }
 
-    def req_upload(self, file, completion, callback=None, userdata=None, forbiddens=None, boostings=None,
-                   wordAlignment=True, fullText=True, diarization=None, sed=None):
-        request_body = {
+    # 타임아웃(초). completion='sync'는 인식이 끝날 때까지 응답을 기다리므로 read 타임아웃을 길게 둠
+    connect_timeout = float(os.getenv('CLOVA_CONNECT_TIMEOUT', '10'))
+    read_timeout = float(os.getenv('CLOVA_READ_TIMEOUT', '600'))
+    write_timeout = float(os.getenv('CLOVA_WRITE_TIMEOUT', '120'))
+    max_connections = int(os.getenv('CLOVA_MAX_CONNECTIONS', '4'))
+    upload_chunk_size = 256 * 1024
+
+    # 실시간 인식(gRPC) 엔드포인트
+    grpc_target = os.getenv('CLOVA_GRPC_TARGET', 'clovaspeech-gw.ncloud.com:50051')
+    grpc_insecure = os.getenv('CLOVA_GRPC_INSECURE', 'false').lower() == 'true'
+    stream_chunk_size = 32000  # 16kHz/16bit/mono 기준 1초
+
+    def __init__(self):
+        self._async_client = None
+
+    def _request_body(self, completion, callback=None, userdata=None, forbiddens=None, boostings=None,
+                      wordAlignment=True, fullText=True, diarization=None, sed=None):
+        return {
             'language': 'ko-KR',
             'completion': completion,
             'callback': callback,
@@ -33,23 +52,125 @@ class ClovaSpeechClient(STTProvider):
             'diarization': diarization,
             'sed': sed,
         }
-        headers = {
+
+    def cache_settings(self):
+        # 인식 결과에 영향을 주는 옵션만 포함 (callback/userdata 제외)
+        body = self._request_body('sync', diarization=self.diarization_settings)
+        return {
+            "provider": "clova",
+            "invoke_url": self.invoke_url,
+            **{k: body[k] for k in ('language', 'wordAlignment', 'fullText', 'forbiddens', 'boostings', 'diarization', 'sed')},
+        }
+
+    def _headers(self):
+        return {
             'Accept': 'application/json;UTF-8',
             'X-CLOVASPEECH-API-KEY': self.secret
         }
+
+    def req_upload(self, file, completion, callback=None, userdata=None, forbiddens=None, boostings=None,
+                   wordAlignment=True, fullText=True, diarization=None, sed=None):
+        request_body = self._request_body(completion, callback, userdata, forbiddens, boostings,
+                                          wordAlignment, fullText, diarization, sed)
         # print(json.dumps(request_body, ensure_ascii=False).encode('UTF-8')) #requestbody출력
-        files = {
-            'media': open(file, 'rb'),
-            'params': (None, json.dumps(request_body, ensure_ascii=False).encode('UTF-8'), 'application/json')
-        }
-        response = requests.post(headers=headers, url=self.invoke_url + '/recognizer/upload', files=files)
+        with open(file, 'rb') as media:
+            files = {
+                'media': media,
+                'params': (None, json.dumps(request_body, ensure_ascii=False).encode('UTF-8'), 'application/json')
+            }
+            response = requests.post(headers=self._headers(), url=self.invoke_url + '/recognizer/upload', files=files,
+                                     timeout=(self.connect_timeout, self.read_timeout))
         
         return response
 
+    # --- 비동기 업로드 ---
+
+    @property
+    def async_client(self):
+        """최초 사용 시 한 번만 생성하여 keep-alive 연결을 재사용하는 httpx.AsyncClient"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout,
+                                      write=self.write_timeout, pool=self.connect_timeout),
+            )
+        return self._async_client
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    async def areq_upload(self, media_chunks, media_size, filename, completion, **options):
+        """
+        req_upload의 비동기 버전. 파일 전체를 메모리에 올리지 않고 multipart 본문을 조각 단위로 전송합니다.
+        media_chunks: 오디오 바이트 조각을 내보내는 async iterator / media_size: 전체 바이트 수
+        """
+        request_body = self._request_body(completion, **options)
+        params = json.dumps(request_body, ensure_ascii=False).encode('UTF-8')
+        boundary = uuid.uuid4().hex
+        head, tail = self._multipart_envelope(boundary, params, filename)
+
+        async def body():
+            yield head
+            async for chunk in media_chunks:
+                yield chunk
+            yield tail
+
+        headers = dict(self._headers())
+        headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        # 청크 전송(chunked encoding) 대신 길이를 미리 알려줌
+        headers['Content-Length'] = str(len(head) + media_size + len(tail))
+        return await self.async_client.post(self.invoke_url + '/recognizer/upload', headers=headers, content=body())
+
+    @staticmethod
+    def _multipart_envelope(boundary, params, filename):
+        """params 파트 + media 파트 헤더(head)와 닫는 경계(tail). 오디오 바이트는 그 사이에 들어감"""
+        safe_name = os.path.basename(filename).replace('"', '')
+        head = (
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="params"\r\n'
+            'Content-Type: application/json\r\n\r\n'
+        ).encode('UTF-8') + params + (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="media"; filename="{safe_name}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode('UTF-8')
+        tail = f'\r\n--{boundary}--\r\n'.encode('UTF-8')
+        return head, tail
+
+    async def _read_file_chunks(self, path):
+        # 디스크 읽기도 스레드에서 수행하여 이벤트 루프를 막지 않음
+        with open(path, 'rb') as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.upload_chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
     # file path만 받아서 사용
     def transcribe_from_file(self, audio_file_path:str):
         res = self.req_upload(file=audio_file_path,completion='sync',diarization=self.diarization_settings)
-        res_json = res.json()
+        if res.status_code != 200:
+            raise RuntimeError(f"Clova API 오류: {res.status_code} / {res.text}")
+        return self._parse_result(res.json())
+
+    async def atranscribe_from_file(self, audio_file_path:str):
+        """transcribe_from_file의 비동기 버전 (연결 풀 재사용, 파일은 조각 단위로 업로드)"""
+        return await self.atranscribe_from_chunks(
+            self._read_file_chunks(audio_file_path), os.path.getsize(audio_file_path), audio_file_path
+        )
+
+    async def atranscribe_from_chunks(self, chunks, size:int, filename:str="audio"):
+        """업로드 본문을 임시 파일 없이 그대로 multipart 본문으로 전달 (Content-Length를 위해 size 필요)"""
+        res = await self.areq_upload(chunks, size, filename, completion='sync', diarization=self.diarization_settings)
+        if res.status_code != 200:
+            raise RuntimeError(f"Clova API 오류: {res.status_code} / {res.text}")
+        return self._parse_result(res.json())
+
+    @staticmethod
+    def _parse_result(res_json):
         full_text = res_json.get("text","")
 
         segments = []
@@ -71,31 +192,148 @@ class ClovaSpeechClient(STTProvider):
         )
         return result
     
-    # 파일을 쪼개 받아온뒤 합쳐서 사용 #현재는 사용하지않음
-    def transcribe_stream(self, audio_stream: Iterator[bytes]) -> Generator[STTResult, None, None]:
-        audio_bytes = b"".join(chunk for chunk in audio_stream)
-        response = self._upload_audio(audio_bytes)
-        res_json = response.json()
+    # --- 실시간 인식 (gRPC NestService.recognize 양방향 스트림) ---
 
-        if response.status_code != 200:
-            raise RuntimeError(f"Clova API 오류: {response.status_code} / {res_json}")
+    @staticmethod
+    def _nest():
+        """
+        gRPC 모듈을 처음 사용할 때 불러옴 (파일 인식만 쓰는 환경은 grpcio 없이도 동작)
+        nest_pb2/nest_pb2_grpc는 클로바실시간 디렉토리에서 생성된 코드를 그대로 사용
+        """
+        nest_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "클로바실시간")
+        if nest_dir not in sys.path:
+            sys.path.append(nest_dir)
+        import grpc
+        import nest_pb2
+        import nest_pb2_grpc
+        return grpc, nest_pb2, nest_pb2_grpc
 
-        full_text = res_json.get("text", "")
-        segments = []
-        for seg in res_json.get("segments", []):
-            speaker_data = seg.get("speaker", {})
-            segments.append(
-                STTSegment(
-                    start=seg.get("start", 0.0)/1000,
-                    end=seg.get("end", 0.0)/1000,
-                    text=seg.get("text", ""),
-                    speaker_info = speaker_data,
-                    speaker = speaker_data.get("name", "Unknown")
-                )
-            )
+    def _grpc_channel(self, grpc_module):
+        """grpc 또는 grpc.aio 모듈을 받아 채널 생성. 로컬 모의 서버는 CLOVA_GRPC_INSECURE=true"""
+        if self.grpc_insecure:
+            return grpc_module.insecure_channel(self.grpc_target)
+        import grpc
+        return grpc_module.secure_channel(self.grpc_target, grpc.ssl_channel_credentials())
 
-        yield STTResult(
-            full_text=full_text,
-            segments=segments,
-            duration=res_json.get("duration", 0.0)
+    def _grpc_metadata(self):
+        return (("authorization", f"Bearer {self.secret}"),)
+
+    def _stream_config_request(self, nest_pb2):
+        return nest_pb2.NestRequest(
+            type=nest_pb2.RequestType.CONFIG,
+            config=nest_pb2.NestConfig(config=json.dumps({"transcription": {"language": "ko"}}))
+        )
+
+    @staticmethod
+    def _stream_data_request(nest_pb2, chunk: bytes, seq_id: int, ep_flag: bool):
+        return nest_pb2.NestRequest(
+            type=nest_pb2.RequestType.DATA,
+            data=nest_pb2.NestData(chunk=chunk, extra_contents=json.dumps({"seqId": seq_id, "epFlag": ep_flag}))
+        )
+
+    def _split_stream_chunk(self, chunk: bytes):
+        for i in range(0, len(chunk), self.stream_chunk_size):
+            yield chunk[i:i + self.stream_chunk_size]
+
+    def _stream_requests(self, nest_pb2, audio_stream: Iterator[bytes]):
+        """
+        CONFIG 요청 다음 오디오를 stream_chunk_size 이하의 DATA 요청으로 보냄. 마지막 조각에는 epFlag=True.
+        gRPC가 보낼 수 있을 때만 다음 요청을 꺼내므로(흐름 제어) 입력을 미리 읽어 쌓아두지 않음
+        """
+        yield self._stream_config_request(nest_pb2)
+        seq_id = 0
+        pending = None
+        for chunk in audio_stream:
+            for piece in self._split_stream_chunk(chunk):
+                if pending is not None:
+                    yield self._stream_data_request(nest_pb2, pending, seq_id, False)
+                    seq_id += 1
+                pending = piece
+        yield self._stream_data_request(nest_pb2, pending or b"", seq_id, True)
+
+    async def _astream_requests(self, nest_pb2, audio_chunks):
+        """_stream_requests의 비동기 버전 (audio_chunks는 async iterator)"""
+        yield self._stream_config_request(nest_pb2)
+        seq_id = 0
+        pending = None
+        async for chunk in audio_chunks:
+            for piece in self._split_stream_chunk(chunk):
+                if pending is not None:
+                    yield self._stream_data_request(nest_pb2, pending, seq_id, False)
+                    seq_id += 1
+                pending = piece
+        yield self._stream_data_request(nest_pb2, pending or b"", seq_id, True)
+
+    @staticmethod
+    def _parse_stream_response(contents: str):
+        """NestResponse.contents(JSON) -> (STTSegment, 확정 여부). 인식 결과가 아니면 None"""
+        try:
+            data = json.loads(contents) if contents else {}
+        except json.JSONDecodeError:
+            return None
+        transcription = data.get("transcription")
+        if not transcription or not transcription.get("text"):
+            return None
+        start = transcription.get("startTimestamp", 0) / 1000
+        end = transcription.get("endTimestamp", transcription.get("startTimestamp", 0)) / 1000
+        segment = STTSegment(
+            start=start,
+            end=max(start, end),
+            text=transcription["text"],
+            speaker=transcription.get("speaker") or {"label": "1"},
         )
+        return segment, bool(transcription.get("epFlag", False))
+
+    def transcribe_stream(self, audio_stream: Iterator[bytes], partial_results: bool = False) -> Generator[STTResult, None, None]:
+        """
+        오디오 조각(16kHz, mono, 16bit PCM)을 받는 대로 전송하면서, 문장이 확정(epFlag)될 때마다
+        그 문장 하나만 담은 STTResult를 yield. 지난 결과는 보관하지 않으므로 녹음 길이와 무관하게 메모리 사용량이 일정함
+        partial_results=True면 확정 전 중간 결과도 is_final=False로 yield
+        """
+        grpc, nest_pb2, nest_pb2_grpc = self._nest()
+        channel = self._grpc_channel(grpc)
+        responses = None
+        try:
+            stub = nest_pb2_grpc.NestServiceStub(channel)
+            responses = stub.recognize(self._stream_requests(nest_pb2, audio_stream), metadata=self._grpc_metadata())
+            for response in responses:
+                parsed = self._parse_stream_response(response.contents)
+                if parsed is None:
+                    continue
+                segment, is_final = parsed
+                if is_final or partial_results:
+                    yield STTResult(full_text=segment.text, segments=[segment], duration=segment.end, is_final=is_final)
+        except grpc.RpcError as e:
+            raise RuntimeError(f"Clova 스트리밍 오류: {e.code()} / {e.details()}") from e
+        finally:
+            # 소비자가 중간에 멈춰도 서버 쪽 스트림을 정리
+            if responses is not None:
+                responses.cancel()
+            channel.close()
+
+    async def atranscribe_stream(self, audio_chunks, partial_results: bool = False):
+        """
+        transcribe_stream의 비동기 버전 (grpc.aio). audio_chunks는 PCM 조각을 내는 async iterator.
+        grpc.aio는 이전 요청을 보낸 뒤에야 audio_chunks에서 다음 조각을 꺼내므로,
+        전송이 밀리면 입력(예: WebSocket 수신)도 함께 멈춰 백프레셔가 생김
+        """
+        grpc, nest_pb2, nest_pb2_grpc = self._nest()
+        from grpc import aio
+        channel = self._grpc_channel(aio)
+        call = None
+        try:
+            stub = nest_pb2_grpc.NestServiceStub(channel)
+            call = stub.recognize(self._astream_requests(nest_pb2, audio_chunks), metadata=self._grpc_metadata())
+            async for response in call:
+                parsed = self._parse_stream_response(response.contents)
+                if parsed is None:
+                    continue
+                segment, is_final = parsed
+                if is_final or partial_results:
+                    yield STTResult(full_text=segment.text, segments=[segment], duration=segment.end, is_final=is_final)
+        except grpc.RpcError as e:
+            raise RuntimeError(f"Clova 스트리밍 오류: {e.code()} / {e.details()}") from e
+        finally:
+            if call is not None:
+                call.cancel()
+            await channel.close()
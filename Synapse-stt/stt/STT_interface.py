@@ -1,3 +1,6 @@
+import os
+import asyncio
+import tempfile
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Generator, Iterator
@@ -19,6 +22,7 @@ class STTResult:
     full_text: str #전체 텍스트
     segments: list[STTSegment] #STTSegment들을 원소로 가짐
     duration: float = 0.0 #전체오디오길이
+    is_final: bool = True #스트리밍 인식에서 확정 전 중간 결과이면 False
 # [2] 추상 인터페이스 (설계도)
 class STTProvider(ABC):
     @abstractmethod
@@ -36,4 +40,38 @@ class STTProvider(ABC):
         """
         pass
 
+    async def atranscribe_stream(self, audio_chunks, partial_results: bool = False):
+        """
+        transcribe_stream의 비동기 버전 (audio_chunks는 async iterator). 실시간 인식을 지원하는 제공자만 재정의
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support live streaming")
+        yield
+
+    def cache_settings(self) -> dict:
+        """
+        같은 오디오라도 결과가 달라지는 설정 (STT 결과 캐시 키에 포함).
+        언어, 화자 분리 등 인식 옵션이 있는 제공자는 재정의해야 함
+        """
+        return {"provider": type(self).__name__}
+
+    async def atranscribe_from_file(self, audio_file_path:str):
+        """
+        transcribe_from_file의 비동기 버전.
+        비동기 클라이언트가 없는 구현체는 스레드 풀에서 transcribe_from_file을 실행하여 이벤트 루프를 막지 않음
+        """
+        return await asyncio.to_thread(self.transcribe_from_file, audio_file_path)
+
+    async def atranscribe_from_chunks(self, chunks, size:int, filename:str="audio"):
+        """
+        오디오 바이트 조각(async iterator)을 받아 STTResult를 반환.
+        기본 구현은 파일 경로가 필요한 제공자를 위해 요청별 임시 디렉토리에 저장한 뒤 atranscribe_from_file을 호출하며,
+        업로드를 바로 전달할 수 있는 제공자는 재정의하여 디스크를 거치지 않도록 함
+        """
+        with tempfile.TemporaryDirectory(prefix="synapse_stt_") as tmp_dir:
+            path = os.path.join(tmp_dir, os.path.basename(filename) or "audio")
+            with open(path, "wb") as f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(f.write, chunk)
+            return await self.atranscribe_from_file(path)
+
 
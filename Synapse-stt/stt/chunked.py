@@ -0,0 +1,303 @@
+"""
+긴 녹음을 무음에 가까운 지점에서 여러 조각으로 나눠 동시에 인식한 뒤 하나의 STTResult로 이어 붙이는 STTProvider 래퍼.
+- 분할: 목표 길이(chunk_seconds) 주변 ±search_seconds 구간에서 에너지가 가장 낮은 지점을 찾음 (WAV는 wave 모듈, 그 외는 ffmpeg로 변환)
+- 인식: 조각마다 내부 제공자를 호출하되 동시 실행 수를 max_concurrency로 제한
+- 병합: 조각 시작 시각만큼 세그먼트 시간을 보정하고, 조각 사이의 겹치는 구간(overlap_seconds)에서
+        양쪽 결과를 비교해 조각마다 따로 매겨진 화자 라벨을 하나로 맞춤
+"""
+import os
+import sys
+import wave
+import array
+import shutil
+import asyncio
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Generator
+from stt.STT_interface import STTProvider, STTSegment, STTResult
+
+CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "600"))
+OVERLAP_SECONDS = float(os.getenv("STT_CHUNK_OVERLAP_SECONDS", "4"))
+SEARCH_SECONDS = float(os.getenv("STT_CHUNK_SEARCH_SECONDS", "30"))
+MAX_CONCURRENCY = int(os.getenv("STT_CHUNK_CONCURRENCY", "4"))
+# 이보다 작은 업로드는 분할할 만큼 길지 않다고 보고 임시 파일 없이 내부 제공자로 바로 전달
+MIN_SPLIT_BYTES = int(os.getenv("STT_CHUNK_MIN_MB", "10")) * 1024 * 1024
+
+_FRAME_SECONDS = 0.1       # 에너지 계산 단위
+_SMOOTH_FRAMES = 5         # 0.5초 구간 평균으로 가장 조용한 곳을 찾음
+_COPY_FRAMES = 64 * 1024   # WAV 조각 복사 단위 (메모리 사용량 제한)
+
+
+# --- 오디오 분할 ---
+
+def _to_wav(path: str, tmp_dir: str):
+    """wave 모듈로 읽을 수 있으면 그대로, 아니면 ffmpeg로 16kHz mono WAV 변환. 둘 다 안 되면 None"""
+    try:
+        with wave.open(path, "rb"):
+            return path
+    except (wave.Error, EOFError):
+        pass
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    wav_path = os.path.join(tmp_dir, "source.wav")
+    completed = subprocess.run(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", path, "-ac", "1", "-ar", "16000", wav_path],
+        capture_output=True
+    )
+    return wav_path if completed.returncode == 0 else None
+
+
+def _frame_energies(w: wave.Wave_read, start_s: float, end_s: float):
+    """start_s ~ end_s 구간을 _FRAME_SECONDS 단위로 나눈 평균 절대 진폭 목록"""
+    rate, width = w.getframerate(), w.getsampwidth()
+    frame_len = max(1, int(rate * _FRAME_SECONDS))
+    w.setpos(int(start_s * rate))
+    energies = []
+    for _ in range(int((end_s - start_s) / _FRAME_SECONDS)):
+        data = w.readframes(frame_len)
+        if not data:
+            break
+        if width == 2:
+            samples = array.array("h", data[:len(data) - len(data) % 2])
+            if sys.byteorder == "big":
+                samples.byteswap()
+        elif width == 1:
+            samples = [b - 128 for b in data]
+        else:
+            # 24/32비트는 상위 바이트만으로도 무음 여부를 판단하기에 충분
+            samples = array.array("b", data[width - 1::width])
+        energies.append(sum(map(abs, samples)) / max(1, len(samples)))
+    return energies
+
+
+def _quietest_point(w: wave.Wave_read, lo: float, hi: float, target: float) -> float:
+    """lo ~ hi에서 0.5초 평균 에너지가 가장 낮은 지점. 비슷하게 조용한 곳이 여러 개면 target에 가장 가까운 곳"""
+    energies = _frame_energies(w, lo, hi)
+    if len(energies) <= _SMOOTH_FRAMES:
+        return min(max(target, lo), hi)
+    windows = [sum(energies[:_SMOOTH_FRAMES])]
+    for i in range(1, len(energies) - _SMOOTH_FRAMES + 1):
+        windows.append(windows[-1] + energies[i + _SMOOTH_FRAMES - 1] - energies[i - 1])
+    threshold = min(windows) * 1.1 + _SMOOTH_FRAMES
+    candidates = [lo + (i + _SMOOTH_FRAMES / 2) * _FRAME_SECONDS for i, e in enumerate(windows) if e <= threshold]
+    return min(candidates, key=lambda t: abs(t - target))
+
+
+def find_split_points(wav_path: str, chunk_seconds: float = CHUNK_SECONDS, search_seconds: float = SEARCH_SECONDS):
+    """
+    반환값: (전체 길이(초), 분할 지점 목록(초))
+    전체가 chunk_seconds의 1.5배보다 짧으면 나누지 않음. 분할 후보 주변만 읽으므로 파일 전체를 스캔하지 않음
+    """
+    with wave.open(wav_path, "rb") as w:
+        duration = w.getnframes() / w.getframerate()
+        points = []
+        if chunk_seconds <= 0 or duration < chunk_seconds * 1.5:
+            return duration, points
+
+        previous = 0.0
+        target = chunk_seconds
+        while duration - target > chunk_seconds * 0.5:
+            lo = max(previous + chunk_seconds * 0.5, target - search_seconds)
+            hi = min(duration - chunk_seconds * 0.25, target + search_seconds)
+            point = _quietest_point(w, lo, hi, target) if hi > lo else target
+            points.append(point)
+            previous = point
+            target = point + chunk_seconds
+        return duration, points
+
+
+def write_wav_slice(src_path: str, dst_path: str, start_s: float, end_s: float):
+    with wave.open(src_path, "rb") as src, wave.open(dst_path, "wb") as dst:
+        rate = src.getframerate()
+        dst.setparams(src.getparams())
+        src.setpos(int(start_s * rate))
+        remaining = int((end_s - start_s) * rate)
+        while remaining > 0:
+            data = src.readframes(min(_COPY_FRAMES, remaining))
+            if not data:
+                break
+            dst.writeframes(data)
+            remaining -= min(_COPY_FRAMES, remaining)
+
+
+def plan_chunks(duration: float, points: list, overlap_seconds: float = OVERLAP_SECONDS):
+    """
+    분할 지점으로 조각 범위 [(start, end)]를 만듭니다.
+    두 번째 조각부터는 분할 지점보다 overlap_seconds 앞에서 시작하여 앞 조각과 겹치게 함 (화자 매칭용)
+    """
+    bounds = [0.0] + list(points) + [duration]
+    return [(max(0.0, bounds[i] - overlap_seconds) if i else 0.0, bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+# --- 결과 병합 ---
+
+def _speaker_label(speaker):
+    if isinstance(speaker, dict):
+        return str(speaker.get("label") or speaker.get("name") or "")
+    return str(speaker) if speaker is not None else ""
+
+
+def _global_speaker(template, label: str):
+    """조각 내 화자 정보를 전역 라벨로 바꿈. Clova 형식(dict)이면 label/name을 함께 갱신"""
+    if isinstance(template, dict):
+        name = chr(ord("A") + int(label) - 1) if label.isdigit() and int(label) <= 26 else label
+        return {**template, "label": label, "name": name}
+    return label
+
+
+def _match_speakers(local_segments, merged, chunk_start, boundary, global_time):
+    """
+    겹치는 구간(boundary 이전)의 세그먼트가 앞 조각 결과와 시간상 얼마나 겹치는지로 화자를 투표해 매칭합니다.
+    겹치는 구간에서 말하지 않은 화자는 이번 조각에서 아직 매칭되지 않은 전역 화자(발화량 순)에 차례로 배정하고,
+    남는 전역 화자가 없을 때만 새 라벨을 발급합니다.
+    """
+    votes = defaultdict(Counter)
+    recent = [m for m in merged if m.end > chunk_start]
+    for seg in local_segments:
+        if (seg.start + seg.end) / 2 >= boundary:
+            continue
+        for prev in recent:
+            overlap = min(seg.end, prev.end) - max(seg.start, prev.start)
+            if overlap > 0:
+                votes[_speaker_label(seg.speaker)][_speaker_label(prev.speaker)] += overlap
+
+    mapping, used = {}, set()
+    for local, counter in sorted(votes.items(), key=lambda kv: -sum(kv[1].values())):
+        for candidate, _ in counter.most_common():
+            if candidate not in used:
+                mapping[local] = candidate
+                used.add(candidate)
+                break
+
+    local_time = Counter()
+    for seg in local_segments:
+        local_time[_speaker_label(seg.speaker)] += seg.end - seg.start
+    free = [label for label, _ in global_time.most_common() if label not in used]
+    for local, _ in local_time.most_common():
+        if local in mapping:
+            continue
+        if free:
+            mapping[local] = free.pop(0)
+        else:
+            mapping[local] = str(len(global_time) + 1)
+            global_time[mapping[local]] += 0
+    return mapping
+
+
+def stitch_results(results: list, ranges: list, duration: float) -> STTResult:
+    """조각별 STTResult를 전체 시간축으로 옮기고 화자 라벨을 맞춰 하나로 합칩니다."""
+    merged = []
+    global_time = Counter()
+    for i, (result, (start, _)) in enumerate(zip(results, ranges)):
+        local_segments = [
+            STTSegment(start=seg.start + start, end=seg.end + start, text=seg.text, speaker=seg.speaker)
+            for seg in result.segments
+        ]
+        boundary = ranges[i - 1][1] if i else None
+
+        if boundary is None:
+            mapping = {}
+            for seg in local_segments:
+                label = _speaker_label(seg.speaker)
+                mapping.setdefault(label, str(len(mapping) + 1))
+        else:
+            mapping = _match_speakers(local_segments, merged, start, boundary, global_time)
+
+        for seg in local_segments:
+            # 겹치는 구간은 앞 조각 결과를 사용
+            if boundary is not None and (seg.start + seg.end) / 2 < boundary:
+                continue
+            label = mapping.get(_speaker_label(seg.speaker), _speaker_label(seg.speaker))
+            seg.speaker = _global_speaker(seg.speaker, label)
+            global_time[label] += seg.end - seg.start
+            merged.append(seg)
+
+    return STTResult(
+        full_text=" ".join(seg.text.strip() for seg in merged if seg.text.strip()),
+        segments=merged,
+        duration=duration,
+    )
+
+
+class ChunkedSTTProvider(STTProvider):
+    """
+    내부 제공자(provider)를 감싸 긴 파일만 분할 인식합니다.
+    짧은 파일, WAV로 읽을 수 없는 파일(ffmpeg 없음), 스트리밍 입력은 내부 제공자에 그대로 위임합니다.
+    """
+
+    def __init__(self, provider: STTProvider, chunk_seconds: float = CHUNK_SECONDS,
+                 overlap_seconds: float = OVERLAP_SECONDS, max_concurrency: int = MAX_CONCURRENCY):
+        self.provider = provider
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_concurrency = max(1, max_concurrency)
+
+    def cache_settings(self):
+        return {**self.provider.cache_settings(), "chunk_seconds": self.chunk_seconds,
+                "overlap_seconds": self.overlap_seconds}
+
+    def transcribe_stream(self, audio_stream: Iterator[bytes], **options) -> Generator[STTResult, None, None]:
+        return self.provider.transcribe_stream(audio_stream, **options)
+
+    def atranscribe_stream(self, audio_chunks, **options):
+        return self.provider.atranscribe_stream(audio_chunks, **options)
+
+    async def atranscribe_from_chunks(self, chunks, size:int, filename:str="audio"):
+        """분할하려면 파일이 필요하므로 큰 업로드만 임시 디렉토리에 저장(STTProvider 기본 구현)"""
+        if self.chunk_seconds <= 0 or size < MIN_SPLIT_BYTES:
+            return await self.provider.atranscribe_from_chunks(chunks, size, filename)
+        return await super().atranscribe_from_chunks(chunks, size, filename)
+
+    async def aclose(self):
+        if hasattr(self.provider, "aclose"):
+            await self.provider.aclose()
+
+    def _prepare(self, audio_file_path: str, tmp_dir: str):
+        """분할이 필요하면 (조각 파일 경로 목록, 조각 범위, 전체 길이), 아니면 None"""
+        if self.chunk_seconds <= 0:
+            return None
+        wav_path = _to_wav(audio_file_path, tmp_dir)
+        if wav_path is None:
+            print(f"DEBUG: Chunked STT skipped (cannot decode {os.path.basename(audio_file_path)} without ffmpeg)")
+            return None
+        duration, points = find_split_points(wav_path, self.chunk_seconds)
+        if not points:
+            return None
+
+        ranges = plan_chunks(duration, points, self.overlap_seconds)
+        paths = []
+        for i, (start, end) in enumerate(ranges):
+            path = os.path.join(tmp_dir, f"chunk_{i:03d}.wav")
+            write_wav_slice(wav_path, path, start, end)
+            paths.append(path)
+        print(f"DEBUG: Chunked STT: {duration:.0f}s audio -> {len(paths)} chunks")
+        return paths, ranges, duration
+
+    def transcribe_from_file(self, audio_file_path:str):
+        with tempfile.TemporaryDirectory(prefix="synapse_chunks_") as tmp_dir:
+            plan = self._prepare(audio_file_path, tmp_dir)
+            if plan is None:
+                return self.provider.transcribe_from_file(audio_file_path)
+            paths, ranges, duration = plan
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                results = list(pool.map(self.provider.transcribe_from_file, paths))
+            return stitch_results(results, ranges, duration)
+
+    async def atranscribe_from_file(self, audio_file_path:str):
+        with tempfile.TemporaryDirectory(prefix="synapse_chunks_") as tmp_dir:
+            plan = await asyncio.to_thread(self._prepare, audio_file_path, tmp_dir)
+            if plan is None:
+                return await self.provider.atranscribe_from_file(audio_file_path)
+            paths, ranges, duration = plan
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def transcribe(path):
+                async with semaphore:
+                    return await self.provider.atranscribe_from_file(path)
+
+            results = await asyncio.gather(*[transcribe(path) for path in paths])
+            return stitch_results(results, ranges, duration)
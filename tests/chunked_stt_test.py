@@ -0,0 +1,91 @@
+import os
+import sys
+import math
+import time
+import wave
+import array
+import random
+import tempfile
+
+# Synapse-stt 디렉토리에서 stt 패키지와 모의 서버를 불러옴
+stt_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../Synapse-stt"))
+if stt_dir not in sys.path:
+    sys.path.append(stt_dir)
+
+from mock_clova_server import start_server
+
+# ====================================
+# 1) 모의 Clova 서버 실행 (실제 API 호출 없음)
+# ====================================
+server, base_url = start_server(rtf=0.05)
+os.environ["CLOVA_INVOKE_URL"] = base_url
+os.environ.setdefault("CLOVA_API_KEY", "test")
+
+from stt.Clova import ClovaSpeechClient
+from stt.chunked import ChunkedSTTProvider, find_split_points
+
+
+# ====================================
+# 2) 테스트 음성 만들기: 작은 목소리/큰 목소리 두 화자가 번갈아 말하는 3분짜리 16kHz WAV
+# ====================================
+def make_conversation(path, seconds=180, rate=16000):
+    random.seed(7)
+    samples = array.array("h")
+    t = 0.0
+    while t < seconds:
+        amplitude = random.choice([2500, 12000])
+        length = random.uniform(2.0, 6.0)
+        for i in range(int(length * rate)):
+            samples.append(int(amplitude * math.sin(2 * math.pi * 220 * i / rate)))
+        pause = random.uniform(0.6, 1.5)
+        samples.extend([0] * int(pause * rate))
+        t += length + pause
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+
+
+tmp_dir = tempfile.mkdtemp()
+audio_file_path = os.path.join(tmp_dir, "conversation.wav")
+make_conversation(audio_file_path)
+
+duration, points = find_split_points(audio_file_path, chunk_seconds=40)
+print(f"==== 분할 지점 ({duration:.1f}s) ====")
+print(", ".join(f"{p:.1f}s" for p in points))
+
+# ====================================
+# 3) 한 번에 인식 vs 분할 병렬 인식
+# ====================================
+client = ClovaSpeechClient()
+
+start = time.perf_counter()
+whole = client.transcribe_from_file(audio_file_path)
+whole_elapsed = time.perf_counter() - start
+
+chunked_provider = ChunkedSTTProvider(client, chunk_seconds=40, overlap_seconds=4, max_concurrency=4)
+start = time.perf_counter()
+chunked = chunked_provider.transcribe_from_file(audio_file_path)
+chunked_elapsed = time.perf_counter() - start
+
+print(f"\n==== 처리 시간 ====\n한 번에: {whole_elapsed:.2f}s / 분할({len(points) + 1}개): {chunked_elapsed:.2f}s")
+
+# ====================================
+# 4) 결과 비교: 세그먼트 수, 시간(±0.2초), 화자 일관성
+# ====================================
+print("\n==== 문장 단위 세그먼트 (분할 인식) ====")
+for seg in chunked.segments:
+    print(f"[{seg.start:.2f} ~ {seg.end:.2f}] ({seg.speaker['label']}) {seg.text}")
+
+assert len(whole.segments) == len(chunked.segments), (len(whole.segments), len(chunked.segments))
+voice_to_label = {}
+for a, b in zip(whole.segments, chunked.segments):
+    assert abs(a.start - b.start) <= 0.2 and abs(a.end - b.end) <= 0.2, (a, b)
+    voice = b.text.split()[0]
+    # 같은 목소리는 모든 조각에서 같은 전역 화자 라벨이어야 함
+    assert voice_to_label.setdefault(voice, b.speaker["label"]) == b.speaker["label"], (voice, b)
+assert len(set(voice_to_label.values())) == len(voice_to_label)
+print("\n==== OK: 시간/화자 일치 ====")
+
+server.shutdown()
@@ -0,0 +1,95 @@
+import io
+import os
+import sys
+import math
+import time
+import wave
+import array
+import random
+
+# Synapse-stt 디렉토리에서 stt 패키지와 모의 서버를 불러옴
+stt_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../Synapse-stt"))
+if stt_dir not in sys.path:
+    sys.path.append(stt_dir)
+
+import mock_clova_server
+from mock_nest_server import start_server
+
+# ====================================
+# 1) 모의 NestService(gRPC) 서버 실행 (실제 API 호출 없음)
+# ====================================
+server, target = start_server()
+os.environ["CLOVA_GRPC_TARGET"] = target
+os.environ["CLOVA_GRPC_INSECURE"] = "true"
+os.environ.setdefault("CLOVA_API_KEY", "test")
+
+from stt.Clova import ClovaSpeechClient
+
+
+# ====================================
+# 2) 테스트 음성: 두 화자가 번갈아 말하는 1분짜리 16kHz PCM
+# ====================================
+def make_pcm(seconds=60, rate=16000):
+    random.seed(11)
+    samples = array.array("h")
+    t = 0.0
+    while t < seconds:
+        amplitude = random.choice([2500, 12000])
+        length = random.uniform(1.5, 4.0)
+        for i in range(int(length * rate)):
+            samples.append(int(amplitude * math.sin(2 * math.pi * 220 * i / rate)))
+        pause = random.uniform(0.5, 1.2)
+        samples.extend([0] * int(pause * rate))
+        t += length + pause
+    return samples.tobytes()
+
+
+pcm = make_pcm()
+
+
+def audio_stream(chunk_size=3200, pace=0.0):
+    """브라우저/마이크처럼 0.1초 분량씩 보냄 (pace > 0이면 실제 시간 흐름을 흉내 냄)"""
+    for i in range(0, len(pcm), chunk_size):
+        yield pcm[i:i + chunk_size]
+        if pace:
+            time.sleep(pace)
+
+
+# ====================================
+# 3) 스트리밍 인식: 확정 문장이 나오는 대로 출력
+# ====================================
+client = ClovaSpeechClient()
+finals = []
+partials = 0
+print("==== 실시간 인식 ====")
+for result in client.transcribe_stream(audio_stream(), partial_results=True):
+    seg = result.segments[0]
+    if result.is_final:
+        finals.append(seg)
+        print(f"[{seg.start:.2f} ~ {seg.end:.2f}] 화자 {seg.speaker['label']} : {seg.text}")
+    else:
+        partials += 1
+
+# ====================================
+# 4) 파일 인식(모의 장문인식) 결과와 비교
+# ====================================
+wav = io.BytesIO()
+with wave.open(wav, "wb") as w:
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(16000)
+    w.writeframes(pcm)
+expected, _ = mock_clova_server.recognize(wav.getvalue())
+
+assert partials > 0
+assert [s.text for s in finals] == [s["text"] for s in expected["segments"]], "확정 문장 불일치"
+assert all(abs(s.start - e["start"] / 1000) < 1e-6 for s, e in zip(finals, expected["segments"]))
+print(f"\n==== OK: 확정 {len(finals)}개 / 중간 결과 {partials}개 ====")
+
+# 소비자가 중간에 멈춰도 스트림이 정리되는지 확인
+stream = client.transcribe_stream(audio_stream(pace=0.01))
+next(stream)
+stream.close()
+print("==== OK: 중간 종료 ====")
+
+server.stop(None)
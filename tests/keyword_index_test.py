@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tempfile
+
+# Synapse-backend 디렉토리에서 키워드 색인 모듈을 불러옴 (벡터 DB/네트워크 없이 실행)
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../Synapse-backend"))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+os.environ["KEYWORD_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "keyword_index.db")
+
+from keyword_index import KeywordIndex, tokenize
+
+# ====================================
+# 1) 토큰화: 한글 음절 bigram + 영문/숫자 단어
+# ====================================
+print(tokenize("프로젝트 알파는 예산 1,000만원"))
+assert "알파" in tokenize("프로젝트 알파는") and "1000" in tokenize("1,000만원")
+
+# ====================================
+# 2) 색인 + BM25 검색
+# ====================================
+index = KeywordIndex(os.environ["KEYWORD_INDEX_PATH"])
+index.sync_document("a.json", {
+    "a_1": ("프로젝트 알파는 예산 1,000만원으로 확정되었습니다.", {"doc_id": "a.json"}),
+    "a_2": ("다음 주까지 기획안을 제출하기로 했습니다.", {"doc_id": "a.json"}),
+})
+index.sync_document("b.json", {
+    "b_1": ("마케팅 캠페인 일정과 예산을 논의했습니다.", {"doc_id": "b.json"}),
+})
+for query in ["프로젝트 알파", "1000만원", "기획안 제출", "캠페인"]:
+    hits = index.search(query, n_results=2)
+    print(f"{query} -> {[(h['id'], h['score']) for h in hits]}")
+assert index.search("프로젝트 알파", 1)[0]["id"] == "a_1"
+assert index.search("캠페인", 1)[0]["id"] == "b_1"
+
+started = time.perf_counter()
+for _ in range(1000):
+    index.search("예산 기획안", 3)
+print(f"평균 검색 시간: {(time.perf_counter() - started) * 1000:.1f}µs")
+
+# ====================================
+# 3) 증분 갱신: 바뀐 청크만 교체, 재시작 후에도 같은 결과
+# ====================================
+added, removed = index.sync_document("a.json", {
+    "a_1": ("프로젝트 알파는 예산 1,000만원으로 확정되었습니다.", {"doc_id": "a.json"}),
+    "a_3": ("다음 달까지 기획안을 제출하기로 했습니다.", {"doc_id": "a.json"}),
+})
+assert (added, removed) == (1, 1)
+assert index.search("다음 달", 1)[0]["id"] == "a_3"
+
+reloaded = KeywordIndex(os.environ["KEYWORD_INDEX_PATH"])
+assert len(reloaded) == len(index) == 3
+index.remove_document("b.json")
+assert not index.search("캠페인", 1)
+print(f"\n==== OK: {index.stats()} ====")
@@ -0,0 +1,43 @@
+import os
+import sys
+
+# Synapse-backend / Synapse-stt 디렉토리에서 모듈을 불러옴 (LLM 호출 없음)
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for sub in ("Synapse-backend", "Synapse-stt"):
+    path = os.path.join(root, sub)
+    if path not in sys.path:
+        sys.path.append(path)
+
+from stt.STT_interface import STTSegment
+from llm_gateway import estimate_tokens
+from map_reduce import split_transcript, WINDOW_TOKENS
+
+# ====================================
+# 1) 화자 분리 없는 긴 녹음: 한 화자의 세그먼트 2,000개 (약 40k 토큰 추정)
+# ====================================
+sentence = "이번 분기 프로젝트 일정과 예산 집행 현황을 공유드리고 다음 주 배포 계획을 정리하겠습니다."
+segments = [STTSegment(start=i * 4.0, end=i * 4.0 + 3.5, text=sentence, speaker="1") for i in range(2000)]
+full_text = "\n".join(f"1: {seg.text}" for seg in segments)
+print(f"추정 토큰: {estimate_tokens(full_text)}")
+
+with_segments = split_transcript(full_text, segments=segments)
+without_segments = split_transcript(full_text)
+print(f"구간 수: 세그먼트 사용 {len(with_segments)} / 텍스트만 {len(without_segments)}")
+assert len(with_segments) > 1, "단일 화자 세그먼트가 한 구간으로 합쳐짐"
+assert abs(len(with_segments) - len(without_segments)) <= 1
+# 구간 예산은 발언별 추정치의 합이므로 줄바꿈으로 이은 전체 추정치는 약간 넘을 수 있음
+assert all(estimate_tokens(w["text"]) <= WINDOW_TOKENS * 1.05 for w in with_segments)
+
+# ====================================
+# 2) 한 세그먼트가 예산보다 긴 경우에도 문장 단위로 나뉨
+# ====================================
+huge = [STTSegment(start=0.0, end=3600.0, text=" ".join([sentence] * 600), speaker={"label": "1"})]
+windows = split_transcript(huge[0].text, segments=huge, max_tokens=2000)
+print(f"긴 세그먼트 하나 -> {len(windows)}개 구간")
+assert len(windows) > 1
+assert all(estimate_tokens(w["text"]) <= 2000 * 1.05 for w in windows)
+
+# 화자가 바뀌는 지점에서는 여전히 새 발언으로 시작
+mixed = [STTSegment(0, 1, "안녕하세요.", "1"), STTSegment(1, 2, "네 반갑습니다.", "2"), STTSegment(2, 3, "시작하죠.", "2")]
+assert split_transcript("", segments=mixed)[0]["text"] == "1: 안녕하세요.\n2: 네 반갑습니다. 시작하죠."
+print("\n==== OK ====")